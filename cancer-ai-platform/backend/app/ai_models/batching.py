@@ -0,0 +1,190 @@
+"""
+Dynamic micro-batching for model inference.
+Concurrent requests for the same model are collected for a short window,
+run through a single forward pass, and each caller receives its own result.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable
+
+from app.config import settings
+from app.core.logging import logger
+
+_batchers: dict[str, "MicroBatcher"] = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """
+    Collects submitted items on a queue and flushes them to `batch_fn` when either
+    `max_batch_size` items are waiting or `max_wait_ms` has passed since the first one.
+    `batch_fn` takes a list of items and must return a list of results in the same order.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[list], list], max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._batch_size_hist: dict[int, int] = {}
+        self._last_batch_ms = 0.0
+        self._total_batch_ms = 0.0
+        self._total_wait_ms = 0.0
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item for the next batch. Returns a Future with its result."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    async def infer(self, item: Any) -> Any:
+        """Async wrapper around `submit` for use from the event loop."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def stats(self) -> dict:
+        """Queue-depth and batch-size metrics for tuning the batching window."""
+        batches = self._batches
+        return {
+            "name": self.name,
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "batches": batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / batches, 2) if batches else 0,
+            "max_batch_size_seen": self._max_batch_seen,
+            "batch_size_histogram": dict(sorted(self._batch_size_hist.items())),
+            "last_batch_ms": round(self._last_batch_ms, 2),
+            "avg_batch_ms": round(self._total_batch_ms / batches, 2) if batches else 0,
+            "avg_queue_wait_ms": round(self._total_wait_ms / self._items, 2) if self._items else 0,
+        }
+
+    def shutdown(self):
+        """Stop the worker thread after the queue drains."""
+        self._stopped = True
+        self._queue.put(None)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> list | None:
+        """
+        Block for the first item, then gather more until the batch is full or the window closes.
+        Each collected future is marked running, so a caller can no longer cancel it while its
+        result is computed; items cancelled while queued are dropped here.
+        """
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return None
+            if first[1].set_running_or_notify_cancel():
+                break
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)
+                break
+            if entry[1].set_running_or_notify_cancel():
+                batch.append(entry)
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._collect()
+            if batch is None:
+                break
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Never let one batch end the thread — later submits would wait forever
+                logger.error(f"Batcher {self.name} failed to deliver a batch: {e}")
+
+    def _process(self, batch: list):
+        items = [entry[0] for entry in batch]
+        futures = [entry[1] for entry in batch]
+        t0 = time.perf_counter()
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.warning(f"Batch inference failed for {self.name}: {e}")
+            for future in futures:
+                deliver(future, exception=e)
+            return
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+
+        for future, result in zip(futures, results):
+            deliver(future, result=result)
+
+        size = len(items)
+        self._batches += 1
+        self._items += size
+        self._max_batch_seen = max(self._max_batch_seen, size)
+        self._batch_size_hist[size] = self._batch_size_hist.get(size, 0) + 1
+        self._last_batch_ms = elapsed_ms
+        self._total_batch_ms += elapsed_ms
+        self._total_wait_ms += sum((t0 - entry[2]) * 1000 for entry in batch)
+
+
+def deliver(future: Future, result: Any = None, exception: BaseException | None = None):
+    """Resolve a caller's future; one that is already done (e.g. cancelled) is skipped."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def get_batcher(name: str, batch_fn: Callable[[list], list]) -> MicroBatcher:
+    """Get (or create) the shared batcher for a model."""
+    batcher = _batchers.get(name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(name)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    name,
+                    batch_fn,
+                    max_batch_size=settings.BATCH_MAX_SIZE,
+                    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                )
+                _batchers[name] = batcher
+    return batcher
+
+
+def all_stats() -> list[dict]:
+    return [b.stats() for b in _batchers.values()]
+
+
+def shutdown_all():
+    for batcher in _batchers.values():
+        batcher.shutdown()
@@ -0,0 +1,53 @@
+"""
+Fused prediction + Grad-CAM.
+Captures the target layer's activations during the inference forward pass and
+differentiates only from the target layer onwards, so a scan costs one forward
+pass plus a partial backward instead of two full forward passes.
+"""
+import numpy as np
+import torch
+from typing import Callable
+
+from app.ai_models.explainability.gradcam import get_gradcam, compute_cams
+
+
+def classifier_score(output: torch.Tensor) -> torch.Tensor:
+    """Sum of each sample's top-class logit (classification models)."""
+    return output.gather(1, output.argmax(dim=1, keepdim=True)).sum()
+
+
+def segmentation_score(output: torch.Tensor) -> torch.Tensor:
+    """
+    Sum of each sample's logits inside its predicted mask (segmentation models).
+    Samples with an empty mask fall back to their mean logit.
+    """
+    flat = output.flatten(1)
+    mask = (flat > 0).float()
+    masked = (flat * mask).sum(dim=1)
+    score = torch.where(mask.sum(dim=1) > 0, masked, flat.mean(dim=1))
+    return score.sum()
+
+
+def predict_with_gradcam(
+    model,
+    input_tensor: torch.Tensor,
+    score_fn: Callable[[torch.Tensor], torch.Tensor],
+    target_layer=None,
+) -> tuple[torch.Tensor, list[np.ndarray | None]]:
+    """
+    Run one forward pass on a batch and compute Grad-CAM for every sample.
+    Returns (detached model output, list of (H,W) heatmaps in [0,1]).
+    A heatmap is None if the model has no convolutional layer to explain.
+    """
+    gradcam = get_gradcam(model, target_layer)
+    if gradcam.target_layer is None:
+        with torch.no_grad():
+            output = model(input_tensor)
+        return output, [None] * input_tensor.shape[0]
+
+    with gradcam.capture(), torch.enable_grad():
+        output = model(input_tensor)
+        activations = gradcam.activations
+        (gradients,) = torch.autograd.grad(score_fn(output), activations)
+
+    return output.detach(), compute_cams(activations.detach(), gradients)
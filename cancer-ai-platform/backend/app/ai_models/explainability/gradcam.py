@@ -9,6 +9,8 @@ from PIL import Image
 from torchvision import transforms
 import base64
 import io
+import threading
+from contextlib import contextmanager
 from app.core.logging import logger
 
 INPUT_SIZE = (224, 224)
@@ -21,70 +23,125 @@ preprocess = transforms.Compose([
 
 
 class GradCAM:
+    """
+    Grad-CAM explainer bound to one model and target layer.
+    The forward hook is registered once and is a no-op unless the calling thread is
+    inside `capture()`, so plain inference is unaffected and concurrent requests
+    each see only their own activations. Use `get_gradcam()` rather than
+    constructing instances directly, and `release_gradcam()` when a model is replaced.
+    """
+
     def __init__(self, model, target_layer=None):
         self.model = model
-        self.gradients = None
-        self.activations = None
-        self.target_layer = target_layer or self._find_last_conv(model)
+        self.target_layer = target_layer or find_last_conv(model)
+        self._local = threading.local()
+        self._handle = None
         if self.target_layer is not None:
-            self.target_layer.register_forward_hook(self._forward_hook)
-            self.target_layer.register_full_backward_hook(self._backward_hook)
-
-    def _find_last_conv(self, model):
-        """Find the last convolutional layer in the model."""
-        last_conv = None
-        for module in model.modules():
-            if isinstance(module, torch.nn.Conv2d):
-                last_conv = module
-        return last_conv
+            self._handle = self.target_layer.register_forward_hook(self._forward_hook)
 
     def _forward_hook(self, module, input, output):
-        self.activations = output.detach()
-
-    def _backward_hook(self, module, grad_input, grad_output):
-        self.gradients = grad_output[0].detach()
+        if not getattr(self._local, "active", False):
+            return None
+        # Cut the graph here: everything before the target layer runs without
+        # autograd bookkeeping, and the backward pass stops at this tensor.
+        activations = output.detach().requires_grad_(True)
+        self._local.activations = activations
+        return activations
+
+    @contextmanager
+    def capture(self):
+        """Capture target-layer activations for forward passes run by this thread."""
+        self._local.active = True
+        self._local.activations = None
+        try:
+            yield self
+        finally:
+            self._local.active = False
+
+    @property
+    def activations(self):
+        """Activations captured by the current thread's last forward pass."""
+        return getattr(self._local, "activations", None)
+
+    def remove(self):
+        """Detach the hook from the model."""
+        if self._handle is not None:
+            self._handle.remove()
+            self._handle = None
 
     def generate(self, image: Image.Image, target_class: int = None) -> np.ndarray:
         """Generate GradCAM heatmap. Returns numpy array (H,W) in [0,1]."""
+        if self.target_layer is None:
+            # Fallback: return a simple center-focused heatmap
+            h, w = INPUT_SIZE
+            return _generate_fallback_heatmap(h, w)
+
         device = next(self.model.parameters()).device
         img_tensor = preprocess(image.convert("RGB")).unsqueeze(0).to(device)
-        img_tensor.requires_grad = True
 
-        # Need to temporarily ensure gradients are enabled for the model
-        prev_training_state = self.model.training
-        self.model.eval()
-        for param in self.model.parameters():
-            param.requires_grad_(True)
-
-        output = self.model(img_tensor)
-        if target_class is None:
-            target_class = output.argmax(dim=1).item()
+        with self.capture(), torch.enable_grad():
+            output = self.model(img_tensor)
+            if target_class is None:
+                target_class = output.argmax(dim=1).item()
+            activations = self.activations
+            (gradients,) = torch.autograd.grad(output[0, target_class], activations)
+
+        return compute_cams(activations.detach(), gradients)[0]
+
+
+def find_last_conv(model):
+    """Find the last 2D or 3D convolutional layer in the model."""
+    last_conv = None
+    for module in model.modules():
+        if isinstance(module, (torch.nn.Conv2d, torch.nn.Conv3d)):
+            last_conv = module
+    return last_conv
+
+
+def compute_cams(activations: torch.Tensor, gradients: torch.Tensor) -> list[np.ndarray]:
+    """Weight activations by pooled gradients and normalize each sample's map to [0,1]."""
+    spatial_dims = list(range(2, activations.ndim))
+    weights = gradients.mean(dim=spatial_dims, keepdim=True)
+    cams = torch.relu((weights * activations).sum(dim=1))
+    if cams.ndim == 4:
+        # 3D models: project the volume onto the axial plane
+        cams = cams.amax(dim=1)
+    cams = cams.cpu().numpy()
+
+    results = []
+    for cam in cams:
+        if cam.max() > 0:
+            cam = cam / cam.max()
+        results.append(cv2.resize(cam.astype(np.float32), INPUT_SIZE))
+    return results
 
-        self.model.zero_grad()
-        output[0, target_class].backward()
 
-        # Restore original state
-        if not prev_training_state:
-            for param in self.model.parameters():
-                param.requires_grad_(False)
+# ── Explainer registry ───────────────────────────────────
+_explainers: dict[tuple[int, int], GradCAM] = {}
+_explainers_lock = threading.Lock()
 
-        if self.gradients is None or self.activations is None:
-            # Fallback: return a simple center-focused heatmap
-            h, w = INPUT_SIZE
-            return _generate_fallback_heatmap(h, w)
 
-        weights = self.gradients.mean(dim=[2, 3], keepdim=True)
-        cam = (weights * self.activations).sum(dim=1, keepdim=True)
-        cam = torch.relu(cam)
-        cam = cam.squeeze().cpu().numpy()
+def get_gradcam(model, target_layer=None) -> GradCAM:
+    """Get the shared GradCAM for a loaded model, registering its hook on first use."""
+    target_layer = target_layer or find_last_conv(model)
+    key = (id(model), id(target_layer))
+    gradcam = _explainers.get(key)
+    if gradcam is None or gradcam.model is not model:
+        with _explainers_lock:
+            gradcam = _explainers.get(key)
+            if gradcam is None or gradcam.model is not model:
+                gradcam = GradCAM(model, target_layer)
+                _explainers[key] = gradcam
+    return gradcam
 
-        # Normalize
-        if cam.max() > 0:
-            cam = cam / cam.max()
 
-        # Resize to input size
-        cam = cv2.resize(cam, INPUT_SIZE)
-        return cam
+def release_gradcam(model):
+    """Remove every GradCAM hook registered on a model (call before replacing it)."""
+    if model is None:
+        return
+    with _explainers_lock:
+        for key in [k for k, g in _explainers.items() if g.model is model]:
+            _explainers.pop(key).remove()
 
 
 def _generate_fallback_heatmap(h: int, w: int) -> np.ndarray:
@@ -101,7 +158,7 @@ def generate_heatmap_overlay(image: Image.Image, model, target_class: int = None
     Returns base64-encoded PNG string.
     """
     try:
-        gradcam = GradCAM(model)
+        gradcam = get_gradcam(model)
         heatmap = gradcam.generate(image, target_class)
     except Exception as e:
         logger.warning(f"GradCAM generation failed: {e}. Using fallback.")
@@ -128,11 +185,19 @@ def generate_heatmap_overlay(image: Image.Image, model, target_class: int = None
 def save_heatmap(image: Image.Image, model, save_path: str, target_class: int = None) -> str:
     """Generate and save GradCAM heatmap overlay to disk. Returns file path."""
     try:
-        gradcam = GradCAM(model)
+        gradcam = get_gradcam(model)
         heatmap = gradcam.generate(image, target_class)
     except Exception:
         heatmap = _generate_fallback_heatmap(*INPUT_SIZE)
 
+    return save_heatmap_array(image, heatmap, save_path)
+
+
+def save_heatmap_array(image: Image.Image, heatmap: np.ndarray | None, save_path: str) -> str:
+    """Save an already-computed (H,W) heatmap as an overlay on the image. Returns file path."""
+    if heatmap is None:
+        heatmap = _generate_fallback_heatmap(*INPUT_SIZE)
+
     img_resized = image.convert("RGB").resize(INPUT_SIZE)
     img_array = np.array(img_resized)
     heatmap_colored = cv2.applyColorMap(np.uint8(255 * heatmap), cv2.COLORMAP_JET)
@@ -0,0 +1,51 @@
+"""
+Content-addressed on-disk cache for GradCAM overlays.
+Overlays are keyed by image hash + model version + target class and stored under
+UPLOAD_DIR/heatmaps, so repeat views and duplicate uploads never recompute.
+"""
+import hashlib
+import os
+import uuid
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+
+HEATMAP_SUBDIR = "heatmaps"
+
+
+def heatmap_key(image_hash: str, model_version: str, target_class: str) -> str:
+    return hashlib.sha256(f"{image_hash}:{model_version}:{target_class}".encode()).hexdigest()
+
+
+def heatmap_relpath(key: str) -> str:
+    """Path relative to UPLOAD_DIR (what the /uploads mount and `heatmap_path` use)."""
+    return f"{HEATMAP_SUBDIR}/{key[:2]}/{key}.png"
+
+
+def lookup(key: str) -> str | None:
+    """Return the cached overlay's relative path, or None on a miss."""
+    relpath = heatmap_relpath(key)
+    if os.path.exists(os.path.join(settings.UPLOAD_DIR, relpath)):
+        return relpath
+    return None
+
+
+def store(image: Image.Image, heatmap: np.ndarray | None, key: str) -> str:
+    """Render and atomically write the overlay for `key`. Returns its relative path."""
+    # Imported here so the API process doesn't load torch until a model is actually used
+    from app.ai_models.explainability.gradcam import save_heatmap_array
+
+    relpath = heatmap_relpath(key)
+    final_path = os.path.join(settings.UPLOAD_DIR, relpath)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+    tmp_path = f"{final_path[:-4]}.{uuid.uuid4().hex[:8]}.tmp.png"
+    try:
+        save_heatmap_array(image, heatmap, tmp_path)
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return relpath
@@ -0,0 +1,57 @@
+"""
+Model checkpoint fingerprints — identify which weights produced a cached output.
+Fingerprints are content hashes, recomputed only when a file's mtime or size changes.
+"""
+import hashlib
+import os
+import threading
+
+from app.config import settings
+
+# Bump when image preprocessing changes in a way that alters model outputs
+PREPROCESS_VERSION = 1
+
+_fingerprints: dict[str, tuple[tuple[int, int], str]] = {}
+_lock = threading.Lock()
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str) -> str:
+    """Short content hash of a checkpoint file, or "builtin" if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "builtin"
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    fingerprint = sha256_file(path)[:16]
+    with _lock:
+        _fingerprints[path] = (signature, fingerprint)
+    return fingerprint
+
+
+def model_path(cancer_type: str) -> str:
+    """Checkpoint path of the model that serves a cancer type."""
+    return {
+        "lung": settings.LUNG_MODEL_PATH,
+        "brain": settings.BRAIN_MODEL_PATH,
+        "ct": settings.CT_MODEL_PATH,
+        "bone": settings.CT_MODEL_PATH,
+        "blood": settings.BLOOD_MODEL_PATH,
+    }.get(cancer_type, settings.LUNG_MODEL_PATH)
+
+
+def model_version(cancer_type: str) -> str:
+    return file_fingerprint(model_path(cancer_type))
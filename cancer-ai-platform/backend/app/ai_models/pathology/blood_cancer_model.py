@@ -5,8 +5,8 @@ Configures TensorFlow GPU memory growth to coexist with PyTorch.
 import numpy as np
 from pathlib import Path
 from app.core.logging import logger
+from app.ai_models import registry
 
-_model = None
 CLASSES = ["normal", "leukemia"]
 INPUT_SIZE = (224, 224)
 
@@ -27,26 +27,22 @@ def _configure_tf_gpu():
 
 
 def load_model(model_path: str):
-    """Load the blood cancer .h5 Keras model."""
-    global _model
-
+    """Load the blood cancer .h5 Keras model (None if it's missing or unreadable)."""
     # Configure GPU before loading
     _configure_tf_gpu()
 
     path = Path(model_path)
     if not path.exists():
         logger.warning(f"Blood cancer model not found at {model_path}. Will use fallback predictions.")
-        _model = None
         return None
 
     try:
         import tensorflow as tf
-        _model = tf.keras.models.load_model(model_path)
+        model = tf.keras.models.load_model(model_path)
         logger.info(f"Blood cancer model loaded from {model_path}")
-        return _model
+        return model
     except Exception as e:
         logger.error(f"Failed to load blood cancer model: {e}. Using fallback.")
-        _model = None
         return None
 
 
@@ -58,4 +54,10 @@ def preprocess_image(image):
 
 
 def get_model():
-    return _model
+    """The current model, loaded on first use (see app.ai_models.registry)."""
+    return registry.get("blood")
+
+
+def use_model():
+    """Lease the current model for one inference call: `with use_model() as model:`."""
+    return registry.lease("blood")
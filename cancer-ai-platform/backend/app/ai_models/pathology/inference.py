@@ -3,7 +3,8 @@ Blood cancer (pathology) inference.
 """
 import numpy as np
 from PIL import Image
-from app.ai_models.pathology.blood_cancer_model import get_model, preprocess_image, CLASSES
+from app.ai_models import registry
+from app.ai_models.pathology.blood_cancer_model import use_model, preprocess_image, CLASSES
 
 
 def predict(image: Image.Image) -> dict:
@@ -11,14 +12,28 @@ def predict(image: Image.Image) -> dict:
     Run blood cancer inference on a blood slide image.
     Returns: {predicted_class, confidence, probabilities, risk_score}
     """
-    model = get_model()
-    if model is None:
-        return _fallback_prediction()
+    with use_model() as model:
+        if model is None:
+            return _fallback_prediction()
 
-    img_array = preprocess_image(image)
-    predictions = model.predict(img_array, verbose=0)
-    probabilities = predictions[0]
+        img_array = preprocess_image(image)
+        predictions = model.predict(img_array, verbose=0)
+        return registry.stamp([_to_result(predictions[0])], model)[0]
 
+
+def predict_batch(images: list[Image.Image]) -> list[dict]:
+    """Run blood cancer inference on several slides in a single model.predict call."""
+    with use_model() as model:
+        if model is None:
+            return [_fallback_prediction() for _ in images]
+
+        batch = np.concatenate([preprocess_image(image) for image in images], axis=0)
+        predictions = model.predict(batch, verbose=0)
+        return registry.stamp([_to_result(probabilities) for probabilities in predictions], model)
+
+
+def _to_result(probabilities) -> dict:
+    """Convert one row of model output into a result dict."""
     if len(probabilities) == 1:
         # Binary sigmoid output
         prob_positive = float(probabilities[0])
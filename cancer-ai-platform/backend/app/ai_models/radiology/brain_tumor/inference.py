@@ -6,7 +6,15 @@ We run the segmentation and derive classification results from the output mask.
 import torch
 import numpy as np
 from PIL import Image
-from app.ai_models.radiology.brain_tumor.mri_model import get_model, preprocess, CLASSES, _device
+from app.ai_models import registry
+from app.ai_models.explainability.fused import predict_with_gradcam, segmentation_score
+from app.ai_models.radiology.brain_tumor.mri_model import get_model, use_model, preprocess, CLASSES, _device
+
+
+def preprocess_image(image: Image.Image) -> torch.Tensor:
+    """Preprocess a PIL Image into a single (1, H, W) grayscale input tensor."""
+    # The brain model expects 1-channel (grayscale) input
+    return preprocess(image.convert("RGB"))
 
 
 def predict(image: Image.Image) -> dict:
@@ -15,57 +23,98 @@ def predict(image: Image.Image) -> dict:
         return _fallback_prediction()
 
     try:
-        # The brain model expects 1-channel (grayscale) input
-        img_tensor = preprocess(image.convert("RGB")).unsqueeze(0).to(_device)
-
-        with torch.no_grad():
-            output = model(img_tensor)
-
-        # The output is a segmentation mask — analyze it for classification
-        # Sigmoid to get probability map
-        prob_map = torch.sigmoid(output).squeeze().cpu().numpy()
-
-        # Calculate tumor area ratio from the segmentation mask
-        if prob_map.ndim == 0:
-            tumor_ratio = float(prob_map)
-        else:
-            tumor_ratio = float((prob_map > 0.5).sum()) / max(prob_map.size, 1)
-
-        # Convert segmentation output to classification-like result
-        if tumor_ratio < 0.02:
-            predicted_class = "no_tumor"
-            confidence = max(70, (1 - tumor_ratio) * 100)
-            risk_score = tumor_ratio * 100
-        elif tumor_ratio < 0.10:
-            predicted_class = "meningioma"  # Small, likely benign
-            confidence = max(60, min(95, tumor_ratio * 500))
-            risk_score = tumor_ratio * 300
-        elif tumor_ratio < 0.25:
-            predicted_class = "pituitary"  # Moderate
-            confidence = max(60, min(95, tumor_ratio * 300))
-            risk_score = tumor_ratio * 200
-        else:
-            predicted_class = "glioma"  # Large tumor area
-            confidence = max(70, min(98, tumor_ratio * 200))
-            risk_score = min(98, tumor_ratio * 300)
-
-        return {
-            "predicted_class": predicted_class,
-            "confidence": round(confidence, 2),
-            "risk_score": round(min(risk_score, 98), 2),
-            "probabilities": {
-                "no_tumor": round(max(0, (1 - tumor_ratio)) * 100, 2),
-                "glioma": round(min(100, tumor_ratio * 150), 2),
-                "meningioma": round(min(100, tumor_ratio * 100), 2),
-                "pituitary": round(min(100, tumor_ratio * 80), 2),
-            },
-        }
+        return predict_batch([preprocess_image(image)])[0]
     except Exception as e:
         from app.core.logging import logger
         logger.warning(f"Brain inference error: {e}, using fallback.")
         return _fallback_prediction()
 
 
+def predict_batch(tensors: list[torch.Tensor]) -> list[dict]:
+    """
+    Run the segmentation model on a batch of preprocessed tensors in one forward pass.
+    Returns one result dict per input, in order.
+    """
+    with use_model() as model:
+        if model is None:
+            return [_fallback_prediction() for _ in tensors]
+
+        try:
+            batch = torch.stack(tensors).to(_device)
+
+            with torch.no_grad():
+                output = model(batch)
+
+            # The output is a segmentation mask — analyze it for classification
+            # Sigmoid to get probability map
+            prob_maps = torch.sigmoid(output).cpu().numpy()
+            return registry.stamp([_to_result(prob_map.squeeze()) for prob_map in prob_maps], model)
+        except Exception as e:
+            from app.core.logging import logger
+            logger.warning(f"Brain inference error: {e}, using fallback.")
+            return [_fallback_prediction() for _ in tensors]
+
+
+def predict_batch_with_heatmap(tensors: list[torch.Tensor]) -> list[tuple[dict, np.ndarray | None]]:
+    """
+    Run segmentation and Grad-CAM together in one forward pass.
+    Returns one (result, heatmap) pair per input; heatmap is None if it couldn't be computed.
+    """
+    with use_model() as model:
+        if model is None:
+            return [(_fallback_prediction(), None) for _ in tensors]
+
+        try:
+            batch = torch.stack(tensors).to(_device)
+            output, cams = predict_with_gradcam(model, batch, segmentation_score)
+            prob_maps = torch.sigmoid(output).cpu().numpy()
+            results = registry.stamp([_to_result(prob_map.squeeze()) for prob_map in prob_maps], model)
+            return list(zip(results, cams))
+        except Exception as e:
+            from app.core.logging import logger
+            logger.warning(f"Fused brain GradCAM failed: {e}. Running plain inference.")
+            return [(result, None) for result in predict_batch(tensors)]
+
+
+def _to_result(prob_map: np.ndarray) -> dict:
+    """Convert one segmentation probability map into a classification-like result."""
+    # Calculate tumor area ratio from the segmentation mask
+    if prob_map.ndim == 0:
+        tumor_ratio = float(prob_map)
+    else:
+        tumor_ratio = float((prob_map > 0.5).sum()) / max(prob_map.size, 1)
+
+    # Convert segmentation output to classification-like result
+    if tumor_ratio < 0.02:
+        predicted_class = "no_tumor"
+        confidence = max(70, (1 - tumor_ratio) * 100)
+        risk_score = tumor_ratio * 100
+    elif tumor_ratio < 0.10:
+        predicted_class = "meningioma"  # Small, likely benign
+        confidence = max(60, min(95, tumor_ratio * 500))
+        risk_score = tumor_ratio * 300
+    elif tumor_ratio < 0.25:
+        predicted_class = "pituitary"  # Moderate
+        confidence = max(60, min(95, tumor_ratio * 300))
+        risk_score = tumor_ratio * 200
+    else:
+        predicted_class = "glioma"  # Large tumor area
+        confidence = max(70, min(98, tumor_ratio * 200))
+        risk_score = min(98, tumor_ratio * 300)
+
+    return {
+        "predicted_class": predicted_class,
+        "confidence": round(confidence, 2),
+        "risk_score": round(min(risk_score, 98), 2),
+        "probabilities": {
+            "no_tumor": round(max(0, (1 - tumor_ratio)) * 100, 2),
+            "glioma": round(min(100, tumor_ratio * 150), 2),
+            "meningioma": round(min(100, tumor_ratio * 100), 2),
+            "pituitary": round(min(100, tumor_ratio * 80), 2),
+        },
+    }
+
+
 def _fallback_prediction():
     import random
     idx = random.choices(range(4), weights=[50, 25, 15, 10])[0]
@@ -9,8 +9,8 @@ import torch.nn as nn
 from torchvision import transforms
 from pathlib import Path
 from app.core.logging import logger
+from app.ai_models import registry
 
-_model = None
 _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 CLASSES = ["normal", "nodule_benign", "nodule_malignant"]
@@ -107,29 +107,36 @@ class CTUNet3D(nn.Module):
 
 
 def load_model(model_path: str):
-    global _model
     path = Path(model_path)
     if not path.exists():
         logger.warning(f"CT model not found at {model_path}. Using fallback 3D UNet.")
-        _model = CTUNet3D()
-        _model.eval()
+        model = CTUNet3D()
+        model.eval()
+        registry.mark_fallback(model)
     else:
         try:
             checkpoint = torch.load(model_path, map_location=_device, weights_only=False)
             if isinstance(checkpoint, dict):
-                _model = CTUNet3D()
-                _model.load_state_dict(checkpoint, strict=False)
+                model = CTUNet3D()
+                model.load_state_dict(checkpoint, strict=False)
             else:
-                _model = checkpoint
-            _model.eval()
+                model = checkpoint
+            model.eval()
             logger.info(f"CT model loaded from {model_path}")
         except Exception as e:
             logger.error(f"Failed to load CT model: {e}. Using fallback.")
-            _model = CTUNet3D()
-            _model.eval()
-    _model.to(_device)
-    return _model
+            model = CTUNet3D()
+            model.eval()
+            registry.mark_fallback(model)
+    model.to(_device)
+    return model
 
 
 def get_model():
-    return _model
+    """The current model, loaded on first use (see app.ai_models.registry)."""
+    return registry.get("ct")
+
+
+def use_model():
+    """Lease the current model for one inference call: `with use_model() as model:`."""
+    return registry.lease("ct")
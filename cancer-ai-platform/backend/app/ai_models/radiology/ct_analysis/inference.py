@@ -2,11 +2,22 @@
 CT analysis inference.
 CT model is a 3D UNet segmentation model.
 For 2D input images, we create a pseudo-3D volume and analyze the segmentation output.
+NIfTI / DICOM volumes go through sliding-window inference (see volumetric.py).
 """
 import torch
 import numpy as np
 from PIL import Image
-from app.ai_models.radiology.ct_analysis.ct_model import get_model, preprocess, CLASSES, _device
+from app.ai_models import registry
+from app.ai_models.explainability.fused import predict_with_gradcam, segmentation_score
+from app.ai_models.radiology.ct_analysis.ct_model import get_model, use_model, preprocess, CLASSES, _device
+from app.ai_models.radiology.ct_analysis.volumetric import load_volume, sliding_window_segment, middle_slice_preview
+
+
+def preprocess_image(image: Image.Image) -> torch.Tensor:
+    """Preprocess a PIL Image into a single (1, 1, H, W) pseudo-volume tensor."""
+    # The CT model is a 3D UNet - it expects 5D input [B, C, D, H, W]
+    # For a 2D image, we create a pseudo-3D volume with depth=1
+    return preprocess(image.convert("RGB")).unsqueeze(1)
 
 
 def predict(image: Image.Image) -> dict:
@@ -15,56 +26,120 @@ def predict(image: Image.Image) -> dict:
         return _fallback_prediction()
 
     try:
-        # The CT model is a 3D UNet - it expects 5D input [B, C, D, H, W]
-        # For a 2D image, we create a pseudo-3D volume with depth=1
-        img_tensor = preprocess(image.convert("RGB")).unsqueeze(0).to(_device)
-
-        # Reshape from [B, C, H, W] → [B, C, 1, H, W] for 3D UNet
-        if img_tensor.ndim == 4:
-            img_tensor = img_tensor.unsqueeze(2)  # Add depth dimension
-
-        with torch.no_grad():
-            output = model(img_tensor)
-
-        # Sigmoid to get probability map from segmentation output
-        prob_map = torch.sigmoid(output).squeeze().cpu().numpy()
-
-        # Analyze the mask
-        if prob_map.ndim == 0:
-            nodule_ratio = float(prob_map)
-        else:
-            nodule_ratio = float((prob_map > 0.5).sum()) / max(prob_map.size, 1)
-
-        # Convert to classification result
-        if nodule_ratio < 0.01:
-            predicted_class = "normal"
-            confidence = max(70, (1 - nodule_ratio) * 100)
-            risk_score = nodule_ratio * 100
-        elif nodule_ratio < 0.15:
-            predicted_class = "nodule_benign"
-            confidence = max(60, min(95, nodule_ratio * 400))
-            risk_score = nodule_ratio * 200
-        else:
-            predicted_class = "nodule_malignant"
-            confidence = max(65, min(98, nodule_ratio * 300))
-            risk_score = min(98, nodule_ratio * 400)
-
-        return {
-            "predicted_class": predicted_class,
-            "confidence": round(confidence, 2),
-            "risk_score": round(min(risk_score, 98), 2),
-            "probabilities": {
-                "normal": round(max(0, (1 - nodule_ratio)) * 100, 2),
-                "nodule_benign": round(min(100, nodule_ratio * 200), 2),
-                "nodule_malignant": round(min(100, nodule_ratio * 300), 2),
-            },
-        }
+        return predict_batch([preprocess_image(image)])[0]
     except Exception as e:
         from app.core.logging import logger
         logger.warning(f"CT inference error: {e}, using fallback.")
         return _fallback_prediction()
 
 
+def predict_batch(tensors: list[torch.Tensor]) -> list[dict]:
+    """
+    Run the 3D UNet on a batch of preprocessed pseudo-volumes in one forward pass.
+    Returns one result dict per input, in order.
+    """
+    with use_model() as model:
+        if model is None:
+            return [_fallback_prediction() for _ in tensors]
+
+        try:
+            batch = torch.stack(tensors).to(_device)
+
+            with torch.no_grad():
+                output = model(batch)
+
+            # Sigmoid to get probability map from segmentation output
+            prob_maps = torch.sigmoid(output).cpu().numpy()
+            return registry.stamp([_to_result(prob_map.squeeze()) for prob_map in prob_maps], model)
+        except Exception as e:
+            from app.core.logging import logger
+            logger.warning(f"CT inference error: {e}, using fallback.")
+            return [_fallback_prediction() for _ in tensors]
+
+
+def predict_batch_with_heatmap(tensors: list[torch.Tensor]) -> list[tuple[dict, np.ndarray | None]]:
+    """
+    Run segmentation and Grad-CAM together in one forward pass.
+    Returns one (result, heatmap) pair per input; heatmap is None if it couldn't be computed.
+    """
+    with use_model() as model:
+        if model is None:
+            return [(_fallback_prediction(), None) for _ in tensors]
+
+        try:
+            batch = torch.stack(tensors).to(_device)
+            output, cams = predict_with_gradcam(model, batch, segmentation_score)
+            prob_maps = torch.sigmoid(output).cpu().numpy()
+            results = registry.stamp([_to_result(prob_map.squeeze()) for prob_map in prob_maps], model)
+            return list(zip(results, cams))
+        except Exception as e:
+            from app.core.logging import logger
+            logger.warning(f"Fused CT GradCAM failed: {e}. Running plain inference.")
+            return [(result, None) for result in predict_batch(tensors)]
+
+
+def predict_volume(path: str, filename: str) -> dict:
+    """
+    Run sliding-window 3D segmentation over a NIfTI file or DICOM series and
+    aggregate the mask into the nodule-ratio classification.
+    Also returns `preview` (uint8 middle slice) and `volume` (shape and patch stats).
+    """
+    with use_model() as model:
+        source = load_volume(path, filename)
+        try:
+            preview = middle_slice_preview(source)
+            if model is None:
+                result = _fallback_prediction()
+                result.update(preview=preview, volume={"shape": list(source.shape)})
+                return result
+
+            stats = sliding_window_segment(source, model, _device)
+            nodule_ratio = stats["positive_voxels"] / max(stats["total_voxels"], 1)
+            result = _classify(nodule_ratio)
+            result.update(preview=preview, volume=stats)
+            return result
+        finally:
+            source.close()
+
+
+def _to_result(prob_map: np.ndarray) -> dict:
+    """Convert one segmentation probability map into a classification result."""
+    # Analyze the mask
+    if prob_map.ndim == 0:
+        nodule_ratio = float(prob_map)
+    else:
+        nodule_ratio = float((prob_map > 0.5).sum()) / max(prob_map.size, 1)
+    return _classify(nodule_ratio)
+
+
+def _classify(nodule_ratio: float) -> dict:
+    """Map the fraction of voxels segmented as nodule to a classification result."""
+    # Convert to classification result
+    if nodule_ratio < 0.01:
+        predicted_class = "normal"
+        confidence = max(70, (1 - nodule_ratio) * 100)
+        risk_score = nodule_ratio * 100
+    elif nodule_ratio < 0.15:
+        predicted_class = "nodule_benign"
+        confidence = max(60, min(95, nodule_ratio * 400))
+        risk_score = nodule_ratio * 200
+    else:
+        predicted_class = "nodule_malignant"
+        confidence = max(65, min(98, nodule_ratio * 300))
+        risk_score = min(98, nodule_ratio * 400)
+
+    return {
+        "predicted_class": predicted_class,
+        "confidence": round(confidence, 2),
+        "risk_score": round(min(risk_score, 98), 2),
+        "probabilities": {
+            "normal": round(max(0, (1 - nodule_ratio)) * 100, 2),
+            "nodule_benign": round(min(100, nodule_ratio * 200), 2),
+            "nodule_malignant": round(min(100, nodule_ratio * 300), 2),
+        },
+    }
+
+
 def _fallback_prediction():
     import random
     confidence = round(random.uniform(60, 95), 2)
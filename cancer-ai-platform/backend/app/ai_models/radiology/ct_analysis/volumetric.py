@@ -0,0 +1,300 @@
+"""
+Volumetric CT loading and sliding-window inference for the 3D UNet.
+Volumes are never fully loaded: NIfTI voxels are read region-by-region through a
+memory map, DICOM series are unpacked slice-by-slice into an on-disk memmap, and
+the sliding window keeps only one slab of patch depth in memory at a time.
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+from app.config import settings
+from app.core.logging import logger
+from app.core.uploads import UploadTooLarge
+
+NIFTI_SUFFIXES = (".nii", ".nii.gz")
+DICOM_SUFFIXES = (".dcm", ".zip")
+
+
+def is_volume_file(filename: str | None) -> bool:
+    name = (filename or "").lower()
+    return name.endswith(NIFTI_SUFFIXES + DICOM_SUFFIXES)
+
+
+class VolumeSource:
+    """
+    Read-only (D, H, W) view over voxel data that can be read region-by-region.
+    `data` is anything supporting 3D slicing (a memmap or a nibabel ArrayProxy);
+    `axes` maps (D, H, W) to the axis order of `data`.
+    """
+
+    def __init__(self, data, axes: tuple[int, int, int] = (0, 1, 2), cleanup: list[str] = None):
+        self._data = data
+        self._axes = axes
+        self._cleanup = cleanup or []
+        shape = data.shape[:3]
+        self.shape = tuple(int(shape[a]) for a in axes)
+
+    def read(self, z0: int, z1: int, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        """Read a (D, H, W) region as float32."""
+        bounds = [None, None, None]
+        for axis, (lo, hi) in zip(self._axes, ((z0, z1), (y0, y1), (x0, x1))):
+            bounds[axis] = slice(lo, hi)
+        region = np.asarray(self._data[tuple(bounds)], dtype=np.float32)
+        if region.ndim > 3:
+            # Multi-volume NIfTI (e.g. 4D) — use the first volume
+            region = region[..., 0]
+        return np.transpose(region, self._axes)
+
+    def close(self):
+        self._data = None
+        for path in self._cleanup:
+            _silent_remove(path)
+
+
+def load_volume(path: str, filename: str) -> VolumeSource:
+    """Open a NIfTI file, a single DICOM file, or a zipped DICOM series."""
+    name = filename.lower()
+    if name.endswith(NIFTI_SUFFIXES):
+        return _load_nifti(path, gzipped=name.endswith(".gz"))
+    if name.endswith(".zip"):
+        return _load_dicom_zip(path)
+    return _load_dicom_files([path])
+
+
+def _load_nifti(path: str, gzipped: bool) -> VolumeSource:
+    import nibabel as nib
+
+    cleanup = []
+    if gzipped:
+        # gzip can't be memory-mapped — stream-decompress to a temp .nii first
+        fd, raw_path = tempfile.mkstemp(suffix=".nii", dir=_scratch_dir())
+        try:
+            with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as src:
+                _copy_bounded(src, out, settings.MAX_VOLUME_EXPANDED_SIZE)
+            img = nib.load(raw_path, mmap=True)
+        except BaseException:
+            _silent_remove(raw_path)
+            raise
+        cleanup.append(raw_path)
+    else:
+        img = nib.load(path, mmap=True)
+
+    # NIfTI is stored (X, Y, Z); the model wants (D, H, W) = (Z, Y, X)
+    return VolumeSource(img.dataobj, axes=(2, 1, 0), cleanup=cleanup)
+
+
+def _load_dicom_zip(path: str) -> VolumeSource:
+    """
+    Unpack a zipped DICOM series to scratch and read it. Declared sizes and the slice count
+    are checked first, and the bytes actually inflated are counted against
+    MAX_VOLUME_EXPANDED_SIZE, so a zip bomb never fills the disk.
+    """
+    extract_dir = tempfile.mkdtemp(dir=_scratch_dir())
+    try:
+        files = []
+        with zipfile.ZipFile(path) as zf:
+            members = [
+                member for member in zf.infolist()
+                if not member.is_dir() and not os.path.basename(member.filename).startswith(".")
+            ]
+            if len(members) > settings.MAX_VOLUME_SLICES:
+                raise ValueError(f"DICOM archive holds {len(members)} files, more than the {settings.MAX_VOLUME_SLICES} allowed")
+            budget = settings.MAX_VOLUME_EXPANDED_SIZE
+            if sum(member.file_size for member in members) > budget:
+                raise UploadTooLarge(f"DICOM archive expands past the {budget // (1024 * 1024)} MB limit")
+            for member in members:
+                target = os.path.join(extract_dir, f"{len(files):06d}.dcm")
+                with zf.open(member) as src, open(target, "wb") as out:
+                    budget -= _copy_bounded(src, out, budget)
+                files.append(target)
+        return _load_dicom_files(files)
+    finally:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+
+
+def _copy_bounded(src, out, limit: int) -> int:
+    """Copy a decompressing stream in chunks; raises UploadTooLarge once more than `limit` bytes come out."""
+    written = 0
+    for chunk in iter(lambda: src.read(1024 * 1024), b""):
+        written += len(chunk)
+        if written > limit:
+            raise UploadTooLarge(
+                f"Volume expands past the {settings.MAX_VOLUME_EXPANDED_SIZE // (1024 * 1024)} MB limit"
+            )
+        out.write(chunk)
+    return written
+
+
+def _load_dicom_files(files: list[str]) -> VolumeSource:
+    import pydicom
+
+    # Read headers only, then order slices along the scan axis
+    headers = []
+    for f in files:
+        try:
+            ds = pydicom.dcmread(f, stop_before_pixels=True)
+        except Exception:
+            continue
+        if "Rows" not in ds or "Columns" not in ds:
+            continue
+        position = getattr(ds, "ImagePositionPatient", None)
+        z = float(position[2]) if position else float(getattr(ds, "InstanceNumber", len(headers)))
+        headers.append((z, f, int(ds.Rows), int(ds.Columns)))
+    if not headers:
+        raise ValueError("No readable DICOM slices found")
+    headers.sort(key=lambda h: h[0])
+
+    rows, cols = headers[0][2], headers[0][3]
+    fd, memmap_path = tempfile.mkstemp(suffix=".f32", dir=_scratch_dir())
+    os.close(fd)
+    volume = np.memmap(memmap_path, dtype=np.float32, mode="w+", shape=(len(headers), rows, cols))
+    for i, (_, f, r, c) in enumerate(headers):
+        if (r, c) != (rows, cols):
+            raise ValueError("DICOM series has inconsistent slice dimensions")
+        ds = pydicom.dcmread(f)
+        slope = float(getattr(ds, "RescaleSlope", 1) or 1)
+        intercept = float(getattr(ds, "RescaleIntercept", 0) or 0)
+        volume[i] = ds.pixel_array.astype(np.float32) * slope + intercept
+    volume.flush()
+    del volume
+
+    readonly = np.memmap(memmap_path, dtype=np.float32, mode="r", shape=(len(headers), rows, cols))
+    return VolumeSource(readonly, cleanup=[memmap_path])
+
+
+# ── Sliding-window inference ─────────────────────────────
+def gaussian_importance_map(patch_size: tuple[int, int, int], sigma_scale: float = 0.125) -> np.ndarray:
+    """Gaussian weights peaking at the patch centre, so overlapping patches blend smoothly."""
+    axes = []
+    for size in patch_size:
+        coords = np.arange(size, dtype=np.float32) - (size - 1) / 2
+        sigma = max(size * sigma_scale, 1e-3)
+        axes.append(np.exp(-(coords ** 2) / (2 * sigma ** 2)))
+    weights = axes[0][:, None, None] * axes[1][None, :, None] * axes[2][None, None, :]
+    weights /= weights.max()
+    return np.maximum(weights, 1e-3).astype(np.float32)
+
+
+def _window_starts(size: int, patch: int, step: int) -> list[int]:
+    if size <= patch:
+        return [0]
+    starts = list(range(0, size - patch + 1, step))
+    if starts[-1] != size - patch:
+        starts.append(size - patch)
+    return starts
+
+
+def sliding_window_segment(
+    source: VolumeSource,
+    model,
+    device,
+    patch_size: tuple[int, int, int] = None,
+    overlap: float = None,
+    batch_size: int = None,
+    threshold: float = 0.5,
+) -> dict:
+    """
+    Run overlapping-patch inference over the whole volume with Gaussian blending.
+    Patches are processed slab-by-slab along the depth axis; planes are thresholded and
+    counted as soon as no later patch can touch them, so peak memory is one slab of
+    accumulators plus one batch of patches regardless of volume depth.
+    Returns {positive_voxels, total_voxels, max_prob, shape, patches}.
+    """
+    import torch  # only needed once a volume is actually segmented
+    patch_size = tuple(patch_size or settings.CT_PATCH_SIZE)
+    overlap = settings.CT_PATCH_OVERLAP if overlap is None else overlap
+    batch_size = batch_size or settings.CT_PATCH_BATCH_SIZE
+
+    D, H, W = source.shape
+    pd, ph, pw = patch_size
+    steps = [max(1, int(p * (1 - overlap))) for p in patch_size]
+    z_starts = _window_starts(D, pd, steps[0])
+    yx_starts = [(y, x) for y in _window_starts(H, ph, steps[1]) for x in _window_starts(W, pw, steps[2])]
+    importance = gaussian_importance_map(patch_size)
+
+    # Accumulators cover planes [base, base + pd)
+    prob_acc = np.zeros((pd, H, W), dtype=np.float32)
+    weight_acc = np.zeros((pd, H, W), dtype=np.float32)
+    base = 0
+    stats = {"positive_voxels": 0, "total_voxels": 0, "max_prob": 0.0, "patches": 0}
+
+    def finalize(n_planes: int):
+        if n_planes <= 0:
+            return
+        probs = prob_acc[:n_planes] / np.maximum(weight_acc[:n_planes], 1e-6)
+        stats["positive_voxels"] += int((probs > threshold).sum())
+        stats["total_voxels"] += probs.size
+        stats["max_prob"] = max(stats["max_prob"], float(probs.max()))
+
+    def shift(n_planes: int):
+        prob_acc[:-n_planes] = prob_acc[n_planes:]
+        weight_acc[:-n_planes] = weight_acc[n_planes:]
+        prob_acc[-n_planes:] = 0
+        weight_acc[-n_planes:] = 0
+
+    pad_value = _normalize(np.array([settings.CT_HU_WINDOW[0]], dtype=np.float32))[0]
+
+    for z0 in z_starts:
+        if z0 > base:
+            done = z0 - base
+            finalize(done)
+            shift(done)
+            base = z0
+
+        for i in range(0, len(yx_starts), batch_size):
+            coords = yx_starts[i:i + batch_size]
+            patches = np.full((len(coords), 1, pd, ph, pw), pad_value, dtype=np.float32)
+            extents = []
+            for j, (y0, x0) in enumerate(coords):
+                region = _normalize(source.read(z0, min(z0 + pd, D), y0, min(y0 + ph, H), x0, min(x0 + pw, W)))
+                d, h, w = region.shape
+                patches[j, 0, :d, :h, :w] = region
+                extents.append((y0, x0, d, h, w))
+
+            with torch.no_grad():
+                output = model(torch.from_numpy(patches).to(device))
+                probs = torch.sigmoid(output).cpu().numpy()[:, 0]
+            stats["patches"] += len(coords)
+
+            dz = z0 - base
+            for prob, (y0, x0, d, h, w) in zip(probs, extents):
+                weights = importance[:d, :h, :w]
+                prob_acc[dz:dz + d, y0:y0 + h, x0:x0 + w] += prob[:d, :h, :w] * weights
+                weight_acc[dz:dz + d, y0:y0 + h, x0:x0 + w] += weights
+
+    finalize(min(pd, D - base))
+    stats["shape"] = [D, H, W]
+    return stats
+
+
+def _normalize(hu: np.ndarray) -> np.ndarray:
+    """Clip to the configured HU window and map to [-1, 1] like the 2D preprocessing."""
+    lo, hi = settings.CT_HU_WINDOW
+    scaled = (np.clip(hu, lo, hi) - lo) / max(hi - lo, 1e-6)
+    return (scaled - 0.5) / 0.5
+
+
+def middle_slice_preview(source: VolumeSource) -> np.ndarray:
+    """uint8 (H, W) preview of the middle axial slice, for the viewer and heatmaps."""
+    D, H, W = source.shape
+    mid = D // 2
+    plane = (_normalize(source.read(mid, mid + 1, 0, H, 0, W)[0]) + 1) / 2
+    return (plane * 255).astype(np.uint8)
+
+
+def _scratch_dir() -> str:
+    path = os.path.join(settings.UPLOAD_DIR, "tmp")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _silent_remove(path: str):
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.debug(f"Could not remove scratch file {path}: {e}")
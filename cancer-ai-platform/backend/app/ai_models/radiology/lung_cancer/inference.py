@@ -3,9 +3,17 @@ Lung cancer inference — takes a PIL Image, returns prediction.
 """
 import torch
 import torch.nn.functional as F
+import numpy as np
 from PIL import Image
 
-from app.ai_models.radiology.lung_cancer.model import get_model, preprocess, CLASSES, _device
+from app.ai_models import registry
+from app.ai_models.explainability.fused import predict_with_gradcam, classifier_score
+from app.ai_models.radiology.lung_cancer.model import get_model, use_model, preprocess, CLASSES, _device
+
+
+def preprocess_image(image: Image.Image) -> torch.Tensor:
+    """Preprocess a PIL Image into a single (C, H, W) input tensor."""
+    return preprocess(image.convert("RGB"))
 
 
 def predict(image: Image.Image) -> dict:
@@ -17,12 +25,50 @@ def predict(image: Image.Image) -> dict:
     if model is None:
         return _fallback_prediction()
 
-    img_tensor = preprocess(image.convert("RGB")).unsqueeze(0).to(_device)
+    return predict_batch([preprocess_image(image)])[0]
+
+
+def predict_batch(tensors: list[torch.Tensor]) -> list[dict]:
+    """
+    Run lung cancer inference on a batch of preprocessed tensors in one forward pass.
+    Returns one result dict per input, in order.
+    """
+    with use_model() as model:
+        if model is None:
+            return [_fallback_prediction() for _ in tensors]
+
+        batch = torch.stack(tensors).to(_device)
+
+        with torch.no_grad():
+            output = model(batch)
+            probabilities = F.softmax(output, dim=1).cpu().numpy()
+
+        return registry.stamp([_to_result(p) for p in probabilities], model)
+
+
+def predict_batch_with_heatmap(tensors: list[torch.Tensor]) -> list[tuple[dict, np.ndarray | None]]:
+    """
+    Run inference and Grad-CAM together in one forward pass.
+    Returns one (result, heatmap) pair per input; heatmap is None if it couldn't be computed.
+    """
+    with use_model() as model:
+        if model is None:
+            return [(_fallback_prediction(), None) for _ in tensors]
+
+        try:
+            batch = torch.stack(tensors).to(_device)
+            output, cams = predict_with_gradcam(model, batch, classifier_score)
+            probabilities = F.softmax(output, dim=1).cpu().numpy()
+            results = registry.stamp([_to_result(p) for p in probabilities], model)
+            return list(zip(results, cams))
+        except Exception as e:
+            from app.core.logging import logger
+            logger.warning(f"Fused lung GradCAM failed: {e}. Running plain inference.")
+            return [(result, None) for result in predict_batch(tensors)]
 
-    with torch.no_grad():
-        output = model(img_tensor)
-        probabilities = F.softmax(output, dim=1).squeeze().cpu().numpy()
 
+def _to_result(probabilities) -> dict:
+    """Convert one row of class probabilities into a result dict."""
     pred_idx = probabilities.argmax()
     predicted_class = CLASSES[pred_idx]
     confidence = float(probabilities[pred_idx]) * 100
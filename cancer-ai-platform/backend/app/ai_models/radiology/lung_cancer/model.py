@@ -8,8 +8,8 @@ import torch.nn as nn
 from torchvision import transforms, models
 from pathlib import Path
 from app.core.logging import logger
+from app.ai_models import registry
 
-_model = None
 _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 CLASSES = ["normal", "nodule_benign", "nodule_malignant"]
@@ -31,39 +31,46 @@ def _build_model(num_classes=len(CLASSES)):
 
 def load_model(model_path: str):
     """Load the lung cancer .pt model."""
-    global _model
     path = Path(model_path)
     if not path.exists():
         logger.warning(f"Lung model not found at {model_path}. Using pretrained ResNet50 as fallback.")
-        _model = models.resnet50(weights=models.ResNet50_Weights.DEFAULT)
-        _model.fc = nn.Linear(_model.fc.in_features, len(CLASSES))
-        _model.eval()
+        model = models.resnet50(weights=models.ResNet50_Weights.DEFAULT)
+        model.fc = nn.Linear(model.fc.in_features, len(CLASSES))
+        model.eval()
+        registry.mark_fallback(model)
     else:
         try:
             checkpoint = torch.load(model_path, map_location=_device, weights_only=False)
             if isinstance(checkpoint, dict) and "fc.weight" in checkpoint:
                 # It's a state_dict — determine num_classes from fc layer
                 num_classes = checkpoint["fc.weight"].shape[0]
-                _model = _build_model(num_classes)
-                _model.load_state_dict(checkpoint, strict=True)
+                model = _build_model(num_classes)
+                model.load_state_dict(checkpoint, strict=True)
             elif isinstance(checkpoint, dict):
                 # Try loading as state_dict with flexible matching
-                _model = _build_model()
-                _model.load_state_dict(checkpoint, strict=False)
+                model = _build_model()
+                model.load_state_dict(checkpoint, strict=False)
             else:
                 # It's a full model object
-                _model = checkpoint
-            _model.eval()
+                model = checkpoint
+            model.eval()
             logger.info(f"Lung cancer model loaded from {model_path}")
         except Exception as e:
             logger.error(f"Failed to load lung model: {e}. Using fallback.")
-            _model = models.resnet50(weights=models.ResNet50_Weights.DEFAULT)
-            _model.fc = nn.Linear(_model.fc.in_features, len(CLASSES))
-            _model.eval()
+            model = models.resnet50(weights=models.ResNet50_Weights.DEFAULT)
+            model.fc = nn.Linear(model.fc.in_features, len(CLASSES))
+            model.eval()
+            registry.mark_fallback(model)
 
-    _model.to(_device)
-    return _model
+    model.to(_device)
+    return model
 
 
 def get_model():
-    return _model
+    """The current model, loaded on first use (see app.ai_models.registry)."""
+    return registry.get("lung")
+
+
+def use_model():
+    """Lease the current model for one inference call: `with use_model() as model:`."""
+    return registry.lease("lung")
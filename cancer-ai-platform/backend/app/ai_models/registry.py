@@ -0,0 +1,398 @@
+"""
+Model registry — the single owner of loaded models.
+Each model is loaded on first use, the loaded set is kept under MODEL_MEMORY_BUDGET_MB
+by evicting the least recently used, and a model whose checkpoint in models_storage/
+changes is reloaded and swapped in without a restart. Inference runs under a lease:
+a replaced or evicted version is released only when its last lease ends, so in-flight
+requests drain on the version they started with.
+Loader modules (and with them torch / TensorFlow) are imported only when needed, and
+each newly loaded version runs a synthetic warm-up batch before it serves requests.
+Inference stamps its results with the fingerprint of the version that produced them
+(`stamp`), so cached outputs are keyed by the weights that actually ran; versions built
+from fallback weights (`mark_fallback`) stamp nothing.
+"""
+import asyncio
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from PIL import Image
+
+from app.config import settings
+from app.core.logging import logger
+from app.ai_models.fingerprint import file_fingerprint
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    key: str
+    loader: str  # "module:function" taking the checkpoint path
+    inference: str  # module providing preprocess_image (used for warm-up)
+    path_setting: str
+    framework: str  # torch | tensorflow
+
+    @property
+    def path(self) -> str:
+        return getattr(settings, self.path_setting)
+
+
+SPECS = {
+    spec.key: spec for spec in (
+        ModelSpec("lung", "app.ai_models.radiology.lung_cancer.model:load_model",
+                  "app.ai_models.radiology.lung_cancer.inference", "LUNG_MODEL_PATH", "torch"),
+        ModelSpec("brain", "app.ai_models.radiology.brain_tumor.mri_model:load_model",
+                  "app.ai_models.radiology.brain_tumor.inference", "BRAIN_MODEL_PATH", "torch"),
+        ModelSpec("ct", "app.ai_models.radiology.ct_analysis.ct_model:load_model",
+                  "app.ai_models.radiology.ct_analysis.inference", "CT_MODEL_PATH", "torch"),
+        ModelSpec("blood", "app.ai_models.pathology.blood_cancer_model:load_model",
+                  "app.ai_models.pathology.inference", "BLOOD_MODEL_PATH", "tensorflow"),
+    )
+}
+
+
+_FALLBACK_ATTR = "_registry_fallback"
+
+
+def mark_fallback(model):
+    """For loaders: flag a model built without its checkpoint's weights (generic or random)."""
+    setattr(model, _FALLBACK_ATTR, True)
+    return model
+
+
+@dataclass(eq=False)
+class _Version:
+    spec: ModelSpec
+    model: object  # None when the loader fell back to simulated predictions
+    fingerprint: str
+    size_bytes: int
+    load_seconds: float = 0.0
+    warmup_seconds: float = 0.0
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    leases: int = 0
+    retired: bool = False
+
+    @property
+    def fallback(self) -> bool:
+        """Simulated (no model) or built from fallback weights — outputs must not be cached."""
+        return self.model is None or getattr(self.model, _FALLBACK_ATTR, False)
+
+
+def _model_bytes(model, framework: str) -> int:
+    """Approximate resident size of a model's weights."""
+    if model is None:
+        return 0
+    try:
+        if framework == "torch":
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        return int(model.count_params()) * 4
+    except Exception:
+        return 0
+
+
+def _warm_up(spec: ModelSpec, model):
+    """
+    Push synthetic batches (size 1 and BATCH_MAX_SIZE) through a freshly loaded model so
+    cuDNN / oneDNN kernel selection and lazy initialisation happen before real traffic.
+    """
+    if spec.framework == "tensorflow":
+        import numpy as np
+        sample = importlib.import_module(spec.inference).preprocess_image(Image.new("RGB", (224, 224)))
+        for batch_size in sorted({1, settings.BATCH_MAX_SIZE}):
+            model.predict(np.concatenate([sample] * batch_size, axis=0), verbose=0)
+        return
+
+    import torch
+    device = next(model.parameters()).device
+    if spec.key == "ct":
+        # The 3D UNet serves sliding-window patches of volumetric uploads
+        batches = [torch.zeros(settings.CT_PATCH_BATCH_SIZE, 1, *settings.CT_PATCH_SIZE)]
+    else:
+        sample = importlib.import_module(spec.inference).preprocess_image(Image.new("RGB", (224, 224)))
+        batches = [torch.stack([sample] * n) for n in sorted({1, settings.BATCH_MAX_SIZE})]
+    with torch.no_grad():
+        for batch in batches:
+            model(batch.to(device))
+
+
+class ModelRegistry:
+    def __init__(self, budget_bytes: int = 0):
+        self.budget_bytes = budget_bytes  # 0 = unlimited
+        self._lock = threading.Lock()
+        self._load_locks = {key: threading.Lock() for key in SPECS}
+        self._current: OrderedDict[str, _Version] = OrderedDict()  # least recently used first
+        self._draining: list[_Version] = []
+        self._stats = {"loads": 0, "reloads": 0, "evictions": 0, "load_seconds": 0.0}
+        self._last_reload_check = time.monotonic()
+
+    # ── Access ───────────────────────────────────────────
+    def get(self, key: str):
+        """The current model for `key`, loading it if needed (no lease — prefer `lease`)."""
+        version = self._acquire(key)
+        model = version.model
+        self._release(version)
+        return model
+
+    @contextmanager
+    def lease(self, key: str):
+        """Hold the current version of `key` for the duration of an inference call."""
+        version = self._acquire(key)
+        try:
+            yield version.model
+        finally:
+            self._release(version)
+
+    def _acquire(self, key: str) -> _Version:
+        with self._lock:
+            version = self._current.get(key)
+            if version is not None:
+                return self._checkout(version)
+
+        # One load per model at a time; other models stay available meanwhile
+        with self._load_locks[key]:
+            with self._lock:
+                version = self._current.get(key)
+                if version is not None:
+                    return self._checkout(version)
+            version = self._load(SPECS[key])
+            with self._lock:
+                self._install(version)
+                return self._checkout(version)
+
+    def _checkout(self, version: _Version) -> _Version:
+        version.leases += 1
+        version.last_used = time.time()
+        self._current.move_to_end(version.spec.key)
+        return version
+
+    def _release(self, version: _Version):
+        with self._lock:
+            version.leases -= 1
+            if version.retired and version.leases == 0 and version in self._draining:
+                self._draining.remove(version)
+                self._dispose(version)
+
+    # ── Loading, eviction, reload ────────────────────────
+    def _load(self, spec: ModelSpec) -> _Version:
+        module_name, func_name = spec.loader.split(":")
+        loader = getattr(importlib.import_module(module_name), func_name)
+        started = time.perf_counter()
+        fingerprint = file_fingerprint(spec.path)
+        try:
+            model = loader(spec.path)
+        except Exception as e:
+            # Serve simulated predictions until the checkpoint changes, rather than retrying per request
+            logger.warning(f"Model {spec.key} failed to load: {e}")
+            model = None
+        elapsed = time.perf_counter() - started
+        size = _model_bytes(model, spec.framework)
+        self._stats["loads"] += 1
+        self._stats["load_seconds"] += elapsed
+        logger.info(f"Model {spec.key} ({fingerprint}) loaded in {elapsed:.2f}s, {size / 2 ** 20:.0f} MB")
+
+        warmup = 0.0
+        if model is not None and settings.MODEL_WARMUP:
+            started = time.perf_counter()
+            try:
+                _warm_up(spec, model)
+            except Exception as e:
+                logger.warning(f"Model {spec.key} warm-up failed: {e}")
+            warmup = time.perf_counter() - started
+        return _Version(spec=spec, model=model, fingerprint=fingerprint, size_bytes=size,
+                        load_seconds=elapsed, warmup_seconds=warmup)
+
+    def _install(self, version: _Version):
+        """Make `version` current (retiring what it replaces) and evict down to the budget. Holds _lock."""
+        previous = self._current.pop(version.spec.key, None)
+        self._current[version.spec.key] = version
+        if previous is not None:
+            self._retire(previous)
+        if not self.budget_bytes:
+            return
+        for key in list(self._current):
+            if sum(v.size_bytes for v in self._current.values()) <= self.budget_bytes:
+                break
+            if key == version.spec.key:
+                continue
+            evicted = self._current.pop(key)
+            self._stats["evictions"] += 1
+            logger.info(f"Model {key} evicted (memory budget {self.budget_bytes / 2 ** 20:.0f} MB)")
+            self._retire(evicted)
+
+    def _resident_bytes(self) -> int:
+        return sum(v.size_bytes for v in self._current.values()) + sum(v.size_bytes for v in self._draining)
+
+    def _retire(self, version: _Version):
+        version.retired = True
+        if version.leases == 0:
+            self._dispose(version)
+        else:
+            self._draining.append(version)
+
+    @staticmethod
+    def _dispose(version: _Version):
+        if version.model is not None and version.spec.framework == "torch":
+            from app.ai_models.explainability.gradcam import release_gradcam
+            release_gradcam(version.model)
+        version.model = None
+
+    def reload_changed(self) -> list[str]:
+        """Reload every loaded model whose checkpoint changed on disk. Returns the reloaded keys."""
+        self._last_reload_check = time.monotonic()
+        with self._lock:
+            loaded = list(self._current.values())
+        reloaded = []
+        for old in loaded:
+            if file_fingerprint(old.spec.path) == old.fingerprint:
+                continue
+            with self._load_locks[old.spec.key]:
+                with self._lock:
+                    if self._current.get(old.spec.key) is not old:
+                        continue
+                version = self._load(old.spec)
+                with self._lock:
+                    self._install(version)
+            self._stats["reloads"] += 1
+            reloaded.append(old.spec.key)
+            logger.info(f"Model {old.spec.key} hot-swapped {old.fingerprint} → {version.fingerprint}")
+        return reloaded
+
+    def maybe_reload(self) -> list[str]:
+        """`reload_changed` at most once per MODEL_RELOAD_INTERVAL_SECONDS (for loops without a watcher)."""
+        interval = settings.MODEL_RELOAD_INTERVAL_SECONDS
+        if interval <= 0 or time.monotonic() - self._last_reload_check < interval:
+            return []
+        return self.reload_changed()
+
+    def version_of(self, model) -> str | None:
+        """Fingerprint of the (current or draining) version holding `model`; None for fallbacks."""
+        with self._lock:
+            for version in list(self._current.values()) + self._draining:
+                if version.model is model:
+                    return None if version.fallback else version.fingerprint
+        return None
+
+    def available(self, key: str) -> bool:
+        """
+        Whether `key` serves a real model, without loading it: the loaded version if there
+        is one, otherwise whether its checkpoint exists.
+        """
+        with self._lock:
+            version = self._current.get(key)
+            if version is not None:
+                return version.model is not None
+        return os.path.exists(SPECS[key].path)
+
+    def unload(self, key: str):
+        with self._lock:
+            version = self._current.pop(key, None)
+            if version is not None:
+                self._retire(version)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "load_seconds": round(self._stats["load_seconds"], 2),
+                "budget_mb": round(self.budget_bytes / 2 ** 20, 1),
+                "resident_mb": round(self._resident_bytes() / 2 ** 20, 1),
+                "loaded": [
+                    {
+                        "key": v.spec.key,
+                        "version": v.fingerprint,
+                        "simulated": v.model is None,
+                        "fallback": v.fallback,
+                        "size_mb": round(v.size_bytes / 2 ** 20, 1),
+                        "load_seconds": round(v.load_seconds, 3),
+                        "warmup_seconds": round(v.warmup_seconds, 3),
+                        "leases": v.leases,
+                        "idle_seconds": round(time.time() - v.last_used, 1),
+                    }
+                    for v in reversed(self._current.values())
+                ],
+                "draining": [{"key": v.spec.key, "version": v.fingerprint, "leases": v.leases} for v in self._draining],
+            }
+
+
+_registry = ModelRegistry(settings.MODEL_MEMORY_BUDGET_MB * 2 ** 20)
+_watcher: asyncio.Task | None = None
+
+
+def get(key: str):
+    return _registry.get(key)
+
+
+def lease(key: str):
+    return _registry.lease(key)
+
+
+def preload(keys: list[str]) -> dict:
+    """
+    Load (and warm up) models ahead of the first request (MODEL_PRELOAD / a worker's
+    assignment), each in its own thread. Returns {key: seconds}.
+    """
+    def load(key: str) -> float:
+        started = time.perf_counter()
+        _registry.get(key)
+        return round(time.perf_counter() - started, 3)
+
+    if not keys:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(keys), thread_name_prefix="model-load") as pool:
+        return dict(zip(keys, pool.map(load, keys)))
+
+
+def available(key: str) -> bool:
+    return _registry.available(key)
+
+
+def stamp(results: list[dict], model) -> list[dict]:
+    """
+    Tag inference results (call under the lease) with the version of `model` as
+    "model_version" — None for fallback weights, which the inference cache skips.
+    """
+    version = _registry.version_of(model)
+    for result in results:
+        result["model_version"] = version
+    return results
+
+
+def maybe_reload() -> list[str]:
+    return _registry.maybe_reload()
+
+
+def stats() -> dict:
+    return _registry.stats()
+
+
+async def _watch():
+    while True:
+        await asyncio.sleep(settings.MODEL_RELOAD_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_registry.reload_changed)
+        except Exception as e:
+            logger.warning(f"Model reload check failed: {e}")
+
+
+def start_watcher():
+    """Poll models_storage/ checkpoints for changes (stat calls; hashing only when mtime/size move)."""
+    global _watcher
+    if settings.MODEL_RELOAD_INTERVAL_SECONDS > 0 and _watcher is None:
+        _watcher = asyncio.get_running_loop().create_task(_watch())
+
+
+async def stop_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        try:
+            await _watcher
+        except asyncio.CancelledError:
+            pass
+        _watcher = None
@@ -0,0 +1,327 @@
+"""
+Optional process-pool inference workers.
+Each worker process owns a subset of the models and runs them with a pinned
+intra-op thread count, so PyTorch, TensorFlow and the API's own Python work stop
+competing for the GIL and the same cores. Images reach workers through shared
+memory; crashed workers are restarted automatically.
+"""
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from app.ai_models.batching import deliver
+from app.config import settings
+from app.core.logging import logger
+
+MODEL_KEYS = ("lung", "brain", "ct", "blood")
+# How long a request waits for a pool that is still being started before giving up
+POOL_START_WAIT_SECONDS = 30.0
+
+_pool: "InferencePool | None" = None
+
+
+class PoolUnavailable(RuntimeError):
+    """Worker mode is on but the pool isn't running (still starting, or failed to start)."""
+
+
+def model_key(cancer_type: str) -> str:
+    """Worker model key that serves a cancer type."""
+    if cancer_type in ("ct", "bone"):
+        return "ct"
+    if cancer_type in ("brain", "blood"):
+        return cancer_type
+    return "lung"
+
+
+# ── Worker process ───────────────────────────────────────
+def _worker_main(index: int, models: list[str], threads: int, requests, results):
+    """Entry point of a worker process: load assigned models, then serve requests."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    if any(m != "blood" for m in models):
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    from app.ai_models import registry
+    registry.preload(models)
+    logger.info(f"Inference worker {index} (pid {os.getpid()}) serving {models} with {threads} thread(s)")
+    # Tell the pool this worker's models are loaded and warm
+    results.put((None, True, index))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, op, key, payload = request
+        # Pick up replaced checkpoints between requests (throttled to MODEL_RELOAD_INTERVAL_SECONDS)
+        registry.maybe_reload()
+        try:
+            if op == "volume":
+                # Volumes are memory-mapped from disk by the worker itself
+                from app.ai_models.radiology.ct_analysis.inference import predict_volume
+                results.put((request_id, True, predict_volume(*payload)))
+                continue
+            shm_name, shape = payload
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                image = Image.fromarray(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy())
+            finally:
+                shm.close()
+            results.put((request_id, True, _run(op, key, image)))
+        except Exception as e:
+            results.put((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+def _run(op: str, key: str, image: Image.Image):
+    if key == "blood":
+        from app.ai_models.pathology.inference import predict
+        return predict(image)
+
+    if key == "brain":
+        from app.ai_models.radiology.brain_tumor import inference
+    elif key == "ct":
+        from app.ai_models.radiology.ct_analysis import inference
+    else:
+        from app.ai_models.radiology.lung_cancer import inference
+
+    if op == "explain":
+        return inference.predict_batch_with_heatmap([inference.preprocess_image(image)])[0]
+    return inference.predict(image)
+
+
+# ── API-side pool ────────────────────────────────────────
+class _Worker:
+    def __init__(self, index: int, models: list[str]):
+        self.index = index
+        self.models = models
+        self.process = None
+        self.requests = None
+        self.in_flight: set[int] = set()
+        self.restarts = 0
+        self.loaded = False
+
+
+class InferencePool:
+    """
+    Pool of worker processes. `submit()` copies the image into shared memory, routes it
+    to the least-busy worker that owns the model and returns a Future with the result.
+    """
+
+    def __init__(self, num_workers: int, threads: int, assignments: list[str]):
+        self._ctx = mp.get_context("spawn")
+        self._threads = max(1, threads)
+        self._results = self._ctx.Queue()
+        self._workers = [_Worker(i, self._models_for(i, assignments)) for i in range(num_workers)]
+        self._pending: dict[int, tuple[Future, int, shared_memory.SharedMemory | None]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._threads_started = []
+
+    @staticmethod
+    def _models_for(index: int, assignments: list[str]) -> list[str]:
+        if not assignments:
+            return list(MODEL_KEYS)
+        group = assignments[index % len(assignments)]
+        return [m.strip() for m in group.split(",") if m.strip() in MODEL_KEYS]
+
+    def start(self):
+        for worker in self._workers:
+            self._spawn(worker)
+        for target in (self._collect_results, self._supervise):
+            thread = threading.Thread(target=target, name=f"inference-pool-{target.__name__}", daemon=True)
+            thread.start()
+            self._threads_started.append(thread)
+        logger.info(f"Inference pool started: {len(self._workers)} worker(s), {self._threads} thread(s) each")
+
+    def _spawn(self, worker: _Worker):
+        worker.loaded = False
+        worker.requests = self._ctx.Queue()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.models, self._threads, worker.requests, self._results),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def ready(self) -> bool:
+        """Every worker has loaded (and warmed up) its models."""
+        return all(w.loaded for w in self._workers)
+
+    def serves(self, key: str) -> bool:
+        return any(key in w.models for w in self._workers)
+
+    def submit(self, key: str, image: Image.Image, op: str = "predict") -> Future:
+        """Run `op` ("predict" or "explain") on an image in a worker that owns `key`."""
+        array = np.asarray(image.convert("RGB"), dtype=np.uint8)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[:] = array
+        try:
+            return self._dispatch(key, op, (shm.name, array.shape), shm)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+    def submit_volume(self, path: str, filename: str) -> Future:
+        """Run sliding-window CT inference on a volume file in a worker that owns the CT model."""
+        return self._dispatch("ct", "volume", (path, filename), None)
+
+    def _dispatch(self, key: str, op: str, payload, shm) -> Future:
+        candidates = [w for w in self._workers if key in w.models]
+        if not candidates:
+            raise RuntimeError(f"No inference worker serves the '{key}' model")
+
+        # Running futures can't be cancelled, so a client that disconnects (cancelling
+        # `wrap_future`) can't race the collector delivering its result
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            worker = min(candidates, key=lambda w: len(w.in_flight))
+            request_id = next(self._ids)
+            self._pending[request_id] = (future, worker.index, shm)
+            worker.in_flight.add(request_id)
+            worker.requests.put((request_id, op, key, payload))
+        return future
+
+    async def infer(self, key: str, image: Image.Image, op: str = "predict"):
+        return await asyncio.wrap_future(self.submit(key, image, op))
+
+    async def infer_volume(self, path: str, filename: str) -> dict:
+        return await asyncio.wrap_future(self.submit_volume(path, filename))
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "worker": w.index,
+                "pid": w.process.pid if w.process else None,
+                "alive": bool(w.process and w.process.is_alive()),
+                "models": w.models,
+                "in_flight": len(w.in_flight),
+                "restarts": w.restarts,
+                "loaded": w.loaded,
+            }
+            for w in self._workers
+        ]
+
+    def _finish(self, request_id: int) -> Future | None:
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is None:
+                return None
+            future, worker_index, shm = entry
+            self._workers[worker_index].in_flight.discard(request_id)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        return future
+
+    def _collect_results(self):
+        while not self._stopped:
+            try:
+                request_id, ok, payload = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if request_id is None:
+                self._workers[payload].loaded = True
+                continue
+            try:
+                future = self._finish(request_id)
+                if future is None:
+                    continue
+                if ok:
+                    deliver(future, result=payload)
+                else:
+                    deliver(future, exception=RuntimeError(payload))
+            except Exception as e:
+                # Never let one result end the thread — later requests would wait forever
+                logger.error(f"Inference pool failed to deliver result {request_id}: {e}")
+
+    def _supervise(self):
+        while not self._stopped:
+            time.sleep(1.0)
+            for worker in self._workers:
+                if self._stopped or worker.process.is_alive():
+                    continue
+                logger.error(
+                    f"Inference worker {worker.index} died (exit code {worker.process.exitcode}); restarting"
+                )
+                with self._lock:
+                    lost = list(worker.in_flight)
+                for request_id in lost:
+                    future = self._finish(request_id)
+                    if future is not None:
+                        deliver(future, exception=RuntimeError(f"Inference worker {worker.index} crashed"))
+                worker.restarts += 1
+                self._spawn(worker)
+
+    def shutdown(self):
+        self._stopped = True
+        for worker in self._workers:
+            try:
+                worker.requests.put(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for request_id in list(self._pending):
+            future = self._finish(request_id)
+            if future is not None:
+                deliver(future, exception=RuntimeError("Inference pool shut down"))
+
+
+def enabled() -> bool:
+    return settings.INFERENCE_WORKERS > 0
+
+
+def start_pool() -> InferencePool:
+    global _pool
+    _pool = InferencePool(
+        settings.INFERENCE_WORKERS,
+        settings.INFERENCE_WORKER_THREADS,
+        settings.INFERENCE_WORKER_MODELS,
+    )
+    _pool.start()
+    return _pool
+
+
+def get_pool() -> "InferencePool | None":
+    return _pool
+
+
+async def acquire_pool() -> InferencePool:
+    """
+    The running pool for an inference call. The app serves requests while the "models"
+    startup stage is still spawning workers; those wait for the pool up to
+    POOL_START_WAIT_SECONDS, then get PoolUnavailable (503).
+    """
+    deadline = time.monotonic() + POOL_START_WAIT_SECONDS
+    while _pool is None:
+        if time.monotonic() >= deadline:
+            raise PoolUnavailable("Inference models are still loading; retry shortly")
+        await asyncio.sleep(0.1)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
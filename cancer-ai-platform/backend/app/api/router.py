@@ -3,7 +3,7 @@ API Router — combines all route modules under /api/v1/.
 """
 from fastapi import APIRouter
 
-from app.api.routes import auth, radiology, pathology, dashboard, reports
+from app.api.routes import auth, radiology, pathology, dashboard, reports, metrics, jobs
 
 api_router = APIRouter(prefix="/api/v1")
 
@@ -12,3 +12,5 @@ api_router.include_router(radiology.router)
 api_router.include_router(pathology.router)
 api_router.include_router(dashboard.router)
 api_router.include_router(reports.router)
+api_router.include_router(jobs.router)
+api_router.include_router(metrics.router)
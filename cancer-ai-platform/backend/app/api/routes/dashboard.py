@@ -1,11 +1,12 @@
 """
 Dashboard API routes — overview stats, risk distribution, recent predictions.
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.session import get_db
 from app.services import dashboard_service
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -18,8 +19,15 @@ async def get_stats(db: AsyncSession = Depends(get_db)):
 
 @router.get("/recent")
 async def get_recent(
-    limit: int = 10,
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = Query(None),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get recent predictions (patient worklist)."""
-    return await dashboard_service.get_recent_predictions(db, limit=limit)
+    """Get recent predictions (patient worklist); the next page's cursor is in X-Next-Cursor."""
+    try:
+        predictions, next_cursor = await dashboard_service.get_recent_predictions(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return predictions
@@ -0,0 +1,141 @@
+"""
+Job API routes — submit analysis / report jobs, poll their state, stream progress (SSE).
+"""
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.session import get_db
+from app.dependencies import get_current_user
+from app.models.job import Job
+from app.models.user import User
+from app.core.constants import JobKind
+from app.core.uploads import UploadTooLarge
+from app.services import job_service
+from app.schemas.job import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+async def _get_owned_job(job_id: str, db: AsyncSession, user: User | None) -> Job:
+    """The job, or 404 if it doesn't exist or belongs to another user (anonymous jobs are open)."""
+    job = await job_service.get_job(job_id, db)
+    if not job or (job.user_id is not None and (user is None or user.id != job.user_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/radiology/analyze", response_model=JobResponse, status_code=202)
+async def submit_radiology(
+    file: UploadFile = File(...),
+    cancer_type: str = Form("lung"),
+    scan_type: str = Form("ct"),
+    patient_id: str = Form(None),
+    patient_name: str = Form(None),
+    patient_age: int = Form(None),
+    user: User | None = Depends(get_current_user),
+):
+    """Queue a radiology analysis (image or NIfTI/DICOM volume); inference and GradCAM run in the job."""
+    params = {
+        "cancer_type": cancer_type,
+        "scan_type": scan_type,
+        "patient_info": {
+            "patient_id": patient_id,
+            "patient_name": patient_name,
+            "patient_age": patient_age,
+        },
+    }
+    try:
+        job = await job_service.submit(
+            JobKind.RADIOLOGY_ANALYZE,
+            params,
+            user_id=user.id if user else None,
+            fileobj=file.file,
+            filename=file.filename,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return JobResponse.model_validate(job)
+
+
+@router.post("/pathology/analyze", response_model=JobResponse, status_code=202)
+async def submit_pathology(
+    file: UploadFile = File(...),
+    patient_id: str = Form(None),
+    patient_name: str = Form(None),
+    patient_age: int = Form(None),
+    wbc: float = Form(None),
+    blast: float = Form(None),
+    hgb: float = Form(None),
+    plt: float = Form(None),
+    user: User | None = Depends(get_current_user),
+):
+    """Queue a blood slide analysis."""
+    biomarkers = None
+    if any(v is not None for v in [wbc, blast, hgb, plt]):
+        biomarkers = {
+            "wbc": wbc,
+            "blast": blast,
+            "hgb": hgb,
+            "plt": plt,
+        }
+
+    params = {
+        "patient_info": {
+            "patient_id": patient_id,
+            "name": patient_name,
+            "age": patient_age,
+        },
+        "biomarkers": biomarkers,
+    }
+    try:
+        job = await job_service.submit(
+            JobKind.PATHOLOGY_ANALYZE,
+            params,
+            user_id=user.id if user else None,
+            fileobj=file.file,
+            filename=file.filename,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return JobResponse.model_validate(job)
+
+
+@router.post("/reports/{prediction_id}", response_model=JobResponse, status_code=202)
+async def submit_report(
+    prediction_id: int,
+    user: User | None = Depends(get_current_user),
+):
+    """Queue clinical report generation (RAG → Gemini) for a prediction."""
+    job = await job_service.submit(
+        JobKind.REPORT_GENERATE,
+        {"prediction_id": prediction_id},
+        user_id=user.id if user else None,
+    )
+    return JobResponse.model_validate(job)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Poll a job's status, stage, progress and — once finished — result or error."""
+    job = await _get_owned_job(job_id, db, user)
+    return JobResponse.model_validate(job)
+
+
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Server-Sent Events stream of per-stage progress, ending with the final result."""
+    await _get_owned_job(job_id, db, user)
+    return StreamingResponse(
+        job_service.stream_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
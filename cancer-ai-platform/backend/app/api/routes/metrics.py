@@ -0,0 +1,71 @@
+"""
+Metrics API routes — runtime counters for tuning inference and caches.
+"""
+from fastapi import APIRouter
+
+from app.ai_models import batching, registry, workers
+from app.core import auth_cache, blob_store, uploads
+from app.services import gemini_service, inference_cache_service, job_service, llm_cache_service, rag_service
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/batching")
+async def batching_stats():
+    """Queue depth and batch-size metrics for each model's micro-batcher."""
+    return batching.all_stats()
+
+
+@router.get("/workers")
+async def worker_stats():
+    """Liveness, model assignment, in-flight requests and restarts for each inference worker."""
+    pool = workers.get_pool()
+    return pool.stats() if pool else []
+
+
+@router.get("/models")
+async def model_stats():
+    """Loaded models (LRU order), memory budget use, draining versions, loads, reloads and evictions."""
+    return registry.stats()
+
+
+@router.get("/jobs")
+async def job_stats():
+    """Job worker count, queue depth and open progress streams."""
+    return job_service.stats()
+
+
+@router.get("/auth-cache")
+async def auth_cache_stats():
+    """Size and hit/miss counters of the verified-token user cache."""
+    return auth_cache.stats()
+
+
+@router.get("/rag-cache")
+async def rag_cache_stats():
+    """Entries, hit rate and evictions of the RAG retrieval cache."""
+    return rag_service.cache_stats()
+
+
+@router.get("/gemini")
+async def gemini_stats():
+    """Request, retry and failure counters plus rate-limiter state for Gemini calls."""
+    return gemini_service.stats()
+
+
+@router.get("/llm-cache")
+async def llm_cache_stats():
+    """Hit rate, stores and coalesced duplicates of the Gemini report cache."""
+    return llm_cache_service.stats()
+
+
+@router.get("/uploads")
+async def upload_stats():
+    """Ingested upload counts and bytes, 413 rejections, current / peak process RSS and blob store writes."""
+    return {**uploads.upload_stats(), "store": blob_store.stats()}
+
+
+@router.get("/inference-cache")
+async def inference_cache_stats():
+    """Hit rate and stores of the image-hash inference cache."""
+    return inference_cache_service.stats()
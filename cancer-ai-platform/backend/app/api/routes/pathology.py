@@ -1,17 +1,19 @@
 """
 Pathology API routes — blood slide upload, analysis, history.
 """
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from PIL import Image
-import io
 import json
 
 from app.database.session import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.services import pathology_service
-from app.schemas.prediction import PredictionResponse
+from app.config import settings
+from app.core.uploads import UploadTooLarge, read_study_images, stage_upload
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, set_next_cursor
+from app.schemas.prediction import PredictionResponse, BatchPredictionResponse
+from app.services.study_service import build_batch_response
 
 router = APIRouter(prefix="/pathology", tags=["pathology"])
 
@@ -30,9 +32,12 @@ async def analyze(
     user: User | None = Depends(get_current_user),
 ):
     """Upload a blood slide image and run blood cancer analysis."""
-    content = await file.read()
     try:
-        image = Image.open(io.BytesIO(content))
+        staged = await stage_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        image = staged.open_image()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid image file")
 
@@ -57,15 +62,74 @@ async def analyze(
         biomarkers=biomarkers,
         db=db,
         user_id=user.id if user else None,
+        original=staged,
     )
 
     return result
 
 
+@router.post("/analyze/batch", response_model=BatchPredictionResponse)
+async def analyze_batch(
+    files: list[UploadFile] = File(...),
+    patient_id: str = Form(None),
+    patient_name: str = Form(None),
+    patient_age: int = Form(None),
+    wbc: float = Form(None),
+    blast: float = Form(None),
+    hgb: float = Form(None),
+    plt: float = Form(None),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Upload all blood slides of a study (images and/or zip archives) and analyze them in batches."""
+    try:
+        decoded = await read_study_images(files, settings.BATCH_MAX_IMAGES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    patient_info = {
+        "patient_id": patient_id,
+        "name": patient_name,
+        "age": patient_age,
+    }
+
+    biomarkers = None
+    if any(v is not None for v in [wbc, blast, hgb, plt]):
+        biomarkers = {
+            "wbc": wbc,
+            "blast": blast,
+            "hgb": hgb,
+            "plt": plt,
+        }
+
+    analyzed = await pathology_service.analyze_batch(
+        images=[(name, image) for name, image, _, _ in decoded if image is not None],
+        originals=[upload for _, image, _, upload in decoded if image is not None],
+        patient_info=patient_info,
+        biomarkers=biomarkers,
+        db=db,
+        user_id=user.id if user else None,
+    )
+
+    return build_batch_response(decoded, analyzed)
+
+
 @router.get("/history")
 async def history(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = Query(None),
     db: AsyncSession = Depends(get_db),
     user: User | None = Depends(get_current_user),
 ):
-    predictions = await pathology_service.get_history(db, user_id=user.id if user else None)
+    """Get a page of pathology prediction history; the next page's cursor is in X-Next-Cursor."""
+    try:
+        predictions, next_cursor = await pathology_service.get_history(
+            db, user_id=user.id if user else None, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
     return [PredictionResponse.model_validate(p) for p in predictions]
@@ -2,16 +2,19 @@
 Radiology API routes — image upload, analysis, history.
 """
 import json
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from PIL import Image
-import io
 
 from app.database.session import get_db
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, require_user
 from app.models.user import User
 from app.services import radiology_service
-from app.schemas.prediction import PredictionResponse
+from app.config import settings
+from app.core.uploads import UploadTooLarge, read_study_images, stage_upload
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, set_next_cursor
+from app.schemas.prediction import PredictionResponse, BatchPredictionResponse
+from app.services.study_service import build_batch_response
+from app.ai_models.radiology.ct_analysis.volumetric import is_volume_file
 
 router = APIRouter(prefix="/radiology", tags=["radiology"])
 
@@ -32,20 +35,79 @@ async def analyze(
         # Allow non-image types for DICOM/NIfTI (they don't have image/ MIME types)
         pass
 
-    content = await file.read()
+    patient_info = {
+        "patient_id": patient_id,
+        "patient_name": patient_name,
+        "patient_age": patient_age,
+    }
+
+    # NIfTI / DICOM volumes go through sliding-window 3D inference
+    if is_volume_file(file.filename):
+        try:
+            return await radiology_service.analyze_volume(
+                fileobj=file.file,
+                filename=file.filename,
+                cancer_type=cancer_type,
+                scan_type=scan_type,
+                patient_info=patient_info,
+                db=db,
+                user_id=user.id if user else None,
+            )
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        staged = await stage_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     try:
-        image = Image.open(io.BytesIO(content))
+        image = staged.open_image()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid image file")
 
+    result = await radiology_service.analyze_image(
+        image=image,
+        cancer_type=cancer_type,
+        scan_type=scan_type,
+        patient_info=patient_info,
+        db=db,
+        user_id=user.id if user else None,
+        original=staged,
+    )
+
+    return result
+
+
+@router.post("/analyze/batch", response_model=BatchPredictionResponse)
+async def analyze_batch(
+    files: list[UploadFile] = File(...),
+    cancer_type: str = Form("lung"),
+    scan_type: str = Form("ct"),
+    patient_id: str = Form(None),
+    patient_name: str = Form(None),
+    patient_age: int = Form(None),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_current_user),
+):
+    """Upload a multi-image study (images and/or zip archives) and analyze it in batches."""
+    try:
+        decoded = await read_study_images(files, settings.BATCH_MAX_IMAGES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     patient_info = {
         "patient_id": patient_id,
         "patient_name": patient_name,
         "patient_age": patient_age,
     }
 
-    result = await radiology_service.analyze_image(
-        image=image,
+    analyzed = await radiology_service.analyze_batch(
+        images=[(name, image) for name, image, _, _ in decoded if image is not None],
+        originals=[upload for _, image, _, upload in decoded if image is not None],
         cancer_type=cancer_type,
         scan_type=scan_type,
         patient_info=patient_info,
@@ -53,14 +115,37 @@ async def analyze(
         user_id=user.id if user else None,
     )
 
-    return result
+    return build_batch_response(decoded, analyzed)
 
 
 @router.get("/history")
 async def history(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = Query(None),
     db: AsyncSession = Depends(get_db),
     user: User | None = Depends(get_current_user),
 ):
-    """Get radiology prediction history."""
-    predictions = await radiology_service.get_history(db, user_id=user.id if user else None)
+    """Get a page of radiology prediction history; the next page's cursor is in X-Next-Cursor."""
+    try:
+        predictions, next_cursor = await radiology_service.get_history(
+            db, user_id=user.id if user else None, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
     return [PredictionResponse.model_validate(p) for p in predictions]
+
+
+@router.get("/{prediction_id}/heatmap")
+async def heatmap(
+    prediction_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_user),
+):
+    """Get the GradCAM overlay for one of your predictions, generating it on first request."""
+    try:
+        heatmap_path = await radiology_service.get_heatmap(prediction_id, db, user_id=user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"prediction_id": prediction_id, "heatmap_path": heatmap_path}
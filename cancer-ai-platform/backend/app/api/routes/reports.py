@@ -1,13 +1,17 @@
 """
 Report API routes — generate and fetch clinical reports.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.session import get_db
+from app.database.session import async_session, get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.services import report_service
+from app.core.logging import logger
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, set_next_cursor
+from app.core.timing import StageTimer
 from app.schemas.report import ReportResponse
 
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -16,27 +20,69 @@ router = APIRouter(prefix="/reports", tags=["reports"])
 @router.post("/generate/{prediction_id}")
 async def generate_report(
     prediction_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     user: User | None = Depends(get_current_user),
 ):
-    """Generate a clinical report from a prediction (RAG → Gemini pipeline)."""
+    """
+    Generate a clinical report from a prediction (RAG → Gemini pipeline).
+    Per-stage durations (db, rag, llm, save) are returned in the Server-Timing header.
+    """
+    timer = StageTimer("db")
     try:
         result = await report_service.generate_report(
             prediction_id=prediction_id,
             db=db,
             user_id=user.id if user else None,
+            on_stage=timer,
         )
-        return result
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=404, detail=str(e), headers={"Server-Timing": timer.header(failed=True)})
+    except Exception as e:
+        logger.error(f"Report generation for prediction #{prediction_id} failed: {e}")
+        raise HTTPException(
+            status_code=500, detail="Report generation failed", headers={"Server-Timing": timer.header(failed=True)}
+        )
+    response.headers["Server-Timing"] = timer.header()
+    return result
+
+
+@router.post("/generate/{prediction_id}/stream")
+async def stream_report(
+    prediction_id: int,
+    user: User | None = Depends(get_current_user),
+):
+    """
+    Generate a report and stream it as Server-Sent Events: each section is sent as soon as
+    Gemini completes it, followed by the saved report.
+    """
+    # A short session of its own: the request-scoped one would stay open for the whole stream
+    async with async_session() as db:
+        prediction = await report_service.get_prediction(prediction_id, db)
+    if not prediction:
+        raise HTTPException(status_code=404, detail=f"Prediction {prediction_id} not found")
+    return StreamingResponse(
+        report_service.stream_report(prediction_id, user_id=user.id if user else None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/", response_model=list[ReportResponse])
 async def list_reports(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = Query(None),
     db: AsyncSession = Depends(get_db),
     user: User | None = Depends(get_current_user),
 ):
-    reports = await report_service.get_reports(db, user_id=user.id if user else None)
+    try:
+        reports, next_cursor = await report_service.get_reports(
+            db, user_id=user.id if user else None, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
     return [ReportResponse.model_validate(r) for r in reports]
 
 
@@ -18,6 +18,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "chronoscan-super-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    PASSWORD_HASH_WORKERS: int = 2  # threads running bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 16  # hashes running or queued at once; extra callers wait
+    AUTH_CACHE_TTL_SECONDS: int = 300  # verified token → user cache; 0 disables
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
 
     # ── Database ─────────────────────────────────────────
     DATABASE_URL: str = f"sqlite+aiosqlite:///{BASE_DIR / 'chronoscan.db'}"
@@ -33,19 +37,89 @@ class Settings(BaseSettings):
     CT_MODEL_PATH: str = str(BASE_DIR / "models_storage" / "ct" / "ct.pth")
     XRAY_MODEL_PATH: str = str(BASE_DIR / "models_storage" / "xray" / "xray.pth")
 
+    # ── Inference batching ───────────────────────────────
+    INFERENCE_BATCHING: bool = True
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 10.0
+
+    # ── Model registry ───────────────────────────────────
+    # Models loaded (and warmed up) at startup; /health/ready waits for them. Others load on first use
+    MODEL_PRELOAD: list[str] = ["lung", "brain", "ct", "blood"]
+    MODEL_MEMORY_BUDGET_MB: int = 0  # evict least recently used models past this; 0 = unlimited
+    MODEL_RELOAD_INTERVAL_SECONDS: float = 5.0  # checkpoint change polling for hot reload; 0 = off
+    MODEL_WARMUP: bool = True  # run synthetic batches through each model right after it loads
+    STARTUP_WAIT_FOR_READY: bool = False  # True = don't serve until models and RAG are ready (no readiness probe)
+
+    # ── Inference cache ──────────────────────────────────
+    INFERENCE_CACHE_ENABLED: bool = True  # reuse model outputs for identical images and checkpoints
+
+    # ── Inference workers ────────────────────────────────
+    INFERENCE_WORKERS: int = 0  # 0 = run models inside the API process
+    INFERENCE_WORKER_THREADS: int = 1  # intra-op threads per worker (PyTorch / TensorFlow)
+    INFERENCE_WORKER_MODELS: list[str] = []  # per-worker model groups, e.g. ["lung,brain", "ct", "blood"]; empty = all
+
+    # ── CT volumetric inference ──────────────────────────
+    CT_PATCH_SIZE: list[int] = [32, 128, 128]  # (D, H, W), each divisible by 16
+    CT_PATCH_OVERLAP: float = 0.25
+    CT_PATCH_BATCH_SIZE: int = 4
+    CT_HU_WINDOW: list[float] = [-1000.0, 400.0]
+
+    # ── Explainability ───────────────────────────────────
+    # on_demand: GradCAM runs when GET /radiology/{id}/heatmap is first called (the viewer does
+    # this when the overlay is shown). background: every analysis also runs a second
+    # forward+backward pass after responding — only worth it if nearly every overlay is viewed.
+    HEATMAP_MODE: str = "on_demand"  # on_demand | background
+
+    # ── Dashboard ────────────────────────────────────────
+    DASHBOARD_SUMMARY_TABLE: bool = True  # keep prediction_stats counters; False = GROUP BY on every load
+
+    # ── Background jobs ──────────────────────────────────
+    JOB_WORKERS: int = 2  # concurrent jobs per API process
+    JOB_MAX_ATTEMPTS: int = 3  # a job interrupted by a restart is retried up to this many times
+    JOB_EVENT_POLL_SECONDS: float = 2.0  # SSE streams re-read the job row this often when idle
+    JOB_LEASE_SECONDS: float = 120.0  # a running job not heartbeating for this long is requeued
+
     # ── Upload ───────────────────────────────────────────
     UPLOAD_DIR: str = str(BASE_DIR / "uploads")
-    MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50MB
+    MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50MB per file
+    MAX_BATCH_UPLOAD_SIZE: int = 1024 * 1024 * 1024  # 1GB per /analyze/batch request (and expanded zip contents)
+    MAX_VOLUME_UPLOAD_SIZE: int = 1024 * 1024 * 1024  # 1GB per NIfTI / DICOM volume
+    MAX_VOLUME_EXPANDED_SIZE: int = 4 * 1024 * 1024 * 1024  # 4GB once a .nii.gz / DICOM zip is decompressed
+    MAX_VOLUME_SLICES: int = 4096  # files in a zipped DICOM series
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # read size when hashing / copying uploads
+    BATCH_MAX_IMAGES: int = 500  # images per /analyze/batch study
 
     # ── Gemini ───────────────────────────────────────────
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-1.5-flash"
+    GEMINI_BASE_URL: str = "https://generativelanguage.googleapis.com/v1beta"
+    GEMINI_TIMEOUT_SECONDS: float = 15.0
+    GEMINI_MAX_CONNECTIONS: int = 10  # keep-alive pool size
+    GEMINI_MAX_CONCURRENCY: int = 4  # in-flight requests
+    GEMINI_REQUESTS_PER_MINUTE: float = 15  # API quota; 0 disables the token bucket
+    GEMINI_BURST: int = 4
+    GEMINI_MAX_RETRIES: int = 3  # on 429 / 5xx / transport errors
+    GEMINI_BACKOFF_BASE_SECONDS: float = 0.5
+    GEMINI_BACKOFF_MAX_SECONDS: float = 8.0
+    LLM_CACHE_ENABLED: bool = True  # reuse Gemini reports for identical prompt inputs
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
 
     # ── RAG ───────────────────────────────────────────────
+    RAG_BACKEND: str = "numpy"  # numpy (local memory-mapped index) | chroma
+    RAG_INDEX_DIR: str = str(BASE_DIR / "rag_index")
+    RAG_NUMPY_DTYPE: str = "float32"  # float16 halves the index on disk; queries upcast it per block
     CHROMA_PERSIST_DIR: str = str(BASE_DIR / "chroma_db")
-    RAG_CHUNK_SIZE: int = 500
-    RAG_CHUNK_OVERLAP: int = 50
+    RAG_CHUNK_SIZE: int = 500  # tokens per chunk
+    RAG_CHUNK_OVERLAP: int = 50  # tokens repeated from the previous chunk
+    RAG_EMBED_BATCH_SIZE: int = 64  # chunks per embedding call / store write
+    RAG_EMBED_WORKERS: int = 2  # embedding threads
     RAG_TOP_K: int = 5
+    RAG_HYBRID: bool = True  # fuse BM25 keyword ranking with dense similarity
+    RAG_RRF_K: int = 60  # reciprocal-rank-fusion damping constant
+    RAG_SHARED_TOPICS: list[str] = ["general_oncology"]  # searched alongside the prediction's own topics
+    RAG_CACHE_MAX_ENTRIES: int = 512  # retrieval results cached per normalised query
+    RAG_CACHE_TTL_SECONDS: int = 3600
+    RAG_CONFIDENCE_BUCKET: int = 10  # confidence % bucket width in the cache key / query
 
     class Config:
         env_file = str(BASE_DIR / ".env")
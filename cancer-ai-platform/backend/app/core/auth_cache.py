@@ -0,0 +1,95 @@
+"""
+In-process cache of verified access token → user, so authenticated requests skip
+JWT decoding and the `users` lookup. Entries expire after AUTH_CACHE_TTL_SECONDS (or
+when the token does, if sooner) and are dropped as soon as the user row changes.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+
+_entries: "OrderedDict[str, tuple[float, User]]" = OrderedDict()
+_tokens_by_user: dict[int, set[str]] = {}
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def get(token: str) -> User | None:
+    global _hits, _misses
+    with _lock:
+        entry = _entries.get(token)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                _drop(token)
+            _misses += 1
+            return None
+        _entries.move_to_end(token)
+        _hits += 1
+        return entry[1]
+
+
+def put(token: str, user: User, token_exp: float | None = None):
+    """Cache a detached snapshot of `user` for `token`."""
+    if settings.AUTH_CACHE_TTL_SECONDS <= 0:
+        return
+    expires_at = time.time() + settings.AUTH_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        expires_at = min(expires_at, token_exp)
+
+    with _lock:
+        _entries[token] = (expires_at, _snapshot(user))
+        _entries.move_to_end(token)
+        _tokens_by_user.setdefault(user.id, set()).add(token)
+        while len(_entries) > settings.AUTH_CACHE_MAX_ENTRIES:
+            _drop(next(iter(_entries)))
+
+
+def invalidate_user(user_id: int):
+    with _lock:
+        for token in list(_tokens_by_user.get(user_id, ())):
+            _drop(token)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _tokens_by_user.clear()
+
+
+def stats() -> dict:
+    return {"entries": len(_entries), "hits": _hits, "misses": _misses}
+
+
+def _drop(token: str):
+    entry = _entries.pop(token, None)
+    if entry is None:
+        return
+    tokens = _tokens_by_user.get(entry[1].id)
+    if tokens is not None:
+        tokens.discard(token)
+        if not tokens:
+            _tokens_by_user.pop(entry[1].id, None)
+
+
+def _snapshot(user: User) -> User:
+    # Transient copy: safe to share across requests and sessions, and holds no password hash
+    return User(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        created_at=user.created_at,
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_users(session: Session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            invalidate_user(obj.id)
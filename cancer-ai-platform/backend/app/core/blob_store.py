@@ -0,0 +1,233 @@
+"""
+Content-addressed store for uploaded images under UPLOAD_DIR/blobs.
+Blobs are keyed by the SHA-256 of their bytes and fanned out as blobs/ab/cd/<sha><ext>,
+so re-uploading a scan reuses the stored file. Uploads in a browser-renderable format
+(PNG, JPEG, WebP, GIF) keep their encoded pixels — metadata segments that may carry PHI
+(EXIF, XMP, text chunks, comments) are dropped without re-encoding — and anything else
+(TIFF, BMP, …) is re-encoded as PNG. Paths are relative to UPLOAD_DIR (what the /uploads
+mount and `Prediction.image_path` use); content never changes under a path, so the mount
+serves them with immutable cache headers.
+"""
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+
+from PIL import Image
+from starlette.staticfiles import StaticFiles
+
+from app.config import settings
+from app.core.logging import logger
+from app.core.uploads import StagedUpload, digest_file
+
+BLOB_SUBDIR = "blobs"
+# Paths whose content is addressed by hash and never rewritten
+IMMUTABLE_PREFIXES = (f"{BLOB_SUBDIR}/", "heatmaps/")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# PIL format → stored extension for formats browsers render; anything else is re-encoded as PNG
+_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp", "GIF": ".gif"}
+
+# PNG ancillary chunks with free text, EXIF or timestamps
+_PNG_METADATA_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME"}
+# WebP RIFF chunks with EXIF / XMP, and their VP8X feature flags
+_WEBP_METADATA_CHUNKS = {b"EXIF": 0x08, b"XMP ": 0x04}
+# PIL `info` keys of GIF metadata (comments, application extensions such as XMP)
+_GIF_METADATA_KEYS = ("comment", "extension", "xmp")
+
+_stats = {"stored": 0, "deduplicated": 0, "bytes_written": 0}
+
+
+def blob_relpath(sha256: str, ext: str) -> str:
+    return f"{BLOB_SUBDIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def digest_of(relpath: str | None) -> str | None:
+    """The SHA-256 a blob path is named after, or None for legacy (non content-addressed) paths."""
+    if not relpath or not relpath.startswith(f"{BLOB_SUBDIR}/"):
+        return None
+    return os.path.basename(relpath).split(".", 1)[0]
+
+
+def put_upload(upload: StagedUpload, ext: str) -> str:
+    """Store the upload's bytes unless a blob with the same hash exists. Returns its relative path."""
+    relpath = blob_relpath(upload.sha256, ext)
+    final_path = os.path.join(settings.UPLOAD_DIR, relpath)
+    if os.path.exists(final_path):
+        _stats["deduplicated"] += 1
+        return relpath
+
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    tmp_path = f"{final_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        upload.file.seek(0)
+        with open(tmp_path, "wb") as out:
+            for chunk in iter(lambda: upload.file.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                out.write(chunk)
+        os.replace(tmp_path, final_path)
+    finally:
+        upload.file.seek(0)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _stats["stored"] += 1
+    _stats["bytes_written"] += upload.size
+    return relpath
+
+
+def put_bytes(data: bytes, ext: str, filename: str = "image") -> str:
+    staged = StagedUpload(io.BytesIO(data), filename, len(data), hashlib.sha256(data).hexdigest())
+    return put_upload(staged, ext)
+
+
+def put_image(image: Image.Image, original: StagedUpload | None = None) -> str:
+    """
+    Store an analyzed image: the original upload with its metadata stripped when its format
+    is one browsers render, otherwise (generated images, TIFF, BMP, …) a PNG encoding of
+    `image`. PIL writes no EXIF or text chunks unless asked, so the PNG is clean too.
+    """
+    ext = _EXTENSIONS.get(image.format or "")
+    if original is not None and ext:
+        stripped = _strip_metadata(original, image.format, image.info)
+        if stripped is not None:
+            with stripped.file:
+                return put_upload(stripped, ext)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return put_bytes(buffer.getvalue(), ".png")
+
+
+def _strip_metadata(upload: StagedUpload, fmt: str, info: dict) -> StagedUpload | None:
+    """
+    Copy `upload` to a spooled temp file without metadata segments, keeping the encoded
+    image data untouched. Returns None (→ re-encode) if the file can't be parsed.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_CHUNK_SIZE)
+    upload.file.seek(0)
+    try:
+        if fmt == "PNG":
+            _strip_png(upload.file, spool)
+        elif fmt == "JPEG":
+            _strip_jpeg(upload.file, spool)
+        elif fmt == "WEBP":
+            _strip_webp(upload.file, spool)
+        elif any(key in info for key in _GIF_METADATA_KEYS):
+            spool.close()
+            return None
+        else:
+            shutil.copyfileobj(upload.file, spool, settings.UPLOAD_CHUNK_SIZE)
+    except (ValueError, struct.error) as e:
+        logger.warning(f"Could not strip metadata from {upload.filename} ({e}); re-encoding")
+        spool.close()
+        return None
+    finally:
+        upload.file.seek(0)
+    size, sha256 = digest_file(spool)
+    return StagedUpload(spool, upload.filename, size, sha256)
+
+
+def _read_exact(src, n: int) -> bytes:
+    data = src.read(n)
+    if len(data) != n:
+        raise ValueError("truncated file")
+    return data
+
+
+def _copy_exact(src, dst, n: int):
+    while n > 0:
+        chunk = _read_exact(src, min(n, settings.UPLOAD_CHUNK_SIZE))
+        dst.write(chunk)
+        n -= len(chunk)
+
+
+def _strip_png(src, dst):
+    signature = _read_exact(src, 8)
+    if signature != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("not a PNG")
+    dst.write(signature)
+    while True:
+        header = _read_exact(src, 8)
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type in _PNG_METADATA_CHUNKS:
+            src.seek(length + 4, os.SEEK_CUR)  # data + CRC
+        else:
+            dst.write(header)
+            _copy_exact(src, dst, length + 4)
+        if chunk_type == b"IEND":
+            return
+
+
+def _strip_jpeg(src, dst):
+    """Drop COM and APPn segments except JFIF (APP0), ICC profiles (APP2) and Adobe (APP14)."""
+    if _read_exact(src, 2) != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    dst.write(b"\xff\xd8")
+    while True:
+        if _read_exact(src, 1) != b"\xff":
+            raise ValueError("bad JPEG marker")
+        code = _read_exact(src, 1)[0]
+        while code == 0xFF:  # fill bytes
+            code = _read_exact(src, 1)[0]
+        if code in (0xDA, 0xD9):
+            # Start of scan (or end of image): the rest is entropy-coded image data
+            dst.write(bytes((0xFF, code)))
+            shutil.copyfileobj(src, dst, settings.UPLOAD_CHUNK_SIZE)
+            return
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            dst.write(bytes((0xFF, code)))
+            continue
+        length_bytes = _read_exact(src, 2)
+        payload = _read_exact(src, struct.unpack(">H", length_bytes)[0] - 2)
+        is_metadata = code == 0xFE or (0xE0 <= code <= 0xEF and code not in (0xE0, 0xEE))
+        if code == 0xE2 and payload.startswith(b"ICC_PROFILE\x00"):
+            is_metadata = False
+        if not is_metadata:
+            dst.write(bytes((0xFF, code)) + length_bytes + payload)
+
+
+def _strip_webp(src, dst):
+    riff, _, webp = struct.unpack("<4sI4s", _read_exact(src, 12))
+    if riff != b"RIFF" or webp != b"WEBP":
+        raise ValueError("not a WebP")
+    dst.write(b"RIFF\0\0\0\0WEBP")
+    dropped_flags = 0
+    vp8x_offset = None
+    while True:
+        header = src.read(8)
+        if len(header) < 8:
+            break
+        fourcc, length = struct.unpack("<4sI", header)
+        padded = length + (length & 1)
+        if fourcc in _WEBP_METADATA_CHUNKS:
+            dropped_flags |= _WEBP_METADATA_CHUNKS[fourcc]
+            src.seek(padded, os.SEEK_CUR)
+            continue
+        if fourcc == b"VP8X":
+            vp8x_offset = dst.tell() + 8
+        dst.write(header)
+        _copy_exact(src, dst, padded)
+    end = dst.tell()
+    if vp8x_offset is not None and dropped_flags:
+        dst.seek(vp8x_offset)
+        flags = dst.read(1)[0]
+        dst.seek(vp8x_offset)
+        dst.write(bytes((flags & ~dropped_flags,)))
+    dst.seek(4)
+    dst.write(struct.pack("<I", end - 8))
+    dst.seek(end)
+
+
+def stats() -> dict:
+    return dict(_stats)
+
+
+class UploadStaticFiles(StaticFiles):
+    """The /uploads mount: content-addressed files are cacheable forever."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304) and path.replace(os.sep, "/").startswith(IMMUTABLE_PREFIXES):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
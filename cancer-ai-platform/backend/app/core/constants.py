@@ -53,3 +53,16 @@ MODEL_INPUT_SIZES = {
     CancerType.SKIN: (224, 224),
     CancerType.BREAST: (224, 224),
 }
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobKind(str, Enum):
+    RADIOLOGY_ANALYZE = "radiology_analyze"
+    PATHOLOGY_ANALYZE = "pathology_analyze"
+    REPORT_GENERATE = "report_generate"
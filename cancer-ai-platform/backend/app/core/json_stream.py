@@ -0,0 +1,92 @@
+"""
+Incremental parser for a streamed JSON object — emits each top-level member as soon as
+its value is complete, before the rest of the object has arrived.
+"""
+import json
+
+
+class JSONMemberStream:
+    """
+    Feed text chunks of a JSON object (optionally wrapped in a ``` fence or preceded by
+    prose); `feed()` returns the (key, value) members completed by that chunk.
+    String values are emitted at their closing quote; other values at the following
+    `,` or `}`. Malformed members are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token_start = None  # start of the string token / value being read at depth 1
+        self._key = None
+        self._expect = "key"  # key | value
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        self._buffer += chunk
+        members = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        token = buffer[self._token_start:i + 1]
+                        if self._expect == "key":
+                            self._key = _loads(token)
+                            self._token_start = None
+                        elif self._expect == "value" and self._value_is_string():
+                            self._emit(members, token)
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._token_start is None:
+                    self._token_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._expect == "value" and self._token_start is None:
+                    self._token_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1 and self._expect == "value" and self._token_start is not None:
+                    self._emit(members, buffer[self._token_start:i])
+                self._depth = max(0, self._depth - 1)
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect = "value"
+                elif ch == ",":
+                    if self._expect == "value" and self._token_start is not None:
+                        self._emit(members, buffer[self._token_start:i])
+                    self._expect = "key"
+                    self._token_start = None
+                elif not ch.isspace() and self._expect == "value" and self._token_start is None:
+                    self._token_start = i  # number / true / false / null
+            i += 1
+        self._pos = i
+        return members
+
+    def _value_is_string(self) -> bool:
+        return self._buffer[self._token_start] == '"'
+
+    def _emit(self, members: list, token: str):
+        value = _loads(token.strip())
+        if isinstance(self._key, str) and value is not _INVALID:
+            members.append((self._key, value))
+        self._key = None
+        self._token_start = None
+        self._expect = "done"  # ignore anything until the next comma
+
+
+_INVALID = object()
+
+
+def _loads(token: str):
+    try:
+        return json.loads(token)
+    except ValueError:
+        return _INVALID
@@ -0,0 +1,57 @@
+"""
+Keyset (cursor) pagination over (created_at DESC, id DESC).
+A cursor encodes the last row of a page, so the next page is an index range scan
+starting right after it — no OFFSET, constant cost at any depth.
+"""
+import base64
+from datetime import datetime
+
+from fastapi import Response
+from sqlalchemy import Select, and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate(query: Select, model, limit: int, cursor: str | None = None) -> Select:
+    """
+    Order `query` newest-first and restrict it to the page after `cursor`.
+    Fetches one extra row so `page_items` can tell whether another page exists.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def page_items(rows: list, limit: int) -> tuple[list, str | None]:
+    """Split a `paginate` result into (items, next_cursor)."""
+    if len(rows) <= limit:
+        return list(rows), None
+    items = list(rows[:limit])
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
+
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,51 @@
+"""
+Async token-bucket rate limiter for outbound API calls with a per-minute quota.
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Allows `rate_per_minute` acquisitions per minute on average, with bursts of up to
+    `burst`. `acquire()` sleeps until a token is available; waiters are served in order.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock: asyncio.Lock | None = None
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waits += 1
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= 1
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "burst": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
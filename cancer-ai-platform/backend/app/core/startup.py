@@ -0,0 +1,85 @@
+"""
+Startup stage tracking for the readiness probe.
+Independent startup stages run concurrently; each records its status, timing and an
+optional detail dict, and the app is ready once every stage has finished and no required
+stage has failed.
+"""
+import asyncio
+import inspect
+import time
+
+from app.core.logging import logger
+
+_components: dict[str, dict] = {}
+_started = time.time()
+
+
+def register(*names: str):
+    """Declare stages up front so readiness reports them as pending before they start."""
+    for name in names:
+        _components.setdefault(name, {"status": "pending", "seconds": None})
+
+
+async def run(name: str, fn, *, required: bool = True, threaded: bool = False):
+    """
+    Run one stage (`fn` may be sync, async, or sync in a worker thread) and record its outcome.
+    A required stage re-raises its error (startup fails); an optional one is marked failed
+    and the app carries on with that component's fallback. A returned dict becomes `detail`.
+    Required stages run as background tasks have nobody awaiting them, so their failure is
+    also logged and keeps the app from reporting ready.
+    """
+    _components[name] = {"status": "running", "seconds": None, "required": required}
+    started = time.perf_counter()
+    try:
+        if threaded:
+            result = await asyncio.to_thread(fn)
+        else:
+            result = fn()
+            if inspect.isawaitable(result):
+                result = await result
+    except Exception as e:
+        _components[name].update(status="failed", error=f"{type(e).__name__}: {e}")
+        if required:
+            logger.error(f"❌ {name} startup failed: {e}")
+            raise
+        logger.warning(f"⚠️  {name} startup failed: {e}")
+        return None
+    finally:
+        _components[name]["seconds"] = round(time.perf_counter() - started, 3)
+
+    _components[name]["status"] = "ok"
+    if isinstance(result, dict):
+        _components[name]["detail"] = result
+    logger.info(f"✅ {name} ready in {_components[name]['seconds']:.2f}s")
+    return result
+
+
+def _finished() -> bool:
+    return bool(_components) and all(c["status"] in ("ok", "failed") for c in _components.values())
+
+
+def _required_failed() -> bool:
+    return any(c["status"] == "failed" and c.get("required") for c in _components.values())
+
+
+def is_ready() -> bool:
+    return _finished() and not _required_failed()
+
+
+def _status() -> str:
+    if _required_failed():
+        return "failed"
+    if not _finished():
+        return "starting"
+    return "degraded" if any(c["status"] == "failed" for c in _components.values()) else "ready"
+
+
+def report() -> dict:
+    finished = [c["seconds"] for c in _components.values() if c["seconds"] is not None]
+    return {
+        "status": _status(),
+        "uptime_seconds": round(time.time() - _started, 1),
+        # Stages overlap, so startup takes about as long as the slowest one
+        "slowest_stage_seconds": max(finished) if finished else None,
+        "components": {name: dict(component) for name, component in _components.items()},
+    }
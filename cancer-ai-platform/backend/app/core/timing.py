@@ -0,0 +1,40 @@
+"""
+Per-stage wall-clock timing for request pipelines, reported as a Server-Timing header.
+"""
+import time
+
+
+class StageTimer:
+    """
+    Records consecutive stages: `mark(name)` ends the current stage and starts `name`.
+    Awaiting the timer itself does the same, so it can be passed as an `on_stage` callback.
+    """
+
+    def __init__(self, first_stage: str | None = None):
+        self.durations: dict[str, float] = {}
+        self.stage: str | None = None
+        self._started = 0.0
+        if first_stage:
+            self.mark(first_stage)
+
+    def mark(self, stage: str | None):
+        now = time.perf_counter()
+        if self.stage is not None:
+            self.durations[self.stage] = self.durations.get(self.stage, 0.0) + (now - self._started)
+        self.stage = stage
+        self._started = now
+
+    async def __call__(self, stage: str):
+        self.mark(stage)
+
+    def stop(self):
+        self.mark(None)
+
+    def header(self, failed: bool = False) -> str:
+        """Server-Timing value, e.g. `db;dur=1.2, rag;dur=3.4`; a failure names the stage it happened in."""
+        failed_stage = self.stage
+        self.stop()
+        metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()]
+        if failed and failed_stage:
+            metrics.append(f'error;desc="{failed_stage}"')
+        return ", ".join(metrics)
@@ -0,0 +1,87 @@
+"""
+ASGI middleware enforcing upload size limits while the request body streams in.
+Multipart bodies are parsed (and spooled) before an endpoint runs, so the limit has to be
+applied here: a too-large Content-Length is rejected before any body is read, and bodies
+without one are counted chunk by chunk and cut off as soon as they pass the limit.
+"""
+import json
+
+from app.config import settings
+from app.core.logging import logger
+from app.core.uploads import record_rejected
+
+# Allowance for form fields and multipart boundaries around the file itself
+_FORM_OVERHEAD = 64 * 1024
+# Endpoints that accept NIfTI / DICOM volumes as well as images (the route applies the
+# per-type limit once it knows the filename)
+_VOLUME_ROUTES = ("/radiology/analyze",)
+
+
+def limit_for(path: str) -> int:
+    path = path.rstrip("/")
+    if path.endswith("/batch"):
+        return settings.MAX_BATCH_UPLOAD_SIZE
+    if path.endswith(_VOLUME_ROUTES):
+        return max(settings.MAX_VOLUME_UPLOAD_SIZE, settings.MAX_UPLOAD_SIZE) + _FORM_OVERHEAD
+    return settings.MAX_UPLOAD_SIZE + _FORM_OVERHEAD
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        limit = limit_for(scope["path"])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            return await _reject(send, scope["path"], limit)
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Stop feeding the parser; the app sees a disconnect and we answer 413
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                return  # drop whatever the app answers to the truncated body
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await _reject(send, scope["path"], limit)
+
+
+async def _reject(send, path: str, limit: int):
+    record_rejected()
+    logger.warning(f"Rejected upload to {path}: larger than {limit // (1024 * 1024)} MB")
+    body = json.dumps({"detail": f"Upload exceeds the {limit // (1024 * 1024)} MB limit"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
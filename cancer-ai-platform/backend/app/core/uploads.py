@@ -0,0 +1,187 @@
+"""
+Upload ingestion and decoding helpers for single and multi-image (study) uploads.
+Uploads are never read into one bytes blob: they are streamed in chunks from the spooled
+(disk-backed past 1 MB) multipart file while being hashed and size-checked, and decoders
+read from the rewound file object or a path on disk.
+"""
+import asyncio
+import hashlib
+import os
+import resource
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from PIL import Image
+
+from app.config import settings
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+_stats = {"uploads": 0, "bytes": 0, "largest": 0, "rejected": 0}
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+@dataclass
+class StagedUpload:
+    """An upload that has been size-checked and hashed; `file` is rewound for decoding."""
+    file: BinaryIO
+    filename: str
+    size: int
+    sha256: str
+
+    def open_image(self) -> Image.Image:
+        """Decode straight from the spooled file (no in-memory copy of the encoded bytes)."""
+        self.file.seek(0)
+        image = Image.open(self.file)
+        image.load()
+        return image
+
+
+def _stream_chunks(fileobj, max_bytes: int | None, sink=None, record: bool = True) -> tuple[int, str]:
+    """
+    Read `fileobj` in chunks, hashing and counting, optionally writing to `sink`.
+    `record` adds the file to the ingestion counters (off for files already counted, e.g. zip members).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(settings.UPLOAD_CHUNK_SIZE), b""):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            record_rejected()
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        digest.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
+    fileobj.seek(0)
+    if record:
+        _stats["uploads"] += 1
+        _stats["bytes"] += size
+        _stats["largest"] = max(_stats["largest"], size)
+    return size, digest.hexdigest()
+
+
+def digest_file(fileobj) -> tuple[int, str]:
+    """(size, sha256) of a file object read in chunks, without counting it as an upload."""
+    return _stream_chunks(fileobj, None, record=False)
+
+
+async def stage_upload(upload: UploadFile, max_bytes: int | None = None) -> StagedUpload:
+    """
+    Size-check and hash an upload in bounded memory. Raises UploadTooLarge past
+    `max_bytes` (default MAX_UPLOAD_SIZE).
+    """
+    max_bytes = settings.MAX_UPLOAD_SIZE if max_bytes is None else max_bytes
+    size, sha256 = await asyncio.to_thread(_stream_chunks, upload.file, max_bytes)
+    return StagedUpload(file=upload.file, filename=upload.filename or "upload", size=size, sha256=sha256)
+
+
+def record_rejected():
+    _stats["rejected"] += 1
+
+
+def upload_stats() -> dict:
+    """Ingestion counters plus current and peak process RSS (MB)."""
+    stats = dict(_stats)
+    try:
+        with open("/proc/self/statm") as f:
+            stats["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except OSError:
+        stats["rss_mb"] = None
+    # ru_maxrss is KB on Linux
+    stats["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return stats
+
+
+def _expand_zip(fileobj, budget: int, max_members: int) -> list[StagedUpload]:
+    """
+    Extract image members of a zip archive (skipping folders and macOS metadata) into
+    spooled temp files. The members' declared sizes are checked against the per-file limit
+    and `budget` (bytes the study may still expand to) before anything is extracted, and
+    each member is size-checked again while it streams, so a zip bomb is never inflated.
+    """
+    entries = []
+    with zipfile.ZipFile(fileobj) as zf:
+        members = [
+            member for member in zf.infolist()
+            if not member.is_dir()
+            and not member.filename.startswith("__MACOSX/")
+            and not os.path.basename(member.filename).startswith(".")
+            and member.filename.lower().endswith(IMAGE_SUFFIXES)
+        ]
+        if len(members) > max_members:
+            raise ValueError(f"Study exceeds the image limit: the archive holds {len(members)}, room for {max_members}")
+        for member in members:
+            if member.file_size > settings.MAX_UPLOAD_SIZE:
+                raise UploadTooLarge(f"{member.filename} exceeds the {settings.MAX_UPLOAD_SIZE // (1024 * 1024)} MB limit")
+        if sum(member.file_size for member in members) > budget:
+            record_rejected()
+            raise UploadTooLarge(f"Study expands past the {settings.MAX_BATCH_UPLOAD_SIZE // (1024 * 1024)} MB limit")
+
+        for member in members:
+            spool = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_CHUNK_SIZE)
+            with zf.open(member) as source:
+                size, sha256 = _stream_chunks(source, settings.MAX_UPLOAD_SIZE, sink=spool, record=False)
+            spool.seek(0)
+            entries.append(StagedUpload(spool, member.filename, size, sha256))
+    return entries
+
+
+def copy_to_disk(fileobj, path: str, max_bytes: int | None = None) -> tuple[int, str]:
+    """
+    Stream a (spooled) upload file object to `path` in chunks; returns (size, sha256).
+    Raises UploadTooLarge past `max_bytes`, leaving no partial file behind.
+    """
+    try:
+        with open(path, "wb") as out:
+            return _stream_chunks(fileobj, max_bytes, sink=out)
+    except UploadTooLarge:
+        os.remove(path)
+        raise
+
+
+async def read_study_images(
+    files: list[UploadFile], max_images: int
+) -> list[tuple[str, Image.Image | None, str | None, StagedUpload]]:
+    """
+    Read a multipart list of images and/or zip archives and decode every image concurrently.
+    Returns (filename, image, error, upload) per image in upload order; undecodable images
+    carry an error, and `upload` holds the original bytes for storage.
+    Raises ValueError (UploadTooLarge for oversized files) if the study holds more than
+    `max_images` images, a file is too large, the study expands past MAX_BATCH_UPLOAD_SIZE
+    or a zip is corrupt.
+    Plain images are decoded from their spooled files, zip members from spooled temp files.
+    """
+    entries: list[StagedUpload] = []
+    for upload in files:
+        staged = await stage_upload(upload, max_bytes=settings.MAX_BATCH_UPLOAD_SIZE)
+        name = upload.filename or f"image_{len(entries)}"
+        if name.lower().endswith(".zip"):
+            budget = settings.MAX_BATCH_UPLOAD_SIZE - sum(entry.size for entry in entries)
+            try:
+                entries.extend(await asyncio.to_thread(
+                    _expand_zip, staged.file, budget, max_images - len(entries)
+                ))
+            except zipfile.BadZipFile:
+                raise ValueError(f"Invalid zip archive: {name}")
+        else:
+            if staged.size > settings.MAX_UPLOAD_SIZE:
+                raise UploadTooLarge(f"{name} exceeds the {settings.MAX_UPLOAD_SIZE // (1024 * 1024)} MB limit")
+            staged.filename = name
+            entries.append(staged)
+        if len(entries) > max_images:
+            raise ValueError(f"Study exceeds the limit of {max_images} images")
+
+    async def decode(entry: StagedUpload):
+        try:
+            return entry.filename, await asyncio.to_thread(entry.open_image), None, entry
+        except Exception:
+            return entry.filename, None, "Invalid image file", entry
+
+    return list(await asyncio.gather(*[decode(entry) for entry in entries]))
@@ -0,0 +1,44 @@
+"""
+Lightweight, idempotent schema migrations run at startup after `create_all`.
+`create_all` only creates missing tables; changes to existing tables (new indexes,
+columns) are applied here. Applied migrations are recorded in `schema_migrations`.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+from app.core.logging import logger
+from app.database.base import Base
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("name", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_missing_indexes(conn):
+    """Create every index declared on the models that doesn't exist yet."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+# Ordered; never rename or reorder an applied entry
+MIGRATIONS = [
+    ("0001_history_keyset_indexes", _create_missing_indexes),
+]
+
+
+def run_migrations(conn):
+    """Apply pending migrations on a sync connection (use via `conn.run_sync`)."""
+    _metadata.create_all(conn)
+    applied = set(conn.execute(select(schema_migrations.c.name)).scalars())
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        migrate(conn)
+        conn.execute(schema_migrations.insert().values(name=name, applied_at=datetime.now(timezone.utc)))
+        logger.info(f"Applied migration {name}")
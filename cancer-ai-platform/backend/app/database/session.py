@@ -11,14 +11,20 @@ async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit
 
 
 async def init_db():
-    """Create all tables."""
+    """Create all tables and apply pending migrations."""
     from app.database.base import Base
+    from app.database.migrations import run_migrations
     # Import all models so they register with Base
     import app.models.user  # noqa
     import app.models.prediction  # noqa
+    import app.models.prediction_stats  # noqa
     import app.models.report  # noqa
+    import app.models.job  # noqa
+    import app.models.llm_cache  # noqa
+    import app.models.inference_cache  # noqa
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
 
 
 async def get_db():
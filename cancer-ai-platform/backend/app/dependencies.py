@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.database.session import get_db
+from app.core import auth_cache
 from app.core.security import decode_access_token
 from app.models.user import User
 
@@ -17,9 +18,13 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User | None:
-    """Returns the current user or None if no token."""
+    """Returns the current user or None if no token. Verified tokens are served from the auth cache."""
     if not token:
         return None
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached
+
     payload = decode_access_token(token)
     if not payload:
         return None
@@ -27,7 +32,10 @@ async def get_current_user(
     if not user_id:
         return None
     result = await db.execute(select(User).where(User.id == int(user_id)))
-    return result.scalar_one_or_none()
+    user = result.scalar_one_or_none()
+    if user is not None:
+        auth_cache.put(token, user, token_exp=payload.get("exp"))
+    return user
 
 
 async def require_user(
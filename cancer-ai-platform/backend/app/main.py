@@ -2,108 +2,148 @@
 ChronoScan v2.1 — FastAPI Application Entry Point
 AI-Powered Early Cancer Detection System
 """
+import asyncio
+import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
+from app.core.blob_store import UploadStaticFiles
+from app.core import startup
 from app.core.logging import logger
+from app.core.upload_limit import UploadSizeLimitMiddleware
+from app.ai_models.workers import PoolUnavailable
 from app.database.session import init_db
 from app.api.router import api_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup / shutdown events."""
+    """
+    Startup / shutdown events.
+    Independent stages (database, models, RAG, Gemini) run concurrently. The app starts
+    serving once the database and job workers are up; models and RAG keep loading in the
+    background (requests meanwhile load models on demand / use the RAG fallback) and
+    /health/ready reports 503 until every stage has finished, or for good if a required
+    one (database, models, jobs) failed.
+    """
     logger.info("=" * 60)
     logger.info(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info("=" * 60)
 
-    # Initialize database
-    await init_db()
-    logger.info("✅ Database initialized")
-
-    # Log GPU info
-    _log_gpu_info()
-
-    # Load AI models
-    _load_models()
-    logger.info("✅ AI models loaded")
-
-    # Initialize RAG
-    try:
-        from app.services.rag_service import initialize as init_rag
-        init_rag()
-        logger.info("✅ RAG service initialized")
-    except Exception as e:
-        logger.warning(f"⚠️  RAG init skipped: {e}")
-
-    # Initialize Gemini
+    startup.register("database", "models", "rag", "gemini", "jobs")
+    background = [
+        asyncio.create_task(startup.run("models", _prepare_models)),
+        asyncio.create_task(startup.run("rag", _init_rag, threaded=True, required=False)),
+        asyncio.create_task(startup.run("gemini", _init_gemini, required=False)),
+    ]
     try:
-        from app.services.gemini_service import initialize as init_gemini
-        init_gemini()
-        logger.info("✅ Gemini service initialized")
-    except Exception as e:
-        logger.warning(f"⚠️  Gemini init skipped: {e}")
-
-    logger.info(f"🟢 {settings.APP_NAME} is ready!")
+        await startup.run("database", _init_database)
+        # Resumes jobs interrupted by the last shutdown
+        from app.services import job_service
+        await startup.run("jobs", job_service.start_workers)
+        if settings.STARTUP_WAIT_FOR_READY:
+            await asyncio.gather(*background)
+    except BaseException:
+        await _cancel(background)
+        raise
+
+    logger.info(f"🟢 {settings.APP_NAME} is serving ({startup.report()['status']})")
     yield
 
+    await _cancel(background)
+    await job_service.shutdown_workers()
+    from app.ai_models import registry
+    await registry.stop_watcher()
+    from app.services import gemini_service
+    await gemini_service.shutdown()
+    from app.ai_models.batching import shutdown_all as shutdown_batchers
+    from app.ai_models.workers import shutdown_pool
+    shutdown_batchers()
+    shutdown_pool()
     logger.info(f"🔴 {settings.APP_NAME} shutting down.")
 
 
-def _log_gpu_info():
-    """Log GPU availability for both PyTorch and TensorFlow."""
-    logger.info("─── GPU Diagnostics ───")
-    try:
-        import torch
-        if torch.cuda.is_available():
-            gpu_name = torch.cuda.get_device_name(0)
-            vram = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)
-            logger.info(f"🟢 PyTorch CUDA: {gpu_name} ({vram:.1f} GB VRAM)")
-        else:
-            logger.warning("🔴 PyTorch CUDA: NOT available — running on CPU")
-    except Exception as e:
-        logger.warning(f"PyTorch GPU check failed: {e}")
+async def _cancel(tasks: list[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
-    try:
-        import tensorflow as tf
-        gpus = tf.config.list_physical_devices('GPU')
-        if gpus:
-            logger.info(f"🟢 TensorFlow GPUs: {[g.name for g in gpus]}")
-        else:
-            logger.warning("🔴 TensorFlow: No GPU detected — running on CPU")
-    except Exception as e:
-        logger.warning(f"TensorFlow GPU check failed: {e}")
-    logger.info("───────────────────────")
+
+async def _init_database() -> dict:
+    await init_db()
+    from app.database.session import async_session
+    from app.services.dashboard_service import sync_summary_table
+    async with async_session() as session:
+        await sync_summary_table(session)
+    from app.services.llm_cache_service import purge_expired
+    await purge_expired()
+    from app.services.inference_cache_service import purge_stale
+    await purge_stale()
+    return {"url": settings.DATABASE_URL.split("://", 1)[0]}
+
+
+async def _prepare_models() -> dict:
+    # AI models load on first use through the registry — in worker mode each inference
+    # process loads (and warms up) its own subset; MODEL_PRELOAD loads models ahead of
+    # the first request, in parallel. The stage (and so readiness) finishes once they are warm
+    if settings.INFERENCE_WORKERS > 0:
+        from app.ai_models.workers import start_pool
+        pool = await asyncio.to_thread(start_pool)
+        while not pool.ready():
+            await asyncio.sleep(0.2)
+        return {"workers": settings.INFERENCE_WORKERS}
+
+    from app.ai_models import registry
+    registry.start_watcher()
+    preloaded = await asyncio.to_thread(registry.preload, settings.MODEL_PRELOAD)
+    # Log GPU info for the frameworks loaded so far
+    _log_gpu_info()
+    return {"preloaded": preloaded}
 
 
-def _load_models():
-    """Load all AI models at startup."""
-    try:
-        from app.ai_models.radiology.lung_cancer.model import load_model as load_lung
-        load_lung(settings.LUNG_MODEL_PATH)
-    except Exception as e:
-        logger.warning(f"Lung model: {e}")
+def _init_rag() -> dict:
+    from app.services import rag_service
+    rag_service.initialize()
+    return rag_service.status()
 
-    try:
-        from app.ai_models.pathology.blood_cancer_model import load_model as load_blood
-        load_blood(settings.BLOOD_MODEL_PATH)
-    except Exception as e:
-        logger.warning(f"Blood model: {e}")
 
-    try:
-        from app.ai_models.radiology.brain_tumor.mri_model import load_model as load_brain
-        load_brain(settings.BRAIN_MODEL_PATH)
-    except Exception as e:
-        logger.warning(f"Brain model: {e}")
+def _init_gemini() -> dict:
+    from app.services import gemini_service
+    gemini_service.initialize()
+    return {"configured": gemini_service.is_ready()}
 
-    try:
-        from app.ai_models.radiology.ct_analysis.ct_model import load_model as load_ct
-        load_ct(settings.CT_MODEL_PATH)
-    except Exception as e:
-        logger.warning(f"CT model: {e}")
+
+def _log_gpu_info():
+    """Log GPU availability for PyTorch and TensorFlow — only those already imported by loaded models."""
+    if "torch" not in sys.modules and "tensorflow" not in sys.modules:
+        return
+    logger.info("─── GPU Diagnostics ───")
+    if "torch" in sys.modules:
+        try:
+            import torch
+            if torch.cuda.is_available():
+                gpu_name = torch.cuda.get_device_name(0)
+                vram = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)
+                logger.info(f"🟢 PyTorch CUDA: {gpu_name} ({vram:.1f} GB VRAM)")
+            else:
+                logger.warning("🔴 PyTorch CUDA: NOT available — running on CPU")
+        except Exception as e:
+            logger.warning(f"PyTorch GPU check failed: {e}")
+
+    if "tensorflow" in sys.modules:
+        try:
+            import tensorflow as tf
+            gpus = tf.config.list_physical_devices('GPU')
+            if gpus:
+                logger.info(f"🟢 TensorFlow GPUs: {[g.name for g in gpus]}")
+            else:
+                logger.warning("🔴 TensorFlow: No GPU detected — running on CPU")
+        except Exception as e:
+            logger.warning(f"TensorFlow GPU check failed: {e}")
+    logger.info("───────────────────────")
 
 
 # ── Create App ───────────────────────────────────────────
@@ -115,22 +155,42 @@ app = FastAPI(
 )
 
 # ── CORS ─────────────────────────────────────────────────
+# Added before CORS so 413 responses still carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 # ── Static files (uploaded images, heatmaps) ─────────────
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # ── Routes ───────────────────────────────────────────────
 app.include_router(api_router)
 
 
+@app.exception_handler(PoolUnavailable)
+async def models_loading(request, exc: PoolUnavailable):
+    """Inference requested before the worker pool is up (worker mode, still starting)."""
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "5"})
+
+
 # ── Health check ─────────────────────────────────────────
 @app.get("/health")
+@app.get("/health/live")
 async def health():
+    """Liveness: the process is up and serving requests."""
     return {"status": "ok", "app": settings.APP_NAME, "version": settings.APP_VERSION}
+
+
+@app.get("/health/ready")
+async def ready():
+    """Readiness: every startup stage has finished; per-component status and load timings."""
+    from app.ai_models import registry
+    report = startup.report()
+    report["models"] = registry.stats()["loaded"] if settings.INFERENCE_WORKERS == 0 else []
+    return JSONResponse(report, status_code=200 if startup.is_ready() else 503)
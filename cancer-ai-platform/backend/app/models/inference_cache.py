@@ -0,0 +1,21 @@
+"""
+InferenceCacheEntry ORM model — model outputs cached by image content, so a scan that
+was already analyzed by the same checkpoint isn't run through the model again.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.database.base import Base
+
+
+class InferenceCacheEntry(Base):
+    __tablename__ = "inference_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of image hash, cancer type, model and preprocessing versions
+    image_hash = Column(String(64), nullable=False, index=True)
+    cancer_type = Column(String(50), nullable=False)
+    model_version = Column(String(32), nullable=False)
+    preprocess_version = Column(Integer, nullable=False)
+    result = Column(JSON, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,26 @@
+"""
+Job ORM model — a long-running analysis or report generation run by the job workers.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, Float, String, DateTime, Text, JSON
+from app.database.base import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    user_id = Column(Integer, nullable=True, index=True)
+    kind = Column(String(50), nullable=False)  # radiology_analyze | pathology_analyze | report_generate
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued | running | succeeded | failed
+    stage = Column(String(50), nullable=True)  # inference, heatmap, rag, llm, save
+    progress = Column(Float, nullable=False, default=0.0)  # 0.0 – 1.0
+
+    params = Column(JSON, nullable=True)  # form fields + staged input file
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime, nullable=True)
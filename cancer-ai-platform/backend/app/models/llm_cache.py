@@ -0,0 +1,20 @@
+"""
+LLMCacheEntry ORM model — Gemini report sections cached by a hash of everything that
+goes into the prompt, so identical generations don't repeat the paid API call.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.database.base import Base
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of prompt version, model and inputs
+    model = Column(String(100), nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    sections = Column(JSON, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(DateTime, nullable=False, index=True)
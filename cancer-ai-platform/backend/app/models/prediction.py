@@ -2,7 +2,7 @@
 Prediction ORM model — stores each AI analysis result.
 """
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, Float, String, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, Float, String, DateTime, Text, JSON, Index
 from app.database.base import Base
 
 
@@ -30,3 +30,13 @@ class Prediction(Base):
     biomarkers = Column(JSON, nullable=True)           # {wbc: 4.5, blast: 0, ...}
 
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # Worklists / history: newest-first keyset scans, optionally per user and scan type
+        Index("ix_predictions_created", "created_at", "id"),
+        Index("ix_predictions_scan_created", "scan_type", "created_at", "id"),
+        Index("ix_predictions_user_created", "user_id", "created_at", "id"),
+        Index("ix_predictions_user_scan_created", "user_id", "scan_type", "created_at", "id"),
+        # Dashboard GROUP BY fallback
+        Index("ix_predictions_cancer_risk", "cancer_type", "risk_level"),
+    )
@@ -0,0 +1,79 @@
+"""
+PredictionStats ORM model — running per-(cancer_type, risk_level) totals over `predictions`.
+Rows are bumped in the same flush that inserts a Prediction, so the dashboard reads a
+handful of summary rows instead of scanning every prediction.
+"""
+from sqlalchemy import Column, Integer, Float, String, event, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.database.base import Base
+from app.models.prediction import Prediction
+
+
+class PredictionStats(Base):
+    __tablename__ = "prediction_stats"
+
+    cancer_type = Column(String(50), primary_key=True)
+    risk_level = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    risk_score_sum = Column(Float, nullable=False, default=0.0)
+
+
+@event.listens_for(Session, "after_flush")
+def _count_new_predictions(session: Session, flush_context):
+    """Fold predictions inserted by this flush into the summary rows."""
+    from app.config import settings
+
+    if not settings.DASHBOARD_SUMMARY_TABLE:
+        return
+
+    deltas: dict[tuple[str, str], list] = {}
+    for obj in session.new:
+        if isinstance(obj, Prediction):
+            delta = deltas.setdefault((obj.cancer_type, obj.risk_level), [0, 0.0, 0.0])
+            delta[0] += 1
+            delta[1] += obj.confidence or 0.0
+            delta[2] += obj.risk_score or 0.0
+    if not deltas:
+        return
+
+    connection = session.connection()
+    for (cancer_type, risk_level), (count, confidence_sum, risk_score_sum) in deltas.items():
+        _upsert(connection, cancer_type, risk_level, count, confidence_sum, risk_score_sum)
+
+
+def _upsert(connection, cancer_type: str, risk_level: str, count: int, confidence_sum: float, risk_score_sum: float):
+    table = PredictionStats.__table__
+    values = {
+        "cancer_type": cancer_type,
+        "risk_level": risk_level,
+        "count": count,
+        "confidence_sum": confidence_sum,
+        "risk_score_sum": risk_score_sum,
+    }
+    increments = {
+        "count": table.c.count + count,
+        "confidence_sum": table.c.confidence_sum + confidence_sum,
+        "risk_score_sum": table.c.risk_score_sum + risk_score_sum,
+    }
+
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        connection.execute(
+            insert(table).values(**values).on_conflict_do_update(
+                index_elements=[table.c.cancer_type, table.c.risk_level], set_=increments
+            )
+        )
+        return
+
+    updated = connection.execute(
+        update(table)
+        .where(table.c.cancer_type == cancer_type, table.c.risk_level == risk_level)
+        .values(**increments)
+    )
+    if not updated.rowcount:
+        connection.execute(table.insert().values(**values))
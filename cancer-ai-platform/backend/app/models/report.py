@@ -2,7 +2,7 @@
 Report ORM model — stores generated clinical reports.
 """
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
 from app.database.base import Base
 
 
@@ -22,3 +22,8 @@ class Report(Base):
     generated_by = Column(String(50), default="gemini")  # gemini | rule_based
 
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_reports_created", "created_at", "id"),
+        Index("ix_reports_user_created", "user_id", "created_at", "id"),
+    )
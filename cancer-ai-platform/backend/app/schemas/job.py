@@ -0,0 +1,22 @@
+"""
+Pydantic schemas for Job endpoints.
+"""
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    stage: Optional[str] = None
+    progress: float
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
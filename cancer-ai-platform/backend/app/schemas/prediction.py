@@ -41,3 +41,25 @@ class RiskAssessment(BaseModel):
     risk_level: str
     cancer_scores: list[dict]  # [{name, score, grade, color}]
     recommendations: list[dict]  # [{icon, title, desc, color}]
+
+
+class BatchItemResult(BaseModel):
+    filename: str
+    prediction: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+
+class StudyAggregate(BaseModel):
+    total_images: int
+    analyzed: int
+    failed: int
+    class_counts: dict
+    mean_confidence: float
+    max_risk_score: float
+    risk_level: str
+    highest_risk_prediction_id: Optional[int] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: list[BatchItemResult]
+    aggregate: StudyAggregate
@@ -1,54 +1,118 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, delete
 
+from app.config import settings
+from app.core.logging import logger
+from app.core.pagination import paginate, page_items
 from app.models.prediction import Prediction
+from app.models.prediction_stats import PredictionStats
 from app.models.report import Report
 from app.models.user import User
 
+RISK_LEVELS = ["LOW", "MODERATE", "HIGH", "CRITICAL"]
+DASHBOARD_CANCER_TYPES = ["lung", "brain", "blood", "bone", "skin", "breast"]
+
 
 async def get_stats(db: AsyncSession) -> dict:
-    """Get overview dashboard statistics."""
-    total_scans = (await db.execute(select(func.count(Prediction.id)))).scalar() or 0
-    total_reports = (await db.execute(select(func.count(Report.id)))).scalar() or 0
-    total_users = (await db.execute(select(func.count(User.id)))).scalar() or 0
-
- 
-    avg_confidence = (await db.execute(select(func.avg(Prediction.confidence)))).scalar() or 0
-
-
-    risk_dist = {}
-    for level in ["LOW", "MODERATE", "HIGH", "CRITICAL"]:
-        count = (await db.execute(
-            select(func.count(Prediction.id)).where(Prediction.risk_level == level)
-        )).scalar() or 0
-        risk_dist[level] = count
-
-    cancer_stats = []
-    for ct in ["lung", "brain", "blood", "bone", "skin", "breast"]:
-        count = (await db.execute(
-            select(func.count(Prediction.id)).where(Prediction.cancer_type == ct)
-        )).scalar() or 0
-        avg_risk = (await db.execute(
-            select(func.avg(Prediction.risk_score)).where(Prediction.cancer_type == ct)
-        )).scalar() or 0
-        cancer_stats.append({"cancer_type": ct, "count": count, "avg_risk": round(float(avg_risk), 1)})
+    """
+    Get overview dashboard statistics.
+    Reads the incrementally maintained `prediction_stats` rows when enabled, otherwise one
+    GROUP BY over predictions; either way the (cancer_type, risk_level) groups give both
+    the risk distribution and the per-cancer breakdown.
+    """
+    if settings.DASHBOARD_SUMMARY_TABLE:
+        source = select(
+            PredictionStats.cancer_type,
+            PredictionStats.risk_level,
+            PredictionStats.count,
+            PredictionStats.confidence_sum,
+            PredictionStats.risk_score_sum,
+        )
+    else:
+        source = _grouped_predictions()
+    groups = (await db.execute(source)).all()
+
+    totals = (await db.execute(select(
+        select(func.count(Report.id)).scalar_subquery(),
+        select(func.count(User.id)).scalar_subquery(),
+    ))).one()
+
+    return _summarize(groups, total_reports=totals[0] or 0, total_users=totals[1] or 0)
+
+
+def _grouped_predictions():
+    return select(
+        Prediction.cancer_type,
+        Prediction.risk_level,
+        func.count(Prediction.id),
+        func.sum(Prediction.confidence),
+        func.sum(Prediction.risk_score),
+    ).group_by(Prediction.cancer_type, Prediction.risk_level)
+
+
+def _summarize(groups, total_reports: int, total_users: int) -> dict:
+    total_scans = 0
+    confidence_sum = 0.0
+    risk_dist = {level: 0 for level in RISK_LEVELS}
+    per_cancer = {ct: [0, 0.0] for ct in DASHBOARD_CANCER_TYPES}
+
+    for cancer_type, risk_level, count, group_confidence, group_risk in groups:
+        total_scans += count
+        confidence_sum += group_confidence or 0.0
+        if risk_level in risk_dist:
+            risk_dist[risk_level] += count
+        if cancer_type in per_cancer:
+            per_cancer[cancer_type][0] += count
+            per_cancer[cancer_type][1] += group_risk or 0.0
+
+    cancer_stats = [
+        {"cancer_type": ct, "count": count, "avg_risk": round(risk_sum / count, 1) if count else 0.0}
+        for ct, (count, risk_sum) in per_cancer.items()
+    ]
 
     return {
         "total_scans": total_scans,
         "total_reports": total_reports,
         "total_users": total_users,
-        "avg_confidence": round(float(avg_confidence), 1),
+        "avg_confidence": round(confidence_sum / total_scans, 1) if total_scans else 0.0,
         "risk_distribution": risk_dist,
         "cancer_stats": cancer_stats,
     }
 
 
-async def get_recent_predictions(db: AsyncSession, limit: int = 10) -> list:
-    """Get most recent predictions as patient worklist."""
-    result = await db.execute(
-        select(Prediction).order_by(Prediction.created_at.desc()).limit(limit)
-    )
-    predictions = result.scalars().all()
+async def sync_summary_table(db: AsyncSession):
+    """
+    Rebuild `prediction_stats` from a GROUP BY if it disagrees with the predictions table
+    (first start with the summary enabled, or rows written while it was disabled).
+    """
+    if not settings.DASHBOARD_SUMMARY_TABLE:
+        return
+
+    total = (await db.execute(select(func.count(Prediction.id)))).scalar() or 0
+    summarized = (await db.execute(select(func.sum(PredictionStats.count)))).scalar() or 0
+    if total == summarized:
+        return
+
+    groups = (await db.execute(_grouped_predictions())).all()
+    await db.execute(delete(PredictionStats))
+    db.add_all([
+        PredictionStats(
+            cancer_type=cancer_type,
+            risk_level=risk_level,
+            count=count,
+            confidence_sum=confidence_sum or 0.0,
+            risk_score_sum=risk_score_sum or 0.0,
+        )
+        for cancer_type, risk_level, count, confidence_sum, risk_score_sum in groups
+    ])
+    await db.commit()
+    logger.info(f"Dashboard summary table rebuilt from {total} predictions")
+
+
+async def get_recent_predictions(db: AsyncSession, limit: int = 10, cursor: str = None) -> tuple[list, str | None]:
+    """Get a page of the most recent predictions as patient worklist, plus the next-page cursor."""
+    result = await db.execute(paginate(select(Prediction), Prediction, limit, cursor))
+    predictions, next_cursor = page_items(result.scalars().all(), limit)
     return [
         {
             "id": p.id,
@@ -63,4 +127,4 @@ async def get_recent_predictions(db: AsyncSession, limit: int = 10) -> list:
             "created_at": p.created_at.isoformat() if p.created_at else None,
         }
         for p in predictions
-    ]
+    ], next_cursor
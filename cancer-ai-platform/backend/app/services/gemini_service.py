@@ -1,23 +1,127 @@
+"""
+Gemini Service — clinical report generation through the Gemini REST API.
+One pooled, keep-alive httpx client is shared by all requests (HTTP/2 when `h2` is installed).
+Outbound calls are limited by a concurrency semaphore and a token bucket matched to the
+API quota, and retried with jittered exponential backoff on 429 / 5xx and transport errors.
+GEMINI_BASE_URL can point at a local stub server for testing.
+"""
 import asyncio
+import json
+import random
+from typing import AsyncIterator
+
 import httpx
 from app.config import settings
+from app.core.json_stream import JSONMemberStream
 from app.core.logging import logger
+from app.core.rate_limit import TokenBucket
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Bump whenever the prompt template changes — it is part of the LLM cache key
+PROMPT_VERSION = 1
+# Section keys the prompt asks for
+REPORT_SECTIONS = (
+    "executive_summary", "indication", "technique", "findings",
+    "impression", "recommendation", "risk_assessment", "confidence_disclaimer",
+)
 
 _is_ready = False
+_client: httpx.AsyncClient | None = None
+_semaphore: asyncio.Semaphore | None = None
+_bucket = TokenBucket(settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_BURST)
+_stats = {"requests": 0, "retries": 0, "failures": 0}
 
 
 def initialize():
-    """Verify API key configuration."""
-    global _is_ready
+    """Verify API key configuration and open the shared HTTP client."""
+    global _is_ready, _client
     if not settings.GEMINI_API_KEY:
         logger.warning("GEMINI_API_KEY not set. Gemini report generation disabled.")
         _is_ready = False
         return
-        
-    logger.info(f"Gemini REST API initialized for model: {settings.GEMINI_MODEL}")
+
+    try:
+        import h2  # noqa: F401 — enables HTTP/2 in httpx
+        http2 = True
+    except ImportError:
+        http2 = False
+    _client = httpx.AsyncClient(
+        base_url=settings.GEMINI_BASE_URL,
+        headers={"x-goog-api-key": settings.GEMINI_API_KEY},
+        timeout=httpx.Timeout(settings.GEMINI_TIMEOUT_SECONDS, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=settings.GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GEMINI_MAX_CONNECTIONS,
+            keepalive_expiry=60.0,
+        ),
+        http2=http2,
+    )
+    logger.info(
+        f"Gemini REST API initialized for model: {settings.GEMINI_MODEL} "
+        f"({'HTTP/2' if http2 else 'HTTP/1.1'}, {settings.GEMINI_REQUESTS_PER_MINUTE} req/min)"
+    )
     _is_ready = True
 
 
+async def shutdown():
+    """Close the shared HTTP client (FastAPI lifespan shutdown)."""
+    global _client, _is_ready
+    _is_ready = False
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def is_ready() -> bool:
+    return _is_ready
+
+
+def stats() -> dict:
+    return {**_stats, "rate_limit": _bucket.stats()}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _backoff_delay(attempt: int, response: httpx.Response | None) -> float:
+    """Retry-After when the server sends one, else full-jitter exponential backoff."""
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), settings.GEMINI_BACKOFF_MAX_SECONDS)
+    ceiling = min(settings.GEMINI_BACKOFF_MAX_SECONDS, settings.GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+async def _post(path: str, payload: dict) -> dict:
+    """POST to the Gemini API under the rate limits, retrying retryable failures."""
+    async with _get_semaphore():
+        for attempt in range(settings.GEMINI_MAX_RETRIES + 1):
+            await _bucket.acquire()
+            _stats["requests"] += 1
+            response = None
+            try:
+                response = await _client.post(path, json=payload)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = httpx.HTTPStatusError(
+                    f"Gemini returned {response.status_code}", request=response.request, response=response
+                )
+            except httpx.TransportError as e:
+                error = e
+            if attempt == settings.GEMINI_MAX_RETRIES:
+                raise error
+            delay = _backoff_delay(attempt, response)
+            _stats["retries"] += 1
+            logger.warning(f"Gemini request failed ({error}); retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
 async def generate_report(
     prediction_data: dict,
     rag_context: list[str],
@@ -29,6 +133,92 @@ async def generate_report(
     if not _is_ready:
         return None
 
+    payload = _build_payload(prediction_data, rag_context, patient_info)
+    try:
+        data = await _post(f"/models/{settings.GEMINI_MODEL}:generateContent", payload)
+        # Extract text from the Gemini REST response format
+        text = data["candidates"][0]["content"]["parts"][0]["text"].strip()
+        return _parse_sections(text, prediction_data)
+
+    except Exception as e:
+        _stats["failures"] += 1
+        logger.error(f"Gemini REST report generation failed: {e}")
+        return None
+
+
+async def stream_report(
+    prediction_data: dict,
+    rag_context: list[str],
+    patient_info: dict = None,
+) -> AsyncIterator[tuple[str, object]]:
+    """
+    Stream a report through `:streamGenerateContent`, yielding (section, value) as soon as each
+    section's JSON value is complete — values as decoded, like `generate_report`. Raises if
+    Gemini is unavailable or the stream fails; sections already yielded stay valid. Malformed
+    members are skipped, so the report may lack some of REPORT_SECTIONS.
+    """
+    if not _is_ready:
+        raise RuntimeError("Gemini is not configured")
+
+    payload = _build_payload(prediction_data, rag_context, patient_info)
+    parser = JSONMemberStream()
+    text, emitted = [], 0
+    try:
+        async for delta in _stream(f"/models/{settings.GEMINI_MODEL}:streamGenerateContent", payload):
+            text.append(delta)
+            for key, value in parser.feed(delta):
+                emitted += 1
+                yield key, value
+    except Exception:
+        _stats["failures"] += 1
+        raise
+
+    if not emitted:
+        # Not JSON after all — fall back to the same sections as the non-streaming path
+        for key, value in _parse_sections("".join(text).strip(), prediction_data).items():
+            yield key, value
+
+
+async def _stream(path: str, payload: dict) -> AsyncIterator[str]:
+    """
+    POST with `alt=sse` and yield the text of each streamed candidate chunk. Retryable
+    failures are retried only until the first chunk arrives.
+    """
+    async with _get_semaphore():
+        for attempt in range(settings.GEMINI_MAX_RETRIES + 1):
+            await _bucket.acquire()
+            _stats["requests"] += 1
+            response, started = None, False
+            try:
+                async with _client.stream("POST", path, params={"alt": "sse"}, json=payload) as response:
+                    if response.status_code not in RETRYABLE_STATUSES:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = json.loads(line[5:])
+                            for part in data["candidates"][0].get("content", {}).get("parts", []):
+                                if part.get("text"):
+                                    started = True
+                                    yield part["text"]
+                        return
+                    error = httpx.HTTPStatusError(
+                        f"Gemini returned {response.status_code}", request=response.request, response=response
+                    )
+            except httpx.TransportError as e:
+                if started:
+                    raise
+                error = e
+            if attempt == settings.GEMINI_MAX_RETRIES:
+                raise error
+            delay = _backoff_delay(attempt, response)
+            _stats["retries"] += 1
+            logger.warning(f"Gemini stream failed ({error}); retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+def _build_payload(prediction_data: dict, rag_context: list[str], patient_info: dict = None) -> dict:
+    """Prompt + generation config for the report request."""
     # Build the prompt
     context_text = "\n".join(f"- {ctx}" for ctx in rag_context)
     patient_text = ""
@@ -91,41 +281,28 @@ Return ONLY valid JSON with these section keys and string values.
             "temperature": 0.2
         }
     }
-    
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{settings.GEMINI_MODEL}:generateContent?key={settings.GEMINI_API_KEY}"
+    return payload
 
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            
-            data = response.json()
-            # Extract text from the Gemini REST response format
-            text = data["candidates"][0]["content"]["parts"][0]["text"].strip()
-
-        # Try to parse as JSON
-        import json
-        if text.startswith("```"):
-            text = text.split("```")[1]
-            if text.startswith("json"):
-                text = text[4:]
-        text = text.strip()
-
-        try:
-            sections = json.loads(text)
-            return sections
-        except json.JSONDecodeError:
-            return {
-                "executive_summary": text[:300],
-                "indication": "AI-assisted cancer screening analysis",
-                "technique": f"AI model analysis for {prediction_data.get('cancer_type', 'unknown')} cancer detection",
-                "findings": text,
-                "impression": f"{prediction_data.get('predicted_class', 'Unknown')} detected with {prediction_data.get('confidence', 0)}% confidence",
-                "recommendation": "Please consult with a specialist for clinical correlation.",
-                "risk_assessment": f"Risk Score: {prediction_data.get('risk_score', 0)}%",
-                "confidence_disclaimer": "This report is AI-generated and should be reviewed by a qualified medical professional.",
-            }
 
-    except Exception as e:
-        logger.error(f"Gemini REST report generation failed: {e}")
-        return None
+def _parse_sections(text: str, prediction_data: dict) -> dict:
+    """Report sections from the model's JSON answer, or a best-effort report around the raw text."""
+    # Try to parse as JSON
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    text = text.strip()
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return {
+            "executive_summary": text[:300],
+            "indication": "AI-assisted cancer screening analysis",
+            "technique": f"AI model analysis for {prediction_data.get('cancer_type', 'unknown')} cancer detection",
+            "findings": text,
+            "impression": f"{prediction_data.get('predicted_class', 'Unknown')} detected with {prediction_data.get('confidence', 0)}% confidence",
+            "recommendation": "Please consult with a specialist for clinical correlation.",
+            "risk_assessment": f"Risk Score: {prediction_data.get('risk_score', 0)}%",
+            "confidence_disclaimer": "This report is AI-generated and should be reviewed by a qualified medical professional.",
+        }
@@ -0,0 +1,120 @@
+"""
+Inference Cache Service — persistent model outputs keyed by image content.
+Entries are keyed by (image SHA-256, cancer type, checkpoint fingerprint, preprocessing
+version) and live in the `inference_cache` table. Results are stored under the
+fingerprint they carry in "model_version" — the registry version that produced them —
+so outputs of an old model computed while a replaced checkpoint is being reloaded never
+land under the new fingerprint. Lookups use the checkpoint on disk, so a replaced file
+changes every key and stale outputs are never served. Results without a version
+(simulated, fallback weights, inference errors) are not cached.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select, update
+
+from app.config import settings
+from app.core.logging import logger
+from app.database.session import async_session
+from app.models.inference_cache import InferenceCacheEntry
+from app.ai_models.fingerprint import PREPROCESS_VERSION, model_version
+
+_stats = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def cache_key(image_hash: str, cancer_type: str, version: str) -> str:
+    material = f"{image_hash}:{cancer_type}:{version}:{PREPROCESS_VERSION}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+async def _current_version(cancer_type: str) -> str | None:
+    """Fingerprint of the checkpoint on disk, or None when caching is off or there is none."""
+    if not settings.INFERENCE_CACHE_ENABLED:
+        return None
+    version = await asyncio.to_thread(model_version, cancer_type)
+    return None if version == "builtin" else version
+
+
+async def lookup_many(image_hashes: list[str], cancer_type: str) -> dict[str, dict]:
+    """Cached results by image hash for those of `image_hashes` that were analyzed before."""
+    version = await _current_version(cancer_type)
+    if version is None:
+        return {}
+    keys = {cache_key(image_hash, cancer_type, version): image_hash for image_hash in set(image_hashes)}
+    async with async_session() as session:
+        rows = (await session.execute(
+            select(InferenceCacheEntry.key, InferenceCacheEntry.result).where(InferenceCacheEntry.key.in_(list(keys)))
+        )).all()
+        if rows:
+            await session.execute(
+                update(InferenceCacheEntry)
+                .where(InferenceCacheEntry.key.in_([key for key, _ in rows]))
+                .values(hits=InferenceCacheEntry.hits + 1)
+            )
+            await session.commit()
+    found = {keys[key]: result for key, result in rows}
+    hits = sum(1 for image_hash in image_hashes if image_hash in found)
+    _stats["hits"] += hits
+    _stats["misses"] += len(image_hashes) - hits
+    return found
+
+
+async def lookup(image_hash: str, cancer_type: str) -> dict | None:
+    return (await lookup_many([image_hash], cancer_type)).get(image_hash)
+
+
+async def store_many(results: dict[str, dict], cancer_type: str):
+    """
+    Cache `results` (image hash → model output) under the version each was produced by.
+    The "model_version" tag is removed from the results in place.
+    """
+    tagged = {image_hash: (result.pop("model_version", None), result) for image_hash, result in results.items()}
+    tagged = {image_hash: entry for image_hash, entry in tagged.items() if entry[0] is not None}
+    if not settings.INFERENCE_CACHE_ENABLED or not tagged:
+        return
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        for image_hash, (version, result) in tagged.items():
+            await session.merge(InferenceCacheEntry(
+                key=cache_key(image_hash, cancer_type, version),
+                image_hash=image_hash,
+                cancer_type=cancer_type,
+                model_version=version,
+                preprocess_version=PREPROCESS_VERSION,
+                result=result,
+                hits=0,
+                created_at=now,
+            ))
+        await session.commit()
+    _stats["stores"] += len(tagged)
+
+
+async def store(image_hash: str, cancer_type: str, result: dict):
+    await store_many({image_hash: result}, cancer_type)
+
+
+async def purge_stale() -> int:
+    """Delete entries produced by checkpoints or preprocessing that are no longer current (run at startup)."""
+    removed = 0
+    async with async_session() as session:
+        cancer_types = (await session.execute(select(InferenceCacheEntry.cancer_type).distinct())).scalars().all()
+        for cancer_type in cancer_types:
+            version = await asyncio.to_thread(model_version, cancer_type)
+            result = await session.execute(
+                delete(InferenceCacheEntry).where(
+                    InferenceCacheEntry.cancer_type == cancer_type,
+                    (InferenceCacheEntry.model_version != version)
+                    | (InferenceCacheEntry.preprocess_version != PREPROCESS_VERSION),
+                )
+            )
+            removed += result.rowcount
+        await session.commit()
+    if removed:
+        logger.info(f"Purged {removed} stale inference cache entries")
+    return removed
+
+
+def stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0}
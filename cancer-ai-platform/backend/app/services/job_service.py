@@ -0,0 +1,421 @@
+"""
+Job Service — runs slow analysis / report pipelines outside the HTTP request.
+Jobs are rows in the `jobs` table, so they survive a restart: on startup, queued jobs
+are re-enqueued and jobs interrupted mid-run are retried. An in-process asyncio worker
+pool executes them; clients poll `get_job` or subscribe to `stream_events` (SSE).
+Several API processes can share the table: a worker claims a job with a conditional
+UPDATE, and a running job heartbeats its `updated_at`, so only jobs whose lease
+(JOB_LEASE_SECONDS) has expired — their process died — are taken over.
+"""
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai_models.fingerprint import sha256_file
+from app.ai_models.radiology.ct_analysis.volumetric import is_volume_file
+from app.config import settings
+from app.core.constants import JobKind, JobStatus
+from app.core.logging import logger
+from app.core.uploads import StagedUpload, copy_to_disk
+from app.database.session import async_session
+from app.models.job import Job
+
+# Stage → progress reached when the stage starts, per job kind
+STAGES = {
+    JobKind.RADIOLOGY_ANALYZE: {"inference": 0.1, "heatmap": 0.6},
+    JobKind.PATHOLOGY_ANALYZE: {"inference": 0.1},
+    JobKind.REPORT_GENERATE: {"rag": 0.1, "llm": 0.3, "save": 0.9},
+}
+TERMINAL = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
+
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+_reaper: asyncio.Task | None = None
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+
+
+# ── Submission ───────────────────────────────────────────
+async def submit(
+    kind: JobKind,
+    params: dict,
+    user_id: int = None,
+    fileobj=None,
+    filename: str = None,
+) -> Job:
+    """
+    Persist a new job and enqueue it. An uploaded file is staged under
+    UPLOAD_DIR/jobs so the job can be (re)run without the original request.
+    Raises UploadTooLarge if the file exceeds MAX_UPLOAD_SIZE (MAX_VOLUME_UPLOAD_SIZE for volumes).
+    """
+    job_id = str(uuid.uuid4())
+    params = dict(params)
+    if fileobj is not None:
+        name = (filename or "").lower()
+        ext = ".nii.gz" if name.endswith(".nii.gz") else os.path.splitext(name)[1] or ".png"
+        input_path = os.path.join(_jobs_dir(), f"{job_id}{ext}")
+        max_bytes = settings.MAX_VOLUME_UPLOAD_SIZE if is_volume_file(filename) else settings.MAX_UPLOAD_SIZE
+        _, sha256 = await asyncio.to_thread(copy_to_disk, fileobj, input_path, max_bytes)
+        params["input_path"] = input_path
+        params["filename"] = filename
+        params["sha256"] = sha256
+
+    job = Job(id=job_id, user_id=user_id, kind=kind.value, status=JobStatus.QUEUED.value, params=params)
+    # Own session: the row must be committed before a worker can pick it up
+    async with async_session() as session:
+        session.add(job)
+        await session.commit()
+
+    _enqueue(job_id)
+    logger.info(f"Job {job_id} queued: {kind.value}")
+    return job
+
+
+async def get_job(job_id: str, db: AsyncSession) -> Job | None:
+    result = await db.execute(select(Job).where(Job.id == job_id))
+    return result.scalar_one_or_none()
+
+
+def to_event(job: Job) -> dict:
+    return jsonable_encoder({
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "updated_at": job.updated_at,
+    })
+
+
+async def stream_events(job_id: str) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for a job: the current state first, then every progress update
+    until the job finishes. Idle streams re-read the row, so updates made by another
+    API process still arrive, and the re-read doubles as a keep-alive.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    _subscribers.setdefault(job_id, set()).add(events)
+    try:
+        last = None
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=settings.JOB_EVENT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                async with async_session() as session:
+                    job = await get_job(job_id, session)
+                if job is None:
+                    return
+                event = to_event(job)
+
+            if event != last:
+                last = event
+                yield f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if event["status"] in TERMINAL:
+                return
+    finally:
+        subscribers = _subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(events)
+            if not subscribers:
+                _subscribers.pop(job_id, None)
+
+
+# ── Worker pool ──────────────────────────────────────────
+async def start_workers():
+    """Start the job workers and resume jobs left over from a previous run."""
+    global _queue, _reaper
+    _queue = asyncio.Queue()
+
+    await _requeue_expired()
+    async with async_session() as session:
+        result = await session.execute(
+            select(Job.id).where(Job.status == JobStatus.QUEUED.value).order_by(Job.created_at)
+        )
+        pending = result.scalars().all()
+
+    for job_id in pending:
+        _queue.put_nowait(job_id)
+    for i in range(max(1, settings.JOB_WORKERS)):
+        _workers.append(asyncio.create_task(_worker(i), name=f"job-worker-{i}"))
+    _reaper = asyncio.create_task(_reap(), name="job-reaper")
+    if pending:
+        logger.info(f"Resumed {len(pending)} pending job(s)")
+
+
+async def shutdown_workers():
+    global _reaper
+    tasks = _workers + ([_reaper] if _reaper else [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+    _reaper = None
+
+
+def stats() -> dict:
+    return {
+        "workers": len(_workers),
+        "queue_depth": _queue.qsize() if _queue else 0,
+        "subscribers": sum(len(s) for s in _subscribers.values()),
+    }
+
+
+def _enqueue(job_id: str):
+    if _queue is None:
+        # Workers not started (e.g. scripts) — the job is picked up on next startup
+        logger.warning(f"Job workers not running; job {job_id} stays queued")
+        return
+    _queue.put_nowait(job_id)
+
+
+async def _requeue_expired() -> int:
+    """
+    Put jobs whose runner stopped heartbeating back in the queue. The status check in
+    the UPDATE makes the takeover atomic when several processes reap at once.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    requeued = []
+    async with async_session() as session:
+        result = await session.execute(
+            select(Job.id).where(Job.status == JobStatus.RUNNING.value, Job.updated_at < cutoff)
+        )
+        for job_id in result.scalars().all():
+            taken = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.RUNNING.value, Job.updated_at < cutoff)
+                .values(status=JobStatus.QUEUED.value, updated_at=datetime.now(timezone.utc))
+            )
+            if taken.rowcount == 1:
+                requeued.append(job_id)
+        await session.commit()
+
+    for job_id in requeued:
+        logger.warning(f"Job {job_id} lease expired — requeued")
+        if _queue is not None:
+            _queue.put_nowait(job_id)
+    return len(requeued)
+
+
+async def _reap():
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS)
+        try:
+            await _requeue_expired()
+        except Exception as e:
+            logger.warning(f"Job lease check failed: {e}")
+
+
+async def _heartbeat(job_id: str):
+    """Keep a running job's lease fresh while its handler works."""
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        try:
+            async with async_session() as session:
+                await session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.RUNNING.value)
+                    .values(updated_at=datetime.now(timezone.utc))
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Job {job_id} heartbeat failed: {e}")
+
+
+async def _worker(index: int):
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job worker {index}: job {job_id} crashed: {e}")
+
+
+async def _claim(job_id: str) -> Job | None:
+    """
+    Move a queued job to running with one conditional UPDATE; only the worker whose
+    UPDATE matched the queued row runs it. Jobs out of attempts are failed instead.
+    """
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        exhausted = await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value, Job.attempts >= settings.JOB_MAX_ATTEMPTS)
+            .values(
+                status=JobStatus.FAILED.value,
+                error=f"Gave up after {settings.JOB_MAX_ATTEMPTS} interrupted attempts",
+                updated_at=now,
+                finished_at=now,
+            )
+        )
+        claimed = await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+            .values(status=JobStatus.RUNNING.value, attempts=Job.attempts + 1, updated_at=now)
+        )
+        await session.commit()
+        if exhausted.rowcount == 0 and claimed.rowcount != 1:
+            return None  # already taken by another worker or process
+        job = await get_job(job_id, session)
+    _publish(job_id, to_event(job))
+    return job if claimed.rowcount == 1 else None
+
+
+async def _run(job_id: str):
+    job = await _claim(job_id)
+    if job is None:
+        return
+    kind, params, user_id = JobKind(job.kind), job.params or {}, job.user_id
+
+    async def on_stage(stage: str):
+        await _update(job_id, stage=stage, progress=STAGES[kind].get(stage))
+
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        result = await _HANDLERS[kind](params, user_id, on_stage)
+    except Exception as e:
+        logger.warning(f"Job {job_id} ({kind.value}) failed: {e}")
+        await _update(job_id, status=JobStatus.FAILED.value, error=str(e), finished=True)
+        _remove_input(params)
+        return
+    finally:
+        heartbeat.cancel()
+
+    await _update(job_id, status=JobStatus.SUCCEEDED.value, progress=1.0, result=jsonable_encoder(result), finished=True)
+    _remove_input(params)
+    logger.info(f"Job {job_id} ({kind.value}) succeeded")
+
+
+async def _update(job_id: str, finished: bool = False, **values):
+    """Persist job state and push it to SSE subscribers."""
+    values = {k: v for k, v in values.items() if v is not None}
+    now = datetime.now(timezone.utc)
+    values["updated_at"] = now
+    if finished:
+        values["finished_at"] = now
+    async with async_session() as session:
+        await session.execute(update(Job).where(Job.id == job_id).values(**values))
+        await session.commit()
+        job = await get_job(job_id, session)
+    if job is not None:
+        _publish(job_id, to_event(job))
+
+
+def _publish(job_id: str, event: dict):
+    for events in _subscribers.get(job_id, ()):
+        events.put_nowait(event)
+
+
+# ── Pipelines ────────────────────────────────────────────
+async def _radiology_analyze(params: dict, user_id: int | None, on_stage) -> dict:
+    from app.services import radiology_service
+
+    await on_stage("inference")
+    async with async_session() as db:
+        if is_volume_file(params["filename"]):
+            with open(params["input_path"], "rb") as fileobj:
+                prediction = await radiology_service.analyze_volume(
+                    fileobj=fileobj,
+                    filename=params["filename"],
+                    cancer_type=params["cancer_type"],
+                    scan_type=params["scan_type"],
+                    patient_info=params["patient_info"],
+                    db=db,
+                    user_id=user_id,
+                )
+        else:
+            original = await asyncio.to_thread(_open_input, params)
+            with original.file:
+                image = await asyncio.to_thread(original.open_image)
+                prediction = await radiology_service.analyze_image(
+                    image=image,
+                    cancer_type=params["cancer_type"],
+                    scan_type=params["scan_type"],
+                    patient_info=params["patient_info"],
+                    db=db,
+                    user_id=user_id,
+                    original=original,
+                )
+            await db.commit()
+
+            # Explain in the job rather than in the background, so the result is complete
+            if prediction["heatmap_path"] is None:
+                await on_stage("heatmap")
+                prediction["heatmap_path"] = await radiology_service.get_heatmap(prediction["id"], db, user_id=user_id)
+        await db.commit()
+    return prediction
+
+
+async def _pathology_analyze(params: dict, user_id: int | None, on_stage) -> dict:
+    from app.services import pathology_service
+
+    await on_stage("inference")
+    original = await asyncio.to_thread(_open_input, params)
+    with original.file:
+        image = await asyncio.to_thread(original.open_image)
+        async with async_session() as db:
+            prediction = await pathology_service.analyze_blood_slide(
+                image=image,
+                patient_info=params["patient_info"],
+                biomarkers=params.get("biomarkers"),
+                db=db,
+                user_id=user_id,
+                original=original,
+            )
+            await db.commit()
+    return prediction
+
+
+async def _report_generate(params: dict, user_id: int | None, on_stage) -> dict:
+    from app.services import report_service
+
+    async with async_session() as db:
+        report = await report_service.generate_report(
+            prediction_id=params["prediction_id"],
+            db=db,
+            user_id=user_id,
+            on_stage=on_stage,
+        )
+        await db.commit()
+    return report
+
+
+_HANDLERS = {
+    JobKind.RADIOLOGY_ANALYZE: _radiology_analyze,
+    JobKind.PATHOLOGY_ANALYZE: _pathology_analyze,
+    JobKind.REPORT_GENERATE: _report_generate,
+}
+
+
+# ── Helpers ──────────────────────────────────────────────
+def _jobs_dir() -> str:
+    path = os.path.join(settings.UPLOAD_DIR, "jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _open_input(params: dict) -> StagedUpload:
+    """The staged input file as an upload, so the original is what gets stored."""
+    path = params["input_path"]
+    sha256 = params.get("sha256") or sha256_file(path)  # jobs queued before hashes were recorded
+    return StagedUpload(open(path, "rb"), params.get("filename") or os.path.basename(path), os.path.getsize(path), sha256)
+
+
+def _remove_input(params: dict):
+    path = params.get("input_path")
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,116 @@
+"""
+LLM Cache Service — deterministic cache and in-flight coalescing for Gemini reports.
+Entries are keyed by a SHA-256 over the prompt template version, model, prediction data,
+RAG context and patient fields, and live in the `llm_cache` table for LLM_CACHE_TTL_SECONDS.
+Concurrent requests for the same key share one in-flight generation.
+"""
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from sqlalchemy import delete, select, update
+
+from app.config import settings
+from app.core.logging import logger
+from app.database.session import async_session
+from app.models.llm_cache import LLMCacheEntry
+from app.services import gemini_service
+
+_inflight: dict[str, asyncio.Future] = {}
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0}
+
+
+def cache_key(prediction_data: dict, rag_context: list[str], patient_info: dict | None) -> str:
+    material = {
+        "prompt_version": gemini_service.PROMPT_VERSION,
+        "model": settings.GEMINI_MODEL,
+        "prediction": prediction_data,
+        "rag_context": rag_context,
+        "patient": patient_info,
+    }
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def get(key: str) -> dict | None:
+    """Cached sections for `key`, or None if absent or expired."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        result = await session.execute(
+            select(LLMCacheEntry.sections).where(LLMCacheEntry.key == key, LLMCacheEntry.expires_at > now)
+        )
+        sections = result.scalar_one_or_none()
+        if sections is not None:
+            await session.execute(
+                update(LLMCacheEntry).where(LLMCacheEntry.key == key).values(hits=LLMCacheEntry.hits + 1)
+            )
+            await session.commit()
+    _stats["hits" if sections is not None else "misses"] += 1
+    return sections
+
+
+async def put(key: str, sections: dict):
+    if not settings.LLM_CACHE_ENABLED:
+        return
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        await session.merge(LLMCacheEntry(
+            key=key,
+            model=settings.GEMINI_MODEL,
+            prompt_version=gemini_service.PROMPT_VERSION,
+            sections=sections,
+            hits=0,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS),
+        ))
+        await session.commit()
+    _stats["stores"] += 1
+
+
+@asynccontextmanager
+async def coalesce(key: str) -> AsyncIterator[tuple[bool, asyncio.Future]]:
+    """
+    Join or lead the in-flight generation for `key`. Yields (leader, future): the leader
+    generates and must `future.set_result(sections or None)`; followers await the future.
+    A leader that exits without a result releases its followers with None.
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        _stats["coalesced"] += 1
+        yield False, future
+        return
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        yield True, future
+    finally:
+        if not future.done():
+            future.set_result(None)
+        _inflight.pop(key, None)
+
+
+async def purge_expired() -> int:
+    """Delete expired entries (run at startup)."""
+    async with async_session() as session:
+        result = await session.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= datetime.now(timezone.utc))
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.info(f"Purged {result.rowcount} expired LLM cache entries")
+    return result.rowcount
+
+
+def stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "in_flight": len(_inflight),
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+    }
@@ -1,8 +1,13 @@
 """
 LLM Service — Orchestrator for RAG → Gemini pipeline.
 Falls back to rule-based generation if Gemini is unavailable.
+Gemini output is cached by input hash and identical concurrent requests share one call
+(llm_cache_service).
 """
-from app.services import rag_service, gemini_service
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.services import rag_service, gemini_service, llm_cache_service
 from app.core.constants import risk_level_from_score
 from app.core.logging import logger
 
@@ -10,10 +15,12 @@ from app.core.logging import logger
 async def generate_report(
     prediction_data: dict,
     patient_info: dict = None,
+    on_stage: Callable[[str], Awaitable[None]] | None = None,
 ) -> dict:
     """
     Full pipeline: prediction → RAG context → Gemini report.
     Falls back to rule-based if Gemini unavailable.
+    `on_stage` is awaited with "rag" / "llm" as each step starts (job progress).
 
     Returns: dict with report sections
     """
@@ -22,12 +29,30 @@ async def generate_report(
     confidence = prediction_data.get("confidence", 0)
 
     # Step 1: Retrieve context from RAG
+    if on_stage:
+        await on_stage("rag")
     logger.info(f"RAG retrieval for {cancer_type}/{predicted_class}")
     rag_context = rag_service.retrieve_context(cancer_type, predicted_class, confidence)
 
-    # Step 2: Try Gemini
-    logger.info("Attempting Gemini report generation...")
-    gemini_report = await gemini_service.generate_report(prediction_data, rag_context, patient_info)
+    # Step 2: Try Gemini (cached / coalesced by input hash)
+    if on_stage:
+        await on_stage("llm")
+    key = llm_cache_service.cache_key(prediction_data, rag_context, patient_info)
+    gemini_report = await llm_cache_service.get(key)
+    if gemini_report is not None:
+        logger.info("Gemini report served from cache.")
+        return {"sections": gemini_report, "generated_by": "gemini"}
+
+    async with llm_cache_service.coalesce(key) as (leader, future):
+        if leader:
+            logger.info("Attempting Gemini report generation...")
+            gemini_report = await gemini_service.generate_report(prediction_data, rag_context, patient_info)
+            if gemini_report:
+                await llm_cache_service.put(key, gemini_report)
+            future.set_result(gemini_report)
+        else:
+            logger.info("Joining in-flight Gemini generation for identical inputs.")
+            gemini_report = await asyncio.shield(future)
 
     if gemini_report:
         logger.info("Gemini report generated successfully.")
@@ -38,6 +63,60 @@ async def generate_report(
     return {"sections": _rule_based_report(prediction_data, rag_context, patient_info), "generated_by": "rule_based"}
 
 
+async def stream_report(prediction_data: dict, patient_info: dict = None) -> AsyncIterator[dict]:
+    """
+    Streaming variant of `generate_report`. Yields {"type": "stage", "stage"} as each step starts,
+    {"type": "section", "key", "value"} as each report section completes, and finally
+    {"type": "complete", "sections", "generated_by"}. Sections Gemini didn't deliver (unavailable
+    failed mid-stream or sent malformed members) are filled in from the rule-based report. Cached or coalesced
+    results are replayed section by section.
+    """
+    cancer_type = prediction_data.get("cancer_type", "unknown")
+    predicted_class = prediction_data.get("predicted_class", "unknown")
+    confidence = prediction_data.get("confidence", 0)
+
+    yield {"type": "stage", "stage": "rag"}
+    rag_context = rag_service.retrieve_context(cancer_type, predicted_class, confidence)
+
+    yield {"type": "stage", "stage": "llm"}
+    sections, generated_by, failure = {}, "gemini", None
+    cache_key = llm_cache_service.cache_key(prediction_data, rag_context, patient_info)
+    ready = await llm_cache_service.get(cache_key)
+    if ready is None:
+        async with llm_cache_service.coalesce(cache_key) as (leader, future):
+            if leader:
+                try:
+                    async for key, value in gemini_service.stream_report(prediction_data, rag_context, patient_info):
+                        sections[key] = value
+                        yield {"type": "section", "key": key, "value": value}
+                    missing = [key for key in gemini_service.REPORT_SECTIONS if key not in sections]
+                    if missing:
+                        # Skipped (malformed) members — fill in below, don't cache or share a partial report
+                        failure = f"incomplete, missing {', '.join(missing)}"
+                    else:
+                        await llm_cache_service.put(cache_key, sections)
+                        future.set_result(sections)
+                except Exception as e:
+                    failure = f"after {len(sections)} section(s): {e}"
+            else:
+                ready = await asyncio.shield(future)
+                if ready is None:
+                    failure = "identical in-flight generation failed"
+    for key, value in (ready or {}).items():
+        sections[key] = value
+        yield {"type": "section", "key": key, "value": value}
+
+    if failure:
+        logger.warning(f"Gemini streaming unavailable {failure}")
+        generated_by = "gemini+rule_based" if sections else "rule_based"
+        for key, value in _rule_based_report(prediction_data, rag_context, patient_info).items():
+            if key not in sections:
+                sections[key] = value
+                yield {"type": "section", "key": key, "value": value}
+
+    yield {"type": "complete", "sections": sections, "generated_by": generated_by}
+
+
 def _rule_based_report(prediction_data: dict, rag_context: list[str], patient_info: dict = None) -> dict:
     """Generate a structured report using rules and RAG context."""
     cancer_type = prediction_data.get("cancer_type", "Unknown")
@@ -1,18 +1,21 @@
 """
 Pathology Service — handles blood cancer analysis from blood slide images.
 """
-import os
-import uuid
 import asyncio
 from PIL import Image
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.config import settings
+from app.core import blob_store
 from app.core.logging import logger
 from app.core.constants import risk_level_from_score
+from app.core.uploads import StagedUpload
+from app.core.pagination import DEFAULT_PAGE_SIZE, paginate, page_items
 from app.models.prediction import Prediction
-from app.ai_models.pathology.inference import predict
+from app.ai_models import workers
+from app.services import inference_cache_service
+from app.ai_models.pathology.inference import predict, predict_batch
 
 
 async def analyze_blood_slide(
@@ -21,19 +24,27 @@ async def analyze_blood_slide(
     biomarkers: dict = None,
     db: AsyncSession = None,
     user_id: int = None,
+    original: StagedUpload | None = None,
 ) -> dict:
     """
     Analyze a blood slide image for blood cancer detection.
     Optionally incorporates biomarker data (CBC values).
+    `original` is the uploaded file; it is stored as-is rather than re-encoded.
+    A slide already analyzed by the current checkpoint reuses the cached output.
     """
-    # Save image
-    img_id = str(uuid.uuid4())[:8]
-    img_filename = f"blood_{img_id}.png"
-    img_path = os.path.join(settings.UPLOAD_DIR, img_filename)
-    image.save(img_path)
+    # Store the upload content-addressed (a re-uploaded slide reuses its blob)
+    img_filename = await asyncio.to_thread(blob_store.put_image, image, original)
+    image_hash = blob_store.digest_of(img_filename)
 
-    # Run blood cancer inference in a thread to avoid blocking
-    result = await asyncio.to_thread(predict, image)
+    result = await inference_cache_service.lookup(image_hash, "blood")
+    if result is None:
+        # Run blood cancer inference in a worker process, or in a thread to avoid blocking
+        if workers.enabled():
+            pool = await workers.acquire_pool()
+            result = await pool.infer("blood", image)
+        else:
+            result = await asyncio.to_thread(predict, image)
+        await inference_cache_service.store(image_hash, "blood", result)
 
     # Incorporate biomarkers into risk scoring
     risk_score = result.get("risk_score", 0)
@@ -81,6 +92,88 @@ async def analyze_blood_slide(
     }
 
 
+async def analyze_batch(
+    images: list[tuple[str, Image.Image]],
+    patient_info: dict,
+    biomarkers: dict = None,
+    db: AsyncSession = None,
+    user_id: int = None,
+    originals: list[StagedUpload] | None = None,
+) -> list[tuple[str, dict]]:
+    """
+    Analyze every slide of a study in batched model calls and insert all
+    predictions in one flush. Returns (filename, prediction dict) per slide.
+    `originals` (parallel to `images`) are the uploaded files to store.
+    """
+    originals = originals or [None] * len(images)
+    img_filenames = await asyncio.gather(*[
+        asyncio.to_thread(blob_store.put_image, image, original)
+        for (_, image), original in zip(images, originals)
+    ])
+
+    # Only slides not seen before (by the current checkpoint) go through the model, once each
+    hashes = [blob_store.digest_of(img_filename) for img_filename in img_filenames]
+    cached = await inference_cache_service.lookup_many(hashes, "blood")
+    slide_by_hash = {image_hash: image for image_hash, (_, image) in zip(hashes, images)}
+    missing = [image_hash for image_hash in slide_by_hash if image_hash not in cached]
+    slides = [slide_by_hash[image_hash] for image_hash in missing]
+    if workers.enabled():
+        pool = await workers.acquire_pool()
+        fresh = list(await asyncio.gather(*[pool.infer("blood", image) for image in slides]))
+    else:
+        fresh = []
+        for i in range(0, len(slides), settings.BATCH_MAX_SIZE):
+            fresh.extend(await asyncio.to_thread(predict_batch, slides[i:i + settings.BATCH_MAX_SIZE]))
+    fresh_by_hash = dict(zip(missing, fresh))
+    await inference_cache_service.store_many(fresh_by_hash, "blood")
+    results = [cached.get(image_hash) or fresh_by_hash[image_hash] for image_hash in hashes]
+
+    predictions = []
+    for result, img_filename in zip(results, img_filenames):
+        risk_score = result.get("risk_score", 0)
+        if biomarkers:
+            risk_score = _adjust_risk_with_biomarkers(risk_score, biomarkers)
+        predictions.append(Prediction(
+            user_id=user_id,
+            patient_id=patient_info.get("patient_id"),
+            patient_name=patient_info.get("name"),
+            patient_age=patient_info.get("age"),
+            cancer_type="blood",
+            scan_type="pathology",
+            image_path=img_filename,
+            predicted_class=result["predicted_class"],
+            confidence=result["confidence"],
+            risk_score=risk_score,
+            risk_level=risk_level_from_score(risk_score).value,
+            probabilities=result.get("probabilities"),
+            biomarkers=biomarkers,
+        ))
+    db.add_all(predictions)
+    await db.flush()
+
+    logger.info(f"Pathology batch of {len(images)} slides analyzed")
+
+    return [
+        (name, {
+            "id": p.id,
+            "cancer_type": "blood",
+            "scan_type": "pathology",
+            "predicted_class": p.predicted_class,
+            "confidence": p.confidence,
+            "risk_score": p.risk_score,
+            "risk_level": p.risk_level,
+            "probabilities": p.probabilities,
+            "biomarkers": biomarkers,
+            "image_path": p.image_path,
+            "patient_id": p.patient_id,
+            "patient_name": p.patient_name,
+            "patient_age": p.patient_age,
+            "created_at": p.created_at,
+        })
+        for (name, _), p in zip(images, predictions)
+    ]
+
+
 def _adjust_risk_with_biomarkers(base_risk: float, biomarkers: dict) -> float:
     """Adjust risk score based on CBC biomarker values."""
     risk = base_risk
@@ -101,11 +194,14 @@ def _adjust_risk_with_biomarkers(base_risk: float, biomarkers: dict) -> float:
     return round(risk, 2)
 
 
-async def get_history(db: AsyncSession, user_id: int = None, limit: int = 20) -> list:
-    query = select(Prediction).where(
-        Prediction.scan_type == "pathology"
-    ).order_by(Prediction.created_at.desc()).limit(limit)
+async def get_history(
+    db: AsyncSession,
+    user_id: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+) -> tuple[list, str | None]:
+    query = select(Prediction).where(Prediction.scan_type == "pathology")
     if user_id:
         query = query.where(Prediction.user_id == user_id)
-    result = await db.execute(query)
-    return result.scalars().all()
+    result = await db.execute(paginate(query, Prediction, limit, cursor))
+    return page_items(result.scalars().all(), limit)
@@ -2,18 +2,33 @@
 Radiology Service — orchestrates image upload → model inference → GradCAM → save prediction.
 """
 import os
-import uuid
+import tempfile
 import time
 import asyncio
 from PIL import Image
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from app.config import settings
 from app.core.logging import logger
+from app.core import blob_store
+from app.core.uploads import StagedUpload, UploadTooLarge, copy_to_disk
+from app.core.pagination import DEFAULT_PAGE_SIZE, paginate, page_items
 from app.core.constants import CancerType, ScanType, risk_level_from_score
 from app.models.prediction import Prediction
-from app.ai_models.explainability.gradcam import save_heatmap
+from app.database.session import async_session
+from app.ai_models.explainability import heatmap_cache
+from app.ai_models import registry, workers
+from app.ai_models.batching import get_batcher
+from app.ai_models.fingerprint import sha256_file, model_version
+from app.services import inference_cache_service
+
+# Cancer types whose model (the CT 3D UNet) can analyze NIfTI / DICOM volumes
+VOLUME_CANCER_TYPES = ("ct", "bone")
+
+# In-flight heatmap generations keyed by cache key, and fire-and-forget background jobs
+_heatmap_tasks: dict[str, asyncio.Task] = {}
+_background_tasks: set[asyncio.Task] = set()
 
 
 async def analyze_image(
@@ -23,85 +38,375 @@ async def analyze_image(
     patient_info: dict,
     db: AsyncSession,
     user_id: int = None,
+    original: StagedUpload | None = None,
 ) -> dict:
     """
     Full radiology analysis pipeline:
     1. Select model based on cancer_type
     2. Run inference
-    3. Generate GradCAM heatmap
-    4. Save prediction to DB
-    5. Return result
+    3. Save prediction to DB
+    4. Return result — the GradCAM heatmap is reused from cache, or generated
+       in the background / on first request to `get_heatmap`
+    `original` is the uploaded file; it is stored as-is rather than re-encoded.
+    An image already analyzed by the current checkpoint reuses the cached output.
     """
     t0 = time.time()
 
-    # Save uploaded image
-    img_id = str(uuid.uuid4())[:8]
-    img_filename = f"{cancer_type}_{img_id}.png"
-    img_path = os.path.join(settings.UPLOAD_DIR, img_filename)
-    image.save(img_path)
+    # Store the upload content-addressed (a re-uploaded scan reuses its blob)
+    img_filename = await asyncio.to_thread(blob_store.put_image, image, original)
+    image_hash = blob_store.digest_of(img_filename)
+
+    result = await inference_cache_service.lookup(image_hash, cancer_type)
+    if result is None:
+        # Run inference off the event loop (micro-batched with concurrent requests)
+        t1 = time.time()
+        result = await _infer(image, cancer_type)
+        logger.info(f"⏱️ Inference took {time.time()-t1:.2f}s")
+        await inference_cache_service.store(image_hash, cancer_type, result)
+
+    # GradCAM is produced lazily — reuse an overlay if this image was already explained
+    heatmap_filename = None
+    has_model = _has_model(cancer_type)
+    if has_model:
+        heatmap_filename = await _cached_heatmap(img_filename, cancer_type, result["predicted_class"])
+
+    # Save to DB
+    prediction = _build_prediction(result, cancer_type, scan_type, img_filename, heatmap_filename, patient_info, user_id)
+    db.add(prediction)
+    await db.flush()
+    await db.refresh(prediction)
+
+    if has_model and heatmap_filename is None and settings.HEATMAP_MODE == "background":
+        _schedule_heatmap(prediction.id, img_filename, cancer_type, result["predicted_class"])
+
+    logger.info(f"✅ Radiology analysis complete in {time.time()-t0:.2f}s: {cancer_type}/{result['predicted_class']} ({result['confidence']}%)")
+
+    return _to_response(prediction)
+
+
+async def analyze_batch(
+    images: list[tuple[str, Image.Image]],
+    cancer_type: str,
+    scan_type: str,
+    patient_info: dict,
+    db: AsyncSession,
+    user_id: int = None,
+    originals: list[StagedUpload] | None = None,
+) -> list[tuple[str, dict]]:
+    """
+    Multi-image study pipeline:
+    1. Store all images (originals from `originals`, parallel to `images`) concurrently
+    2. Run images the inference cache hasn't seen through the model as real batches
+    3. Insert every prediction in one flush (committed as one transaction)
+    Returns (filename, prediction dict) per image, in input order.
+    """
+    t0 = time.time()
+    originals = originals or [None] * len(images)
+    img_filenames = await asyncio.gather(*[
+        asyncio.to_thread(blob_store.put_image, image, original)
+        for (_, image), original in zip(images, originals)
+    ])
+
+    hashes = [blob_store.digest_of(img_filename) for img_filename in img_filenames]
+    cached = await inference_cache_service.lookup_many(hashes, cancer_type)
+    image_by_hash = {image_hash: image for image_hash, (_, image) in zip(hashes, images)}
+    missing = [image_hash for image_hash in image_by_hash if image_hash not in cached]
+    fresh_by_hash = dict(zip(missing, await _infer_many([image_by_hash[h] for h in missing], cancer_type)))
+    await inference_cache_service.store_many(fresh_by_hash, cancer_type)
+    results = [cached.get(image_hash) or fresh_by_hash[image_hash] for image_hash in hashes]
+
+    predictions = [
+        _build_prediction(result, cancer_type, scan_type, img_filename, None, patient_info, user_id)
+        for result, img_filename in zip(results, img_filenames)
+    ]
+    db.add_all(predictions)
+    await db.flush()
+
+    if _has_model(cancer_type) and settings.HEATMAP_MODE == "background":
+        for prediction in predictions:
+            _schedule_heatmap(prediction.id, prediction.image_path, cancer_type, prediction.predicted_class)
+
+    logger.info(f"✅ Radiology batch of {len(images)} analyzed in {time.time()-t0:.2f}s: {cancer_type}")
+    return [(name, _to_response(prediction)) for (name, _), prediction in zip(images, predictions)]
 
-    # Run inference in a thread so it doesn't block the async event loop
-    t1 = time.time()
-    result = await asyncio.to_thread(_run_inference, image, cancer_type)
-    logger.info(f"⏱️ Inference took {time.time()-t1:.2f}s")
 
-    # Generate GradCAM heatmap (also in a thread)
-    heatmap_path = None
+async def analyze_volume(
+    fileobj,
+    filename: str,
+    cancer_type: str,
+    scan_type: str,
+    patient_info: dict,
+    db: AsyncSession,
+    user_id: int = None,
+) -> dict:
+    """
+    Volumetric CT pipeline for NIfTI (.nii/.nii.gz) and DICOM (.dcm / zipped series) uploads:
+    1. Stream the upload to a private temp file (the volume is never held in memory)
+    2. Sliding-window 3D UNet inference, aggregated into the nodule-ratio classification
+    3. Save a middle-slice preview as the prediction image (the volume itself is not kept)
+    4. Save prediction to DB
+    Raises ValueError if the cancer type has no volumetric model or the volume can't be
+    read (UploadTooLarge past MAX_VOLUME_UPLOAD_SIZE).
+    """
+    from app.ai_models.radiology.ct_analysis.inference import predict_volume
+
+    if cancer_type not in VOLUME_CANCER_TYPES:
+        raise ValueError(
+            f"Volumetric uploads are analyzed by the CT model; cancer_type must be one of "
+            f"{', '.join(VOLUME_CANCER_TYPES)} (got '{cancer_type}')"
+        )
+
+    t0 = time.time()
+    name = filename.lower()
+    ext = ".nii.gz" if name.endswith(".nii.gz") else os.path.splitext(name)[1]
+    fd, volume_path = tempfile.mkstemp(prefix="volume-", suffix=ext)
+    os.close(fd)
     try:
-        model = _get_model(cancer_type)
-        if model is not None:
-            heatmap_filename = f"heatmap_{cancer_type}_{img_id}.png"
-            heatmap_path = os.path.join(settings.UPLOAD_DIR, heatmap_filename)
-            t2 = time.time()
-            await asyncio.to_thread(save_heatmap, image, model, heatmap_path)
-            logger.info(f"⏱️ GradCAM took {time.time()-t2:.2f}s")
+        await asyncio.to_thread(copy_to_disk, fileobj, volume_path, settings.MAX_VOLUME_UPLOAD_SIZE)
+        if workers.enabled():
+            pool = await workers.acquire_pool()
+            result = await pool.infer_volume(volume_path, filename)
+        else:
+            result = await asyncio.to_thread(predict_volume, volume_path, filename)
+    except (UploadTooLarge, workers.PoolUnavailable):
+        raise
     except Exception as e:
-        logger.warning(f"GradCAM failed: {e}")
+        logger.warning(f"Volume inference failed for {filename}: {e}")
+        raise ValueError(f"Could not read volume: {e}")
+    finally:
+        os.remove(volume_path)
+
+    preview = result.pop("preview")
+    volume_stats = result.pop("volume")
+    img_filename = await asyncio.to_thread(blob_store.put_image, Image.fromarray(preview))
 
+    prediction = _build_prediction(result, cancer_type, scan_type, img_filename, None, patient_info, user_id)
+    db.add(prediction)
+    await db.flush()
+    await db.refresh(prediction)
+
+    logger.info(
+        f"✅ Volumetric analysis complete in {time.time()-t0:.2f}s: {volume_stats.get('shape')} voxels, "
+        f"{volume_stats.get('patches', 0)} patches → {result['predicted_class']} ({result['confidence']}%)"
+    )
+    return _to_response(prediction)
+
+
+def _build_prediction(
+    result: dict,
+    cancer_type: str,
+    scan_type: str,
+    image_path: str,
+    heatmap_path: str | None,
+    patient_info: dict,
+    user_id: int = None,
+) -> Prediction:
     # Calculate risk
     risk_score = result.get("risk_score", result.get("confidence", 0))
     risk_level = risk_level_from_score(risk_score)
 
-    # Save to DB
-    prediction = Prediction(
+    return Prediction(
         user_id=user_id,
         patient_id=patient_info.get("patient_id"),
         patient_name=patient_info.get("patient_name"),
         patient_age=patient_info.get("patient_age"),
         cancer_type=cancer_type,
         scan_type=scan_type,
-        image_path=img_filename,
+        image_path=image_path,
         predicted_class=result["predicted_class"],
         confidence=result["confidence"],
         risk_score=risk_score,
         risk_level=risk_level.value,
         probabilities=result.get("probabilities"),
-        heatmap_path=heatmap_filename if heatmap_path else None,
+        heatmap_path=heatmap_path,
     )
-    db.add(prediction)
-    await db.flush()
-    await db.refresh(prediction)
 
-    logger.info(f"✅ Radiology analysis complete in {time.time()-t0:.2f}s: {cancer_type}/{result['predicted_class']} ({result['confidence']}%)")
 
+def _to_response(prediction: Prediction) -> dict:
     return {
         "id": prediction.id,
-        "cancer_type": cancer_type,
-        "scan_type": scan_type,
-        "predicted_class": result["predicted_class"],
-        "confidence": result["confidence"],
-        "risk_score": risk_score,
-        "risk_level": risk_level.value,
-        "probabilities": result.get("probabilities"),
-        "heatmap_path": heatmap_filename if heatmap_path else None,
-        "image_path": img_filename,
-        "patient_id": patient_info.get("patient_id"),
-        "patient_name": patient_info.get("patient_name"),
-        "patient_age": patient_info.get("patient_age"),
+        "cancer_type": prediction.cancer_type,
+        "scan_type": prediction.scan_type,
+        "predicted_class": prediction.predicted_class,
+        "confidence": prediction.confidence,
+        "risk_score": prediction.risk_score,
+        "risk_level": prediction.risk_level,
+        "probabilities": prediction.probabilities,
+        "heatmap_path": prediction.heatmap_path,
+        "image_path": prediction.image_path,
+        "patient_id": prediction.patient_id,
+        "patient_name": prediction.patient_name,
+        "patient_age": prediction.patient_age,
         "created_at": prediction.created_at,
     }
 
 
+async def get_heatmap(prediction_id: int, db: AsyncSession, user_id: int = None) -> str | None:
+    """
+    Return the GradCAM overlay path for a prediction, generating it on first request.
+    Raises ValueError if the prediction doesn't exist or isn't `user_id`'s — GradCAM is a
+    full forward+backward pass, so it only runs for the prediction's owner.
+    """
+    result = await db.execute(select(Prediction).where(Prediction.id == prediction_id))
+    prediction = result.scalar_one_or_none()
+    if (
+        not prediction
+        or prediction.scan_type == "pathology"
+        or prediction.user_id != user_id
+    ):
+        raise ValueError(f"Radiology prediction {prediction_id} not found")
+
+    if prediction.heatmap_path and os.path.exists(os.path.join(settings.UPLOAD_DIR, prediction.heatmap_path)):
+        return prediction.heatmap_path
+
+    heatmap_path = await _generate_heatmap(prediction.image_path, prediction.cancer_type, prediction.predicted_class)
+    if heatmap_path:
+        prediction.heatmap_path = heatmap_path
+        await db.flush()
+    return heatmap_path
+
+
+async def _heatmap_key(image_filename: str, cancer_type: str, target_class: str) -> str:
+    image_hash = blob_store.digest_of(image_filename)
+    if image_hash is None:
+        image_hash = await asyncio.to_thread(sha256_file, os.path.join(settings.UPLOAD_DIR, image_filename))
+    version = await asyncio.to_thread(model_version, cancer_type)
+    return heatmap_cache.heatmap_key(image_hash, version, target_class)
+
+
+async def _cached_heatmap(image_filename: str, cancer_type: str, target_class: str) -> str | None:
+    try:
+        return heatmap_cache.lookup(await _heatmap_key(image_filename, cancer_type, target_class))
+    except Exception as e:
+        logger.warning(f"Heatmap cache lookup failed: {e}")
+        return None
+
+
+async def _generate_heatmap(image_filename: str, cancer_type: str, target_class: str) -> str | None:
+    """Get or compute the cached overlay; concurrent requests for the same key share one computation."""
+    if not image_filename or not _has_model(cancer_type):
+        return None
+
+    img_path = os.path.join(settings.UPLOAD_DIR, image_filename)
+    key = await _heatmap_key(image_filename, cancer_type, target_class)
+    cached = heatmap_cache.lookup(key)
+    if cached:
+        return cached
+
+    task = _heatmap_tasks.get(key)
+    if task is None:
+        task = asyncio.create_task(_compute_heatmap(img_path, cancer_type, key))
+        _heatmap_tasks[key] = task
+        task.add_done_callback(lambda _: _heatmap_tasks.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _compute_heatmap(img_path: str, cancer_type: str, key: str) -> str | None:
+    t0 = time.time()
+    try:
+        image = await asyncio.to_thread(lambda: Image.open(img_path).convert("RGB"))
+        _, heatmap = await _infer_with_heatmap(image, cancer_type)
+        heatmap_path = await asyncio.to_thread(heatmap_cache.store, image, heatmap, key)
+        logger.info(f"⏱️ GradCAM took {time.time()-t0:.2f}s")
+        return heatmap_path
+    except Exception as e:
+        logger.warning(f"GradCAM failed: {e}")
+        return None
+
+
+def _schedule_heatmap(prediction_id: int, image_filename: str, cancer_type: str, target_class: str):
+    task = asyncio.create_task(_background_heatmap(prediction_id, image_filename, cancer_type, target_class))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _background_heatmap(prediction_id: int, image_filename: str, cancer_type: str, target_class: str):
+    """Generate the overlay after the response and fill in `Prediction.heatmap_path`."""
+    heatmap_path = await _generate_heatmap(image_filename, cancer_type, target_class)
+    if not heatmap_path:
+        return
+
+    # The request's transaction may not have committed yet — retry until the row is visible
+    for attempt in range(5):
+        try:
+            async with async_session() as session:
+                updated = await session.execute(
+                    update(Prediction)
+                    .where(Prediction.id == prediction_id, Prediction.heatmap_path.is_(None))
+                    .values(heatmap_path=heatmap_path)
+                )
+                await session.commit()
+            if updated.rowcount:
+                return
+        except Exception as e:
+            logger.warning(f"Heatmap path update for prediction #{prediction_id} failed: {e}")
+        await asyncio.sleep(0.5 * (attempt + 1))
+
+
+async def _infer(image: Image.Image, cancer_type: str) -> dict:
+    """
+    Run inference for one image. In worker mode the image goes to the process pool;
+    otherwise, when batching is enabled, preprocessing runs in a worker thread and
+    the tensor joins the model's micro-batch queue.
+    """
+    if workers.enabled():
+        pool = await workers.acquire_pool()
+        return await pool.infer(workers.model_key(cancer_type), image)
+    if not settings.INFERENCE_BATCHING:
+        return await asyncio.to_thread(_run_inference, image, cancer_type)
+
+    inference = _inference_module(cancer_type)
+    tensor = await asyncio.to_thread(inference.preprocess_image, image)
+    batcher = get_batcher(inference.__name__, inference.predict_batch)
+    return await batcher.infer(tensor)
+
+
+async def _infer_many(images: list[Image.Image], cancer_type: str) -> list[dict]:
+    """Run inference for many images, batched through the model."""
+    if workers.enabled() or settings.INFERENCE_BATCHING:
+        # Concurrent submissions are grouped into forward passes by the batcher / worker pool
+        return list(await asyncio.gather(*[_infer(image, cancer_type) for image in images]))
+
+    inference = _inference_module(cancer_type)
+    tensors = await asyncio.gather(*[asyncio.to_thread(inference.preprocess_image, image) for image in images])
+    results = []
+    for i in range(0, len(tensors), settings.BATCH_MAX_SIZE):
+        results.extend(await asyncio.to_thread(inference.predict_batch, list(tensors[i:i + settings.BATCH_MAX_SIZE])))
+    return results
+
+
+async def _infer_with_heatmap(image: Image.Image, cancer_type: str) -> tuple[dict, object]:
+    """
+    Run inference and GradCAM for one image in a single forward pass.
+    Returns (result, heatmap); heatmap is None if it couldn't be computed.
+    """
+    if workers.enabled():
+        pool = await workers.acquire_pool()
+        return await pool.infer(workers.model_key(cancer_type), image, op="explain")
+
+    inference = _inference_module(cancer_type)
+    if not settings.INFERENCE_BATCHING:
+        return await asyncio.to_thread(
+            lambda: inference.predict_batch_with_heatmap([inference.preprocess_image(image)])[0]
+        )
+
+    tensor = await asyncio.to_thread(inference.preprocess_image, image)
+    batcher = get_batcher(f"{inference.__name__}.explain", inference.predict_batch_with_heatmap)
+    return await batcher.infer(tensor)
+
+
+def _inference_module(cancer_type: str):
+    """Resolve the inference module that serves a cancer type."""
+    if cancer_type == "brain":
+        from app.ai_models.radiology.brain_tumor import inference
+    elif cancer_type == "ct" or cancer_type == "bone":
+        from app.ai_models.radiology.ct_analysis import inference
+    else:
+        # lung, plus generic fallback
+        from app.ai_models.radiology.lung_cancer import inference
+    return inference
+
+
 def _run_inference(image: Image.Image, cancer_type: str) -> dict:
     """Route to the correct model inference."""
     if cancer_type == "lung":
@@ -119,29 +424,28 @@ def _run_inference(image: Image.Image, cancer_type: str) -> dict:
         return predict(image)
 
 
-def _get_model(cancer_type: str):
-    """Get the loaded PyTorch model for GradCAM."""
-    try:
-        if cancer_type == "lung":
-            from app.ai_models.radiology.lung_cancer.model import get_model
-            return get_model()
-        elif cancer_type == "brain":
-            from app.ai_models.radiology.brain_tumor.mri_model import get_model
-            return get_model()
-        elif cancer_type in ("ct", "bone"):
-            from app.ai_models.radiology.ct_analysis.ct_model import get_model
-            return get_model()
-    except Exception:
-        return None
-    return None
+def _has_model(cancer_type: str) -> bool:
+    """
+    Whether a real model (in-process or in a worker) serves this cancer type. Never loads
+    a model — this runs on the event loop.
+    """
+    if workers.enabled():
+        pool = workers.get_pool()
+        return pool is not None and pool.serves(workers.model_key(cancer_type))
+    if cancer_type not in ("lung", "brain", "ct", "bone"):
+        return False
+    return registry.available(workers.model_key(cancer_type))
 
 
-async def get_history(db: AsyncSession, user_id: int = None, limit: int = 20) -> list:
-    """Get prediction history."""
-    query = select(Prediction).where(
-        Prediction.scan_type != "pathology"
-    ).order_by(Prediction.created_at.desc()).limit(limit)
+async def get_history(
+    db: AsyncSession,
+    user_id: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+) -> tuple[list, str | None]:
+    """Get a page of prediction history and the cursor for the next page (None on the last page)."""
+    query = select(Prediction).where(Prediction.scan_type != "pathology")
     if user_id:
         query = query.where(Prediction.user_id == user_id)
-    result = await db.execute(query)
-    return result.scalars().all()
+    result = await db.execute(paginate(query, Prediction, limit, cursor))
+    return page_items(result.scalars().all(), limit)
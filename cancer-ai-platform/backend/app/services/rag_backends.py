@@ -0,0 +1,428 @@
+"""
+Pluggable vector-store backends for RAG retrieval.
+`NumpyBackend` is a dependency-free exact-search index: normalized embeddings live in
+an append-only, memory-mapped float matrix on disk and a query is one matmul plus
+argpartition. `ChromaBackend` wraps a persistent ChromaDB collection.
+"""
+import json
+import os
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from app.config import settings
+from app.core.logging import logger
+
+
+# ── Embedders ────────────────────────────────────────────
+class HashingEmbedder:
+    """
+    Dependency-free lexical embedder (feature hashing of word unigrams and bigrams).
+    Used when neither ChromaDB's ONNX model nor sentence-transformers is available.
+    """
+    name = "hashing-512"
+    _token_re = re.compile(r"\w+")
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = self._token_re.findall(text.lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vectors.tolist()
+
+
+def load_embedder() -> tuple:
+    """
+    Best available embedding function and its name: ChromaDB's ONNX MiniLM,
+    sentence-transformers, or lexical hashing.
+    """
+    try:
+        from chromadb.utils import embedding_functions
+        return embedding_functions.DefaultEmbeddingFunction(), "chroma-default"
+    except Exception:
+        pass
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+
+        def embed(texts: list[str]) -> list[list[float]]:
+            return model.encode(list(texts), batch_size=len(texts), normalize_embeddings=True).tolist()
+
+        return embed, "all-MiniLM-L6-v2"
+    except Exception:
+        pass
+    logger.warning("No neural embedding model available — RAG uses lexical hashing embeddings")
+    embedder = HashingEmbedder()
+    return embedder, embedder.name
+
+
+# ── Backend interface ────────────────────────────────────
+class VectorBackend(ABC):
+    """
+    Interface of a RAG vector store. `directory` also holds the ingest manifest, so
+    each backend tracks its own sync state; `embedder_name` is recorded there so a
+    model change re-embeds everything.
+    """
+    name = "base"
+    directory: Path
+    embedder_name: str
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> list:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def upsert(self, ids: list[str], documents: list[str], embeddings: list, metadatas: list[dict]):
+        ...
+
+    @abstractmethod
+    def delete(self, source: str):
+        """Remove every chunk of a knowledge source."""
+        ...
+
+    @abstractmethod
+    def reset(self):
+        """Drop all chunks."""
+        ...
+
+    @abstractmethod
+    def search(self, text: str, n_results: int, topics: Iterable[str] | None = None) -> list[tuple[str, str, float]]:
+        """Top (id, document, similarity) for `text`, restricted to `topics` when given."""
+        ...
+
+    @abstractmethod
+    def chunks(self) -> Iterator[tuple[str, str, dict]]:
+        """Every stored (id, document, metadata) — feeds the lexical index."""
+        ...
+
+    def flush(self):
+        """Persist pending state (called at the end of a sync)."""
+
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+    COLLECTION_NAME = "medical_knowledge"
+
+    def __init__(self, directory: str, embedder, embedder_name: str):
+        import chromadb
+
+        self.directory = Path(directory)
+        self._embedder = embedder
+        self.embedder_name = embedder_name
+        self._client = chromadb.PersistentClient(path=str(self.directory))
+        self._collection = self._open_collection()
+
+    def _open_collection(self):
+        return self._client.get_or_create_collection(
+            name=self.COLLECTION_NAME,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self._embedder,
+        )
+
+    def embed(self, texts: list[str]) -> list:
+        return self._embedder(texts)
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self._collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, source: str):
+        self._collection.delete(where={"source": source})
+
+    def reset(self):
+        self._client.delete_collection(self.COLLECTION_NAME)
+        self._collection = self._open_collection()
+
+    def search(self, text, n_results, topics=None):
+        where = {"topic": {"$in": list(topics)}} if topics is not None else None
+        results = self._collection.query(
+            query_texts=[text], n_results=n_results, where=where,
+            include=["documents", "distances"],
+        )
+        if not results or not results["ids"]:
+            return []
+        return [
+            (chunk_id, document, 1.0 - distance)
+            for chunk_id, document, distance in zip(
+                results["ids"][0], results["documents"][0], results["distances"][0]
+            )
+        ]
+
+    def chunks(self):
+        results = self._collection.get(include=["documents", "metadatas"])
+        yield from zip(results["ids"], results["documents"], results["metadatas"])
+
+
+class NumpyBackend(VectorBackend):
+    """
+    Exact cosine top-k over an on-disk matrix, optionally restricted to topics:
+    - vectors[.<gen>].bin: append-only rows of L2-normalized embeddings (RAG_NUMPY_DTYPE), memory-mapped
+    - rows[.<gen>].jsonl: one {id, document, metadata} line per matrix row
+    - state.json: dimension, dtype, file generation and deleted row numbers
+    Upserts append rows and tombstone replaced ones. When more than half of the rows are
+    dead, compaction writes the next generation of both files and switches to it with one
+    atomic state.json replace. On load, both files are truncated to the rows they share,
+    so an interrupted append never leaves rows and vectors out of step.
+    """
+    name = "numpy"
+
+    def __init__(self, directory: str, embedder, embedder_name: str, dtype: str = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._embedder = embedder
+        self.embedder_name = embedder_name
+        self._lock = threading.RLock()
+        self._state_path = self.directory / "state.json"
+        self._load(dtype or settings.RAG_NUMPY_DTYPE)
+
+    # ── Persistence ──
+    def _paths(self, generation: int) -> tuple[Path, Path]:
+        """Vector and row files of a generation (0 keeps the original unsuffixed names)."""
+        suffix = f".{generation}" if generation else ""
+        return self.directory / f"vectors{suffix}.bin", self.directory / f"rows{suffix}.jsonl"
+
+    def _load(self, dtype: str):
+        state = {}
+        if self._state_path.exists():
+            state = json.loads(self._state_path.read_text(encoding="utf-8"))
+        if state.get("dtype", dtype) != dtype:
+            # Stored precision changed — start over (the manifest mismatch re-ingests)
+            self._clear_files()
+            state = {}
+        self._dtype = np.dtype(dtype)
+        self._dim = state.get("dim")
+        self._generation = state.get("generation", 0)
+        self._vectors_path, self._rows_path = self._paths(self._generation)
+        self._remove_stale_generations()
+        self._deleted: set[int] = set(state.get("deleted", []))
+
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._topic_codes: dict[str, int] = {}
+        row_ends = [0]  # byte offset after each complete row
+        if self._rows_path.exists():
+            with open(self._rows_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final line from an interrupted write
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        break
+                    self._ids.append(row["id"])
+                    self._documents.append(row["document"])
+                    self._metadatas.append(row["metadata"])
+                    row_ends.append(row_ends[-1] + len(line))
+
+        # Rows and vectors are appended together; trust only rows present in both and cut
+        # both files back to them, so the next append starts in step
+        n = len(self._ids)
+        row_bytes = (self._dim or 0) * self._dtype.itemsize
+        if row_bytes and self._vectors_path.exists():
+            n = min(n, self._vectors_path.stat().st_size // row_bytes)
+        else:
+            n = 0
+        self._truncate(self._vectors_path, n * row_bytes)
+        self._truncate(self._rows_path, row_ends[n])
+        del self._ids[n:], self._documents[n:], self._metadatas[n:]
+        self._deleted = {i for i in self._deleted if i < n}
+        self._row_of = {row_id: i for i, row_id in enumerate(self._ids) if i not in self._deleted}
+        self._matrix = None
+        self._alive_mask = None
+        self._row_topics = None
+
+    @staticmethod
+    def _truncate(path: Path, size: int):
+        if path.exists() and path.stat().st_size > size:
+            logger.warning(f"RAG NumPy index: dropping the incomplete tail of {path.name}")
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _save_state(self, generation: int = None):
+        state = {
+            "dim": self._dim,
+            "dtype": self._dtype.name,
+            "generation": self._generation if generation is None else generation,
+            "deleted": sorted(self._deleted),
+        }
+        tmp = self._state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, self._state_path)
+
+    def _data_files(self) -> list[Path]:
+        return list(self.directory.glob("vectors*.bin")) + list(self.directory.glob("rows*.jsonl"))
+
+    def _remove_stale_generations(self):
+        """Delete files of other generations (superseded, or left by an interrupted compaction)."""
+        current = {self._vectors_path, self._rows_path}
+        for path in self._data_files():
+            if path not in current:
+                path.unlink(missing_ok=True)
+
+    def _clear_files(self):
+        for path in self._data_files() + [self._state_path]:
+            path.unlink(missing_ok=True)
+
+    def _view(self) -> tuple[np.ndarray | None, np.ndarray | None]:
+        """Memory-mapped matrix of all rows plus a mask of live rows (rebuilt after writes)."""
+        n = len(self._ids)
+        if n == 0:
+            return None, None
+        if self._matrix is None or self._matrix.shape[0] != n:
+            self._matrix = np.memmap(self._vectors_path, dtype=self._dtype, mode="r", shape=(n, self._dim))
+            self._alive_mask = None
+            self._row_topics = np.fromiter(
+                (self._topic_codes.setdefault(m.get("topic"), len(self._topic_codes)) for m in self._metadatas),
+                dtype=np.int32, count=n,
+            )
+        if self._alive_mask is None:
+            mask = np.ones(n, dtype=bool)
+            if self._deleted:
+                mask[list(self._deleted)] = False
+            self._alive_mask = mask
+        return self._matrix, self._alive_mask
+
+    # ── VectorBackend ──
+    def embed(self, texts: list[str]) -> list:
+        return self._embedder(texts)
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} != index dimension {self._dim}")
+
+            start = len(self._ids)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.astype(self._dtype).tobytes())
+            with open(self._rows_path, "a", encoding="utf-8") as f:
+                for row_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": row_id, "document": document, "metadata": metadata}) + "\n")
+
+            for offset, (row_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+                previous = self._row_of.get(row_id)
+                if previous is not None:
+                    self._deleted.add(previous)
+                self._row_of[row_id] = start + offset
+                self._ids.append(row_id)
+                self._documents.append(document)
+                self._metadatas.append(metadata)
+            self._alive_mask = None
+
+    def delete(self, source: str):
+        with self._lock:
+            for i, metadata in enumerate(self._metadatas):
+                if metadata.get("source") == source and i not in self._deleted:
+                    self._deleted.add(i)
+                    self._row_of.pop(self._ids[i], None)
+            self._alive_mask = None
+
+    def reset(self):
+        with self._lock:
+            self._clear_files()
+            self._load(self._dtype.name)
+
+    def flush(self):
+        with self._lock:
+            if self._deleted and len(self._deleted) * 2 > len(self._ids):
+                self._compact()
+            self._save_state()
+
+    def _compact(self):
+        matrix, mask = self._view()
+        alive = np.flatnonzero(mask)
+        generation = self._generation + 1
+        vectors_path, rows_path = self._paths(generation)
+        with open(vectors_path, "wb") as f:
+            for i in range(0, len(alive), 4096):
+                f.write(np.asarray(matrix[alive[i:i + 4096]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(rows_path, "w", encoding="utf-8") as f:
+            for i in alive:
+                f.write(json.dumps({"id": self._ids[i], "document": self._documents[i], "metadata": self._metadatas[i]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._matrix = None
+        # The state.json replace is the commit point: a crash before it keeps the old generation
+        self._deleted = set()
+        self._save_state(generation)
+        self._load(self._dtype.name)
+        logger.info(f"RAG NumPy index compacted to {len(alive)} rows")
+
+    def search(self, text, n_results, topics=None):
+        query = _normalize(np.asarray(self._embedder([text]), dtype=np.float32))[0]
+        with self._lock:
+            matrix, mask = self._view()
+            if matrix is None:
+                return []
+            if topics is not None:
+                codes = [self._topic_codes[t] for t in topics if t in self._topic_codes]
+                mask = mask & np.isin(self._row_topics, codes)
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return []
+            # Score only the candidate rows when a filter leaves a small subset
+            if len(candidates) < len(mask) // 2:
+                scores = _scores(matrix[candidates], query)
+            else:
+                scores = _scores(matrix, query)[candidates]
+            k = min(n_results, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[candidates[i]], self._documents[candidates[i]], float(scores[i])) for i in top]
+
+    def chunks(self):
+        with self._lock:
+            live = sorted(self._row_of.values())
+            rows = [(self._ids[i], self._documents[i], self._metadatas[i]) for i in live]
+        yield from rows
+
+
+def _scores(matrix: np.ndarray, query: np.ndarray, block: int = 4096) -> np.ndarray:
+    """Cosine scores of every row. float16 has no BLAS path, so it is upcast block by block."""
+    if matrix.dtype == np.float32:
+        return np.asarray(matrix @ query)
+    scores = np.empty(matrix.shape[0], dtype=np.float32)
+    for i in range(0, matrix.shape[0], block):
+        scores[i:i + block] = matrix[i:i + block].astype(np.float32) @ query
+    return scores
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def create_backend(kind: str = None) -> VectorBackend:
+    """Build the configured backend ("numpy" or "chroma"); Chroma falls back to NumPy if unavailable."""
+    kind = (kind or settings.RAG_BACKEND).lower()
+    embedder, embedder_name = load_embedder()
+    if kind == "chroma":
+        try:
+            return ChromaBackend(settings.CHROMA_PERSIST_DIR, embedder, embedder_name)
+        except ImportError:
+            logger.warning("ChromaDB not installed — using the NumPy RAG backend")
+        except Exception as e:
+            logger.warning(f"ChromaDB unavailable ({e}) — using the NumPy RAG backend")
+    return NumpyBackend(settings.RAG_INDEX_DIR, embedder, embedder_name)
@@ -0,0 +1,234 @@
+"""
+RAG ingestion pipeline — streams knowledge documents (.txt / .md / .pdf), chunks them by
+token budget with overlap at sentence boundaries, embeds chunks in batches on a worker
+pool and writes them to the vector store in bounded batches.
+Only one block of text per document and a bounded number of embedding batches are held
+in memory at a time, so corpus size doesn't drive peak memory.
+"""
+import hashlib
+import re
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from app.config import settings
+from app.core.logging import logger
+from app.ai_models.fingerprint import sha256_file
+
+KNOWLEDGE_SUFFIXES = (".txt", ".md", ".pdf")
+
+# Word pieces and punctuation — a close, dependency-free stand-in for the
+# embedding model's subword token count
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Sentence ends, hard line breaks and markdown headings all start a new sentence
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+@dataclass
+class KnowledgeSource:
+    """One knowledge document; `topic` is the top-level file or folder name."""
+    name: str
+    topic: str
+    path: Path | None = None
+    text: str | None = None
+
+    def content_hash(self) -> str:
+        if self.path is not None:
+            return sha256_file(str(self.path))
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+
+    def iter_blocks(self) -> Iterator[str]:
+        """Yield the document as a stream of text blocks (paragraphs or PDF pages)."""
+        if self.path is None:
+            yield self.text
+        elif self.path.suffix.lower() == ".pdf":
+            yield from _iter_pdf_pages(self.path)
+        else:
+            yield from _iter_paragraphs(self.path)
+
+
+def discover_sources(knowledge_dir: Path) -> dict[str, KnowledgeSource]:
+    """Knowledge files under `knowledge_dir` (recursively), keyed by relative path without suffix."""
+    sources = {}
+    if not knowledge_dir.exists():
+        return sources
+    for path in sorted(knowledge_dir.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in KNOWLEDGE_SUFFIXES:
+            continue
+        relative = path.relative_to(knowledge_dir).with_suffix("")
+        name = relative.as_posix()
+        topic = relative.parts[0]
+        sources[name] = KnowledgeSource(name=name, topic=topic, path=path)
+    return sources
+
+
+def _iter_paragraphs(path: Path) -> Iterator[str]:
+    block = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield "".join(block)
+                block = []
+    if block:
+        yield "".join(block)
+
+
+def _iter_pdf_pages(path: Path) -> Iterator[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.warning(f"pypdf not installed — skipping {path.name}")
+        return
+    reader = PdfReader(str(path))
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            yield text
+
+
+# ── Chunking ─────────────────────────────────────────────
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def chunk_blocks(
+    blocks: Iterable[str],
+    chunk_size: int = None,
+    overlap: int = None,
+    min_tokens: int = 5,
+) -> Iterator[str]:
+    """
+    Pack sentences into chunks of at most `chunk_size` tokens. Each new chunk starts with
+    the trailing sentences of the previous one, up to `overlap` tokens and only as many as
+    leave room for the next sentence. Sentences longer
+    than a chunk are split on word boundaries.
+    """
+    chunk_size = chunk_size or settings.RAG_CHUNK_SIZE
+    overlap = settings.RAG_CHUNK_OVERLAP if overlap is None else overlap
+    overlap = min(overlap, chunk_size // 2)
+
+    current: deque[tuple[str, int]] = deque()
+    current_tokens = 0
+    fresh = 0  # sentences added since the last emitted chunk
+
+    def emit() -> str:
+        nonlocal current_tokens, fresh
+        fresh = 0
+        text = " ".join(s for s, _ in current)
+        # Carry trailing sentences over as overlap
+        carried, carried_tokens = deque(), 0
+        while current and carried_tokens + current[-1][1] <= overlap:
+            sentence = current.pop()
+            carried.appendleft(sentence)
+            carried_tokens += sentence[1]
+        current.clear()
+        current.extend(carried)
+        current_tokens = carried_tokens
+        return text
+
+    for block in blocks:
+        for sentence in _split_sentences(block, chunk_size):
+            tokens = count_tokens(sentence)
+            if current and current_tokens + tokens > chunk_size:
+                text = emit()
+                if count_tokens(text) >= min_tokens:
+                    yield text
+                # The carried overlap gives way (oldest first) to keep the chunk within size
+                while current and current_tokens + tokens > chunk_size:
+                    current_tokens -= current.popleft()[1]
+            current.append((sentence, tokens))
+            current_tokens += tokens
+            fresh += 1
+
+    # Overlap carried from the last chunk alone isn't new content
+    if fresh:
+        text = " ".join(s for s, _ in current)
+        if count_tokens(text) >= min_tokens:
+            yield text
+
+
+def _split_sentences(block: str, max_tokens: int) -> Iterator[str]:
+    for sentence in _SENTENCE_SPLIT_RE.split(block):
+        sentence = sentence.strip().lstrip("#").strip()
+        if not sentence:
+            continue
+        if count_tokens(sentence) <= max_tokens:
+            yield sentence
+            continue
+        words, piece, piece_tokens = sentence.split(), [], 0
+        for word in words:
+            word_tokens = count_tokens(word)
+            if piece and piece_tokens + word_tokens > max_tokens:
+                yield " ".join(piece)
+                piece, piece_tokens = [], 0
+            piece.append(word)
+            piece_tokens += word_tokens
+        if piece:
+            yield " ".join(piece)
+
+
+# ── Embedding + writing ──────────────────────────────────
+def ingest(
+    sources: Iterable[KnowledgeSource],
+    embed: Callable[[list[str]], list],
+    write: Callable[[list[str], list[str], list, list[dict]], None],
+    batch_size: int = None,
+    workers: int = None,
+) -> dict:
+    """
+    Chunk `sources`, embed chunk batches on a thread pool and hand each embedded batch to
+    `write(ids, documents, embeddings, metadatas)`. At most 2×`workers` batches are in
+    flight, which bounds memory. Returns {chunks, batches, seconds, chunks_per_sec, per_source}.
+    """
+    batch_size = batch_size or settings.RAG_EMBED_BATCH_SIZE
+    workers = max(1, workers or settings.RAG_EMBED_WORKERS)
+    max_in_flight = 2 * workers
+
+    t0 = time.time()
+    stats = {"chunks": 0, "batches": 0, "per_source": {}}
+    in_flight = set()
+
+    def drain(block: bool):
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED) if block else (
+            {f for f in in_flight if f.done()}, None
+        )
+        for future in done:
+            in_flight.discard(future)
+            ids, documents, metadatas, embeddings = future.result()
+            write(ids, documents, embeddings, metadatas)
+            stats["batches"] += 1
+
+    def embed_batch(ids, documents, metadatas):
+        return ids, documents, metadatas, embed(documents)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-embed") as pool:
+        batch: tuple[list, list, list] = ([], [], [])
+        for source in sources:
+            count = 0
+            for text in chunk_blocks(source.iter_blocks()):
+                batch[0].append(f"{source.name}_{count}")
+                batch[1].append(text)
+                batch[2].append({"topic": source.topic, "source": source.name})
+                count += 1
+                if len(batch[0]) >= batch_size:
+                    while len(in_flight) >= max_in_flight:
+                        drain(block=True)
+                    in_flight.add(pool.submit(embed_batch, *batch))
+                    batch = ([], [], [])
+                    drain(block=False)
+            stats["per_source"][source.name] = count
+            stats["chunks"] += count
+
+        if batch[0]:
+            in_flight.add(pool.submit(embed_batch, *batch))
+        while in_flight:
+            drain(block=True)
+
+    stats["seconds"] = round(time.time() - t0, 3)
+    stats["chunks_per_sec"] = round(stats["chunks"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,92 @@
+"""
+In-process BM25 index over the RAG chunks, used alongside dense retrieval so exact
+clinical terms ("LungRADS 4B", "t(8;21)", "CA-125") match reliably.
+Postings are NumPy arrays, so scoring a query is a handful of vectorized adds.
+"""
+import re
+from collections import Counter, defaultdict
+from typing import Iterable
+
+import numpy as np
+
+# Bracketed cytogenetic notation, then words joined by - / . (e.g. 1p/19q, CA-125, W1200/L-600)
+_TERM_RE = re.compile(r"\w+\([\w;]+\)(?:\([\w;]+\))?|\w+(?:[-/.]\w+)*")
+_PART_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms; compound terms are indexed whole and by their parts."""
+    terms = []
+    for term in _TERM_RE.findall(text.lower()):
+        terms.append(term)
+        parts = _PART_RE.findall(term)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: list[str] = []
+        self.documents: list[str] = []
+        self._row_of: dict[str, int] = {}
+        self._topics = np.empty(0, dtype=object)
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._norm = np.empty(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, chunks: Iterable[tuple[str, str, dict]]):
+        """Index (id, document, metadata) triples, replacing any previous contents."""
+        ids, documents, topics, lengths = [], [], [], []
+        postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        for row, (chunk_id, document, metadata) in enumerate(chunks):
+            terms = Counter(tokenize(document))
+            for term, tf in terms.items():
+                postings[term].append((row, tf))
+            ids.append(chunk_id)
+            documents.append(document)
+            topics.append((metadata or {}).get("topic"))
+            lengths.append(sum(terms.values()))
+
+        self.ids, self.documents = ids, documents
+        self._row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._topics = np.array(topics, dtype=object)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg = float(lengths.mean()) if len(lengths) else 1.0
+        # Per-document part of the BM25 denominator: k1 * (1 - b + b * len / avgdl)
+        self._norm = self.k1 * (1 - self.b + self.b * lengths / max(avg, 1e-9))
+        self._postings = {
+            term: (np.fromiter((r for r, _ in rows), dtype=np.int64, count=len(rows)),
+                   np.fromiter((tf for _, tf in rows), dtype=np.float32, count=len(rows)))
+            for term, rows in postings.items()
+        }
+
+    def document(self, chunk_id: str) -> str:
+        return self.documents[self._row_of[chunk_id]]
+
+    def search(self, query: str, k: int, topics: Iterable[str] | None = None) -> list[tuple[str, float]]:
+        """Top-k (id, score) by BM25, optionally restricted to chunks of the given topics."""
+        n = len(self.ids)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            rows, tf = posting
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + self._norm[rows])
+
+        candidates = scores > 0
+        if topics is not None:
+            candidates &= np.isin(self._topics, list(topics))
+        hits = np.flatnonzero(candidates)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(self.ids[i], float(scores[i])) for i in hits]
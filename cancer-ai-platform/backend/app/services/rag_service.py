@@ -1,34 +1,47 @@
 """
-RAG Service — Medical knowledge retrieval using ChromaDB.
+RAG Service — Medical knowledge retrieval.
 Loads curated medical text, chunks it, embeds it, and retrieves relevant context for report generation.
+The vector store is pluggable (RAG_BACKEND, see rag_backends) and persists on disk; a content-hash
+manifest means a restart only re-embeds knowledge files that changed. Chunking and batched
+embedding live in rag_ingest.
+Retrieval is pre-filtered to the prediction's knowledge topics and fuses dense similarity with
+an in-process BM25 ranking (rag_lexical) by reciprocal rank fusion.
 """
+import json
 import os
 from pathlib import Path
 from app.config import settings
 from app.core.logging import logger
+from app.core.ttl_cache import TTLCache
+from app.services.rag_backends import VectorBackend, create_backend
+from app.services.rag_ingest import KnowledgeSource, discover_sources, ingest
+from app.services.rag_lexical import BM25Index
 
-_collection = None
-_client = None
+# Bump when chunking changes so every source is re-embedded on the next sync
+MANIFEST_VERSION = 2
+
+_backend: VectorBackend | None = None
+_bm25 = BM25Index()
+_topics: set[str] = set()
+_retrieval_cache = TTLCache(settings.RAG_CACHE_MAX_ENTRIES, settings.RAG_CACHE_TTL_SECONDS)
 
 
 def _get_knowledge_dir() -> Path:
     return Path(__file__).parent / "rag_knowledge"
 
 
-def _get_knowledge_texts() -> dict[str, str]:
-    """Load all knowledge text files. If files don't exist, use built-in knowledge."""
-    knowledge_dir = _get_knowledge_dir()
-    texts = {}
-
-    if knowledge_dir.exists():
-        for f in knowledge_dir.glob("*.txt"):
-            texts[f.stem] = f.read_text(encoding="utf-8")
+def _get_knowledge_sources() -> dict[str, KnowledgeSource]:
+    """Discover knowledge files (.txt / .md / .pdf). If none exist, use built-in knowledge."""
+    sources = discover_sources(_get_knowledge_dir())
 
     # Fallback built-in knowledge if no files exist
-    if not texts:
-        texts = _builtin_knowledge()
+    if not sources:
+        sources = {
+            topic: KnowledgeSource(name=topic, topic=topic, text=text)
+            for topic, text in _builtin_knowledge().items()
+        }
 
-    return texts
+    return sources
 
 
 def _builtin_knowledge() -> dict[str, str]:
@@ -91,63 +104,197 @@ Sensitivity and specificity thresholds for clinical deployment. AUC-ROC > 0.95 c
 
 
 def initialize():
-    """Initialize the ChromaDB collection with medical knowledge."""
-    global _collection, _client
+    """
+    Open the configured vector store and bring it up to date with the knowledge sources.
+    Only sources whose content hash changed since the last run are re-embedded.
+    """
+    global _backend
     try:
-        import chromadb
-        _client = chromadb.Client()  # In-memory for simplicity
-        _collection = _client.get_or_create_collection(
-            name="medical_knowledge",
-            metadata={"hnsw:space": "cosine"},
+        _backend = create_backend()
+        logger.info(f"RAG backend: {_backend.name} ({_backend.embedder_name} embeddings)")
+        sync_knowledge()
+    except Exception as e:
+        _backend = None
+        logger.error(f"RAG initialization failed: {e}. Using fallback.")
+
+
+def sync_knowledge() -> dict:
+    """
+    Incrementally sync the vector store with the knowledge sources using the hash manifest:
+    new or changed sources are (re-)chunked and embedded, deleted sources have their chunks
+    removed, unchanged sources are skipped.
+    Returns {added, updated, removed, unchanged, ingest: {chunks, seconds, chunks_per_sec, ...}}.
+    """
+    global _topics
+    sources = _get_knowledge_sources()
+    _topics = {source.topic for source in sources.values()}
+    manifest = _load_manifest()
+    chunking = {"size": settings.RAG_CHUNK_SIZE, "overlap": settings.RAG_CHUNK_OVERLAP}
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("chunking") != chunking
+        or manifest.get("embedder") != _backend.embedder_name
+        or (manifest["sources"] and _backend.count() == 0)
+    ):
+        # Chunking or embedding model changed, or the manifest and store disagree — re-embed everything
+        _backend.reset()
+        _retrieval_cache.clear()
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "chunking": chunking,
+            "embedder": _backend.embedder_name,
+            "sources": {},
+        }
+
+    summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    known = manifest["sources"]
+
+    for name in [n for n in known if n not in sources]:
+        _backend.delete(name)
+        del known[name]
+        summary["removed"] += 1
+    _backend.flush()
+    _save_manifest(manifest)
+
+    pending, hashes = [], {}
+    for name, source in sources.items():
+        hashes[name] = source.content_hash()
+        entry = known.get(name)
+        if entry and entry["sha256"] == hashes[name]:
+            summary["unchanged"] += 1
+            continue
+        # Also clears chunks left by an interrupted earlier run
+        _backend.delete(name)
+        summary["updated" if entry else "added"] += 1
+        pending.append(source)
+
+    if pending:
+        stats = ingest(pending, embed=_backend.embed, write=_backend.upsert)
+        for source in pending:
+            known[source.name] = {"sha256": hashes[source.name], "chunks": stats["per_source"][source.name]}
+        _backend.flush()
+        _save_manifest(manifest)
+        summary["ingest"] = {k: v for k, v in stats.items() if k != "per_source"}
+        logger.info(
+            f"RAG ingest: {stats['chunks']} chunks from {len(pending)} source(s) in "
+            f"{stats['seconds']}s ({stats['chunks_per_sec']} chunks/s)"
         )
 
-        # Check if already populated
-        if _collection.count() > 0:
-            logger.info(f"RAG collection already has {_collection.count()} documents.")
-            return
+    if pending or summary["removed"]:
+        # Cached passages may now point at replaced or deleted chunks
+        _retrieval_cache.clear()
+    if settings.RAG_HYBRID and (pending or summary["removed"] or len(_bm25) != _backend.count()):
+        _bm25.build(_backend.chunks())
 
-        texts = _get_knowledge_texts()
-        documents = []
-        ids = []
-        metadatas = []
+    logger.info(
+        f"RAG store synced: {summary['added']} added, {summary['updated']} updated, "
+        f"{summary['removed']} removed, {summary['unchanged']} unchanged "
+        f"({_backend.count()} chunks)"
+    )
+    return summary
 
-        for topic, content in texts.items():
-            # Simple chunking by paragraphs/sentences
-            chunks = [c.strip() for c in content.split("\n") if c.strip() and len(c.strip()) > 20]
-            for i, chunk in enumerate(chunks):
-                documents.append(chunk)
-                ids.append(f"{topic}_{i}")
-                metadatas.append({"topic": topic})
 
-        if documents:
-            _collection.add(documents=documents, ids=ids, metadatas=metadatas)
-            logger.info(f"RAG initialized with {len(documents)} chunks from {len(texts)} topics.")
+def _chunk(content: str) -> list[str]:
+    """Line-level snippets for the fallback context."""
+    return [c.strip() for c in content.split("\n") if c.strip() and len(c.strip()) > 20]
 
-    except ImportError:
-        logger.warning("ChromaDB not installed. RAG will use fallback context.")
-    except Exception as e:
-        logger.error(f"RAG initialization failed: {e}. Using fallback.")
+
+def _manifest_path() -> Path:
+    return _backend.directory / "rag_manifest.json"
+
+
+def _load_manifest() -> dict:
+    try:
+        manifest = json.loads(_manifest_path().read_text(encoding="utf-8"))
+        manifest.setdefault("sources", {})
+        return manifest
+    except (OSError, ValueError):
+        return {"version": None, "sources": {}}
+
+
+def _save_manifest(manifest: dict):
+    path = _manifest_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
 
 
 def retrieve_context(cancer_type: str, predicted_class: str, confidence: float, n_results: int = 5) -> list[str]:
     """
     Retrieve relevant medical context for a given prediction.
-    Returns list of relevant text passages.
+    Returns list of relevant text passages. Only chunks of the cancer type's topics (plus
+    RAG_SHARED_TOPICS) are searched; dense and BM25 rankings are fused. Results are cached
+    per normalised query, with confidence bucketed, so repeat reports skip the search.
     """
-    if _collection is None or _collection.count() == 0:
+    cancer_type_key = cancer_type.strip().lower()
+    class_key = predicted_class.strip().lower()
+    bucket = _confidence_bucket(confidence)
+    key = (cancer_type_key, class_key, bucket, n_results)
+    cached = _retrieval_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    if _backend is None or _backend.count() == 0:
         return _fallback_context(cancer_type, predicted_class)
 
-    query = f"{cancer_type} cancer {predicted_class} diagnosis confidence {confidence}%"
+    query = f"{cancer_type_key} cancer {class_key} diagnosis confidence {bucket}%"
+    topics = _topics_for(cancer_type_key)
+    pool = max(4 * n_results, 20)
     try:
-        results = _collection.query(query_texts=[query], n_results=n_results)
-        if results and results["documents"]:
-            return results["documents"][0]
+        dense = _backend.search(query, pool if settings.RAG_HYBRID else n_results, topics)
+        if settings.RAG_HYBRID and len(_bm25):
+            documents = _fuse(dense, _bm25.search(query, pool, topics), n_results)
+        else:
+            documents = [document for _, document, _ in dense[:n_results]]
+        if documents:
+            _retrieval_cache.put(key, tuple(documents))
+            return documents
     except Exception as e:
         logger.warning(f"RAG retrieval failed: {e}")
 
     return _fallback_context(cancer_type, predicted_class)
 
 
+def _topics_for(cancer_type: str) -> set[str] | None:
+    """
+    Knowledge topics named after the cancer type (e.g. "lung" -> lung_cancer), plus the shared
+    topics. None (search everything) when no topic matches.
+    """
+    key = cancer_type.replace(" ", "_")
+    matched = {topic for topic in _topics if topic.startswith(key) or key in topic.split("_")}
+    if not matched:
+        return None
+    return matched | (set(settings.RAG_SHARED_TOPICS) & _topics)
+
+
+def _fuse(dense: list[tuple[str, str, float]], lexical: list[tuple[str, float]], n_results: int) -> list[str]:
+    """Reciprocal rank fusion of the dense and BM25 rankings."""
+    scores: dict[str, float] = {}
+    for ranking in ([chunk_id for chunk_id, _, _ in dense], [chunk_id for chunk_id, _ in lexical]):
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (settings.RAG_RRF_K + rank + 1)
+    documents = {chunk_id: document for chunk_id, document, _ in dense}
+    ranked = sorted(scores, key=scores.get, reverse=True)[:n_results]
+    return [documents.get(chunk_id) or _bm25.document(chunk_id) for chunk_id in ranked]
+
+
+def _confidence_bucket(confidence: float) -> int:
+    """Round confidence down to the start of its RAG_CONFIDENCE_BUCKET-wide bucket."""
+    width = max(1, settings.RAG_CONFIDENCE_BUCKET)
+    return int(float(confidence or 0) // width * width)
+
+
+def cache_stats() -> dict:
+    return _retrieval_cache.stats()
+
+
+def status() -> dict:
+    """Backend, embedder and indexed chunk count (for the readiness probe)."""
+    if _backend is None:
+        return {"available": False}
+    return {"available": True, "backend": _backend.name, "embedder": _backend.embedder_name, "chunks": _backend.count()}
+
+
 def _fallback_context(cancer_type: str, predicted_class: str) -> list[str]:
     """Return basic context when RAG isn't available."""
     knowledge = _builtin_knowledge()
@@ -156,7 +303,6 @@ def _fallback_context(cancer_type: str, predicted_class: str) -> list[str]:
     # Find matching topic
     for key, text in knowledge.items():
         if topic_key in key or cancer_type.lower() in key:
-            chunks = [c.strip() for c in text.split("\n") if c.strip() and len(c.strip()) > 20]
-            return chunks[:5]
+            return _chunk(text)[:5]
 
     return [f"Analysis for {cancer_type}: {predicted_class} detected."]
@@ -1,26 +1,88 @@
 """
 Report Service — generates and manages clinical reports using LLM pipeline.
 """
+import json
+from typing import AsyncIterator, Awaitable, Callable
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.database.session import async_session
 from app.models.prediction import Prediction
 from app.models.report import Report
 from app.services import llm_service
 from app.core.logging import logger
+from app.core.pagination import DEFAULT_PAGE_SIZE, paginate, page_items
 
 
-async def generate_report(prediction_id: int, db: AsyncSession, user_id: int = None) -> dict:
+async def generate_report(
+    prediction_id: int,
+    db: AsyncSession,
+    user_id: int = None,
+    on_stage: Callable[[str], Awaitable[None]] | None = None,
+) -> dict:
     """
     Generate a clinical report from a prediction using RAG → Gemini pipeline.
+    `on_stage` is awaited as each step ("rag", "llm", "save") starts.
     """
-    # Fetch the prediction
-    result = await db.execute(select(Prediction).where(Prediction.id == prediction_id))
-    prediction = result.scalar_one_or_none()
+    prediction = await get_prediction(prediction_id, db)
     if not prediction:
         raise ValueError(f"Prediction {prediction_id} not found")
 
-    # Build prediction data dict
+    # Generate report via LLM pipeline (RAG → Gemini / rule-based)
+    prediction_data, patient_info = _pipeline_inputs(prediction)
+    # End the read transaction so the pooled connection isn't held for the LLM call
+    await db.commit()
+    llm_result = await llm_service.generate_report(prediction_data, patient_info, on_stage=on_stage)
+
+    # Save report to DB
+    if on_stage:
+        await on_stage("save")
+    return await _save_report(prediction, llm_result["sections"], llm_result["generated_by"], db, user_id)
+
+
+async def stream_report(prediction_id: int, user_id: int = None) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for streamed report generation: `stage` events as each step starts,
+    a `section` event as each report section completes, then `report` with the saved report
+    (or `error`). Uses its own session, since the stream outlives the request's.
+    """
+    try:
+        async with async_session() as db:
+            prediction = await get_prediction(prediction_id, db)
+            if not prediction:
+                raise ValueError(f"Prediction {prediction_id} not found")
+
+            prediction_data, patient_info = _pipeline_inputs(prediction)
+            await db.commit()
+            async for event in llm_service.stream_report(prediction_data, patient_info):
+                if event["type"] == "stage":
+                    yield _sse("stage", {"stage": event["stage"]})
+                elif event["type"] == "section":
+                    yield _sse("section", {"key": event["key"], "value": event["value"]})
+                else:
+                    yield _sse("stage", {"stage": "save"})
+                    report = await _save_report(
+                        prediction, event["sections"], event["generated_by"], db, user_id
+                    )
+                    await db.commit()
+                    yield _sse("report", report)
+    except Exception as e:
+        logger.error(f"Streamed report for prediction #{prediction_id} failed: {e}")
+        yield _sse("error", {"detail": str(e)})
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def get_prediction(prediction_id: int, db: AsyncSession) -> Prediction | None:
+    result = await db.execute(select(Prediction).where(Prediction.id == prediction_id))
+    return result.scalar_one_or_none()
+
+
+def _pipeline_inputs(prediction: Prediction) -> tuple[dict, dict]:
+    """Prediction data and patient info dicts for the LLM pipeline."""
     prediction_data = {
         "cancer_type": prediction.cancer_type,
         "scan_type": prediction.scan_type,
@@ -35,53 +97,62 @@ async def generate_report(prediction_id: int, db: AsyncSession, user_id: int = N
         "age": prediction.patient_age,
         "biomarkers": prediction.biomarkers,
     }
+    return prediction_data, patient_info
 
-    # Generate report via LLM pipeline (RAG → Gemini / rule-based)
-    llm_result = await llm_service.generate_report(prediction_data, patient_info)
 
+async def _save_report(
+    prediction: Prediction,
+    sections: dict,
+    generated_by: str,
+    db: AsyncSession,
+    user_id: int = None,
+) -> dict:
     # Build full text from sections
-    sections = llm_result["sections"]
     full_text = "\n\n".join(
         f"**{key.upper().replace('_', ' ')}**\n{value}"
         for key, value in sections.items()
     )
 
-    # Save report to DB
     report = Report(
         user_id=user_id,
-        prediction_id=prediction_id,
+        prediction_id=prediction.id,
         patient_id=prediction.patient_id,
         patient_name=prediction.patient_name,
         report_type="radiology" if prediction.scan_type != "pathology" else "pathology",
         sections=sections,
         full_text=full_text,
-        generated_by=llm_result["generated_by"],
+        generated_by=generated_by,
     )
     db.add(report)
     await db.flush()
     await db.refresh(report)
 
-    logger.info(f"Report #{report.id} generated for prediction #{prediction_id} via {llm_result['generated_by']}")
+    logger.info(f"Report #{report.id} generated for prediction #{prediction.id} via {generated_by}")
 
     return {
         "id": report.id,
-        "prediction_id": prediction_id,
+        "prediction_id": prediction.id,
         "patient_id": prediction.patient_id,
         "patient_name": prediction.patient_name,
         "report_type": report.report_type,
         "sections": sections,
         "full_text": full_text,
-        "generated_by": llm_result["generated_by"],
+        "generated_by": generated_by,
         "created_at": report.created_at.isoformat() if report.created_at else None,
     }
 
 
-async def get_reports(db: AsyncSession, user_id: int = None, limit: int = 20) -> list:
-    query = select(Report).order_by(Report.created_at.desc()).limit(limit)
+async def get_reports(
+    db: AsyncSession,
+    user_id: int = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+) -> tuple[list, str | None]:
+    query = select(Report)
     if user_id:
         query = query.where(Report.user_id == user_id)
-    result = await db.execute(query)
-    return result.scalars().all()
+    result = await db.execute(paginate(query, Report, limit, cursor))
+    return page_items(result.scalars().all(), limit)
 
 
 async def get_report(report_id: int, db: AsyncSession) -> Report | None:
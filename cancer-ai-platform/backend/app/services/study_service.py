@@ -0,0 +1,53 @@
+"""
+Study Service — study-level aggregation over a batch of per-image predictions.
+"""
+from collections import Counter
+
+from app.core.constants import risk_level_from_score
+
+
+def aggregate_study(predictions: list[dict], total_images: int) -> dict:
+    """Summarize a study: class counts, mean confidence and the highest-risk image."""
+    if not predictions:
+        return {
+            "total_images": total_images,
+            "analyzed": 0,
+            "failed": total_images,
+            "class_counts": {},
+            "mean_confidence": 0.0,
+            "max_risk_score": 0.0,
+            "risk_level": risk_level_from_score(0).value,
+            "highest_risk_prediction_id": None,
+        }
+
+    highest = max(predictions, key=lambda p: p["risk_score"])
+    return {
+        "total_images": total_images,
+        "analyzed": len(predictions),
+        "failed": total_images - len(predictions),
+        "class_counts": dict(Counter(p["predicted_class"] for p in predictions)),
+        "mean_confidence": round(sum(p["confidence"] for p in predictions) / len(predictions), 2),
+        "max_risk_score": highest["risk_score"],
+        "risk_level": risk_level_from_score(highest["risk_score"]).value,
+        "highest_risk_prediction_id": highest["id"],
+    }
+
+
+def build_batch_response(decoded: list[tuple[str, object, str | None, object]], analyzed: list[tuple[str, dict]]) -> dict:
+    """
+    Merge decode failures and analyzed predictions back into upload order,
+    and attach the study-level aggregate.
+    """
+    analyzed_iter = iter(analyzed)
+    results = []
+    for name, image, error, _ in decoded:
+        if image is None:
+            results.append({"filename": name, "error": error})
+        else:
+            _, prediction = next(analyzed_iter)
+            results.append({"filename": name, "prediction": prediction})
+
+    return {
+        "results": results,
+        "aggregate": aggregate_study([prediction for _, prediction in analyzed], len(decoded)),
+    }
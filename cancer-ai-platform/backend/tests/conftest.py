@@ -0,0 +1,14 @@
+"""
+Test settings: a throwaway database, upload dir and RAG index, set before `app` is imported.
+"""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="chronoscan-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_scratch}/test.db",
+    "UPLOAD_DIR": os.path.join(_scratch, "uploads"),
+    "RAG_INDEX_DIR": os.path.join(_scratch, "rag_index"),
+    "CHROMA_PERSIST_DIR": os.path.join(_scratch, "chroma"),
+    "DEBUG": "false",
+})
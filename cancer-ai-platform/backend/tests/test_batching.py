@@ -0,0 +1,96 @@
+"""MicroBatcher: grouping, and cancellation racing result delivery."""
+import asyncio
+import threading
+
+import pytest
+
+from app.ai_models.batching import MicroBatcher
+
+
+class _Model:
+    """batch_fn that doubles its inputs, optionally held until `release` is set."""
+
+    def __init__(self, hold: bool = False):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.started.set()
+        self.release.wait(timeout=5)
+        if "boom" in items:
+            raise ValueError("boom")
+        return [item * 2 for item in items]
+
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(model, **kwargs):
+        batcher = MicroBatcher("test", model, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.shutdown()
+
+
+def test_concurrent_items_share_a_batch(make_batcher):
+    model = _Model()
+    batcher = make_batcher(model, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(4)]
+    assert [f.result(timeout=5) for f in futures] == [0, 2, 4, 6]
+    assert model.batches == [[0, 1, 2, 3]]
+
+
+def test_cancel_while_batch_runs_still_delivers(make_batcher):
+    model = _Model(hold=True)
+    batcher = make_batcher(model, max_batch_size=1, max_wait_ms=0)
+    running = batcher.submit(1)
+    assert model.started.wait(timeout=5)
+    # The caller gave up (e.g. the client disconnected) while the batch was computing
+    assert not running.cancel()
+    model.release.set()
+    assert running.result(timeout=5) == 2
+    assert batcher.submit(5).result(timeout=5) == 10
+
+
+def test_cancelled_queued_items_are_dropped(make_batcher):
+    model = _Model(hold=True)
+    batcher = make_batcher(model, max_batch_size=1, max_wait_ms=0)
+    first = batcher.submit(1)
+    assert model.started.wait(timeout=5)
+    queued = batcher.submit(2)
+    assert queued.cancel()
+    model.release.set()
+    assert first.result(timeout=5) == 2
+    assert batcher.submit(3).result(timeout=5) == 6
+    assert [2] not in model.batches
+
+
+def test_async_caller_timeout_does_not_stall_the_batcher(make_batcher):
+    model = _Model(hold=True)
+    batcher = make_batcher(model, max_batch_size=1, max_wait_ms=0)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(batcher.infer(1), timeout=0.1)
+        model.release.set()
+        return await asyncio.wait_for(batcher.infer(4), timeout=5)
+
+    assert asyncio.run(main()) == 8
+
+
+def test_failed_batch_reaches_every_caller(make_batcher):
+    model = _Model()
+    batcher = make_batcher(model, max_batch_size=2, max_wait_ms=200)
+    futures = [batcher.submit("boom"), batcher.submit("x")]
+    for future in futures:
+        with pytest.raises(ValueError, match="boom"):
+            future.result(timeout=5)
+    assert batcher.submit(3).result(timeout=5) == 6
@@ -0,0 +1,42 @@
+"""Who may trigger GradCAM generation for a prediction."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.database.session import async_session, init_db
+from app.main import app
+from app.models.prediction import Prediction
+from app.services import radiology_service
+
+
+def _prediction(user_id):
+    return Prediction(
+        cancer_type="lung", scan_type="ct", user_id=user_id, image_path=None,
+        predicted_class="normal", confidence=90.0, risk_score=10.0, risk_level="low",
+    )
+
+
+def test_heatmap_route_requires_login():
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/v1/radiology/1/heatmap")
+
+    assert asyncio.run(get()).status_code == 401
+
+
+def test_heatmap_only_for_the_owner():
+    async def main():
+        await init_db()
+        async with async_session() as db:
+            mine, theirs, anonymous = _prediction(1), _prediction(2), _prediction(None)
+            db.add_all([mine, theirs, anonymous])
+            await db.commit()
+            # No stored image, so there's nothing to render — but the owner gets past the check
+            assert await radiology_service.get_heatmap(mine.id, db, user_id=1) is None
+            for prediction in (theirs, anonymous):
+                with pytest.raises(ValueError, match="not found"):
+                    await radiology_service.get_heatmap(prediction.id, db, user_id=1)
+
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""Atomic job claims and lease expiry."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.database.session import async_session, init_db
+from app.models.job import Job
+from app.services import job_service
+
+
+async def _add_job(status: str = "queued", attempts: int = 0, age: float = 0.0) -> str:
+    job_id = str(uuid.uuid4())
+    stamp = datetime.now(timezone.utc) - timedelta(seconds=age)
+    async with async_session() as session:
+        session.add(Job(
+            id=job_id, kind="report_generate", status=status, attempts=attempts,
+            params={}, created_at=stamp, updated_at=stamp,
+        ))
+        await session.commit()
+    return job_id
+
+
+async def _status(job_id: str) -> tuple[str, int]:
+    async with async_session() as session:
+        job = await session.get(Job, job_id)
+        return job.status, job.attempts
+
+
+def test_concurrent_claims_run_a_job_once():
+    async def main():
+        await init_db()
+        job_id = await _add_job()
+        claims = await asyncio.gather(*[job_service._claim(job_id) for _ in range(8)])
+        assert sum(job is not None for job in claims) == 1
+        assert await _status(job_id) == ("running", 1)
+
+    asyncio.run(main())
+
+
+def test_claim_fails_a_job_out_of_attempts():
+    async def main():
+        await init_db()
+        job_id = await _add_job(attempts=settings.JOB_MAX_ATTEMPTS)
+        assert await job_service._claim(job_id) is None
+        assert await _status(job_id) == ("failed", settings.JOB_MAX_ATTEMPTS)
+
+    asyncio.run(main())
+
+
+def test_only_expired_leases_are_requeued():
+    async def main():
+        await init_db()
+        stale = await _add_job(status="running", attempts=1, age=settings.JOB_LEASE_SECONDS + 60)
+        live = await _add_job(status="running", attempts=1)
+        await job_service._requeue_expired()
+        assert await _status(stale) == ("queued", 1)
+        assert await _status(live) == ("running", 1)
+
+    asyncio.run(main())
+
+
+def test_heartbeat_keeps_the_lease(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.6)
+
+    async def main():
+        await init_db()
+        job_id = await _add_job(status="running", attempts=1)
+        heartbeat = asyncio.create_task(job_service._heartbeat(job_id))
+        await asyncio.sleep(1.0)
+        await job_service._requeue_expired()
+        assert await _status(job_id) == ("running", 1)
+
+        heartbeat.cancel()
+        await asyncio.sleep(0.8)
+        await job_service._requeue_expired()
+        assert await _status(job_id) == ("queued", 1)
+
+    asyncio.run(main())
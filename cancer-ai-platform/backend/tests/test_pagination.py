@@ -0,0 +1,54 @@
+"""Keyset cursors: encoding and paging through rows with tied timestamps."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.pagination import decode_cursor, encode_cursor, page_items, paginate
+from app.database.session import async_session, init_db
+from app.models.prediction import Prediction
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 17, 9, 30, 12, 345678)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "MjAyNC0wNS0xNw"])
+def test_malformed_cursor_is_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once():
+    patient = "pagination-test"
+    base = datetime(2024, 1, 1)
+
+    async def main():
+        await init_db()
+        async with async_session() as db:
+            # Pairs of rows share a timestamp, so pages must break ties on id
+            db.add_all([
+                Prediction(
+                    patient_id=patient, cancer_type="lung", scan_type="ct", predicted_class="normal",
+                    confidence=90.0, risk_score=10.0, risk_level="low",
+                    created_at=base + timedelta(minutes=i // 2),
+                )
+                for i in range(11)
+            ])
+            await db.commit()
+
+            query = select(Prediction).where(Prediction.patient_id == patient)
+            seen, cursor = [], None
+            while True:
+                rows = (await db.execute(paginate(query, Prediction, 3, cursor))).scalars().all()
+                items, cursor = page_items(rows, 3)
+                seen.extend(items)
+                if cursor is None:
+                    return seen
+
+    seen = asyncio.run(main())
+    assert len(seen) == 11 and len({p.id for p in seen}) == 11
+    keys = [(p.created_at, p.id) for p in seen]
+    assert keys == sorted(keys, reverse=True)
@@ -0,0 +1,85 @@
+"""UploadSizeLimitMiddleware: 413 for oversize multipart bodies, streamed or declared."""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core.upload_limit import UploadSizeLimitMiddleware, limit_for
+
+CHUNK = 16 * 1024
+
+
+class _Endpoint:
+    """Reads the whole body, then answers 200 — like a multipart parser would."""
+
+    def __init__(self):
+        self.received = 0
+        self.called = False
+
+    async def __call__(self, scope, receive, send):
+        self.called = True
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise RuntimeError("client disconnected")
+            self.received += len(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _call(app, body_size: int, declared: bool = False, path: str = "/api/v1/pathology/analyze"):
+    headers = [(b"content-type", b"multipart/form-data; boundary=x")]
+    if declared:
+        headers.append((b"content-length", str(body_size).encode()))
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    chunks = [CHUNK] * (body_size // CHUNK) + ([body_size % CHUNK] if body_size % CHUNK else [])
+    pulled = {"n": 0}
+    sent = []
+
+    async def receive():
+        i = pulled["n"]
+        pulled["n"] += 1
+        if i >= len(chunks):
+            return {"type": "http.disconnect"}
+        return {"type": "http.request", "body": b"\0" * chunks[i], "more_body": i < len(chunks) - 1}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(UploadSizeLimitMiddleware(app)(scope, receive, send))
+    return sent[0]["status"], pulled["n"]
+
+
+@pytest.fixture(autouse=True)
+def small_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 256 * 1024)
+
+
+def test_streamed_body_past_the_limit_is_413():
+    endpoint = _Endpoint()
+    limit = limit_for("/api/v1/pathology/analyze")
+    status, pulled = _call(endpoint, 4 * 1024 * 1024)
+    assert status == 413
+    # Cut off right after the limit instead of reading the whole body
+    assert endpoint.received <= limit
+    assert pulled <= limit // CHUNK + 2
+
+
+def test_declared_oversize_is_413_before_reading():
+    endpoint = _Endpoint()
+    status, pulled = _call(endpoint, 4 * 1024 * 1024, declared=True)
+    assert status == 413 and pulled == 0 and not endpoint.called
+
+
+def test_body_within_the_limit_passes():
+    endpoint = _Endpoint()
+    status, _ = _call(endpoint, 200 * 1024)
+    assert status == 200 and endpoint.received == 200 * 1024
+
+
+def test_volume_route_gets_the_volume_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_VOLUME_UPLOAD_SIZE", 8 * 1024 * 1024)
+    status, _ = _call(_Endpoint(), 4 * 1024 * 1024, path="/api/v1/radiology/analyze")
+    assert status == 200
@@ -0,0 +1,68 @@
+"""Decompression bounds for NIfTI / DICOM volume uploads."""
+import gzip
+import os
+import zipfile
+
+import pytest
+
+from app.ai_models.radiology.ct_analysis import volumetric
+from app.config import settings
+from app.core.uploads import UploadTooLarge
+
+
+@pytest.fixture
+def scratch(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_VOLUME_EXPANDED_SIZE", 1024 * 1024)
+    return tmp_path / "tmp"
+
+
+def _leftovers(scratch) -> list[str]:
+    return os.listdir(scratch) if scratch.exists() else []
+
+
+def test_gzipped_nifti_bomb_is_rejected(scratch, tmp_path):
+    path = tmp_path / "bomb.nii.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b"\0" * (4 * 1024 * 1024))
+    with pytest.raises(UploadTooLarge):
+        volumetric.load_volume(str(path), "bomb.nii.gz")
+    assert _leftovers(scratch) == []
+
+
+def test_unreadable_gzipped_nifti_leaves_no_temp_file(scratch, tmp_path):
+    path = tmp_path / "scan.nii.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b"not a nifti header")
+    with pytest.raises(Exception):
+        volumetric.load_volume(str(path), "scan.nii.gz")
+    assert _leftovers(scratch) == []
+
+
+def test_dicom_zip_bomb_is_rejected(scratch, tmp_path):
+    path = tmp_path / "series.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(3):
+            zf.writestr(f"{i}.dcm", b"\0" * (512 * 1024))
+    with pytest.raises(UploadTooLarge):
+        volumetric.load_volume(str(path), "series.zip")
+    assert _leftovers(scratch) == []
+
+
+def test_dicom_zip_slice_count_is_capped(scratch, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_VOLUME_SLICES", 2)
+    path = tmp_path / "series.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(3):
+            zf.writestr(f"{i}.dcm", b"x")
+    with pytest.raises(ValueError, match="more than the 2 allowed"):
+        volumetric.load_volume(str(path), "series.zip")
+    assert _leftovers(scratch) == []
+
+
+def test_corrupt_dicom_zip_leaves_no_scratch_dir(scratch, tmp_path):
+    path = tmp_path / "series.zip"
+    path.write_bytes(b"PK\x03\x04 truncated")
+    with pytest.raises(zipfile.BadZipFile):
+        volumetric.load_volume(str(path), "series.zip")
+    assert _leftovers(scratch) == []
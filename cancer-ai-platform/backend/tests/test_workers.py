@@ -0,0 +1,129 @@
+"""InferencePool result delivery, driven without spawning worker processes."""
+import asyncio
+import io
+import queue
+import threading
+import time
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.ai_models import workers
+from app.ai_models.workers import InferencePool
+from app.config import settings
+from app.main import app
+
+
+class _Process:
+    def __init__(self, alive: bool):
+        self.alive = alive
+        self.exitcode = None if alive else -9
+        self.pid = 0
+
+    def is_alive(self):
+        return self.alive
+
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(1, 1, ["lung"])
+    pool._results = queue.Queue()
+    worker = pool._workers[0]
+    worker.requests = queue.Queue()
+    worker.process = _Process(alive=True)
+    yield pool
+    pool._stopped = True
+
+
+def _start(pool, target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_dispatched_future_cannot_be_cancelled(pool):
+    future = pool._dispatch("lung", "predict", None, None)
+    # What asyncio.wrap_future does when the awaiting client disconnects
+    assert not future.cancel()
+
+
+def test_collector_survives_already_resolved_future(pool):
+    collector = _start(pool, pool._collect_results)
+    first = pool._dispatch("lung", "predict", None, None)
+    first.set_exception(RuntimeError("resolved elsewhere"))
+    pool._results.put((0, True, "late"))
+
+    second = pool._dispatch("lung", "predict", None, None)
+    pool._results.put((1, True, {"predicted_class": "normal"}))
+    assert second.result(timeout=5) == {"predicted_class": "normal"}
+    assert collector.is_alive()
+
+
+def test_collector_delivers_worker_errors(pool):
+    _start(pool, pool._collect_results)
+    future = pool._dispatch("lung", "predict", None, None)
+    pool._results.put((0, False, "ValueError: bad image"))
+    with pytest.raises(RuntimeError, match="bad image"):
+        future.result(timeout=5)
+
+
+def test_supervisor_restarts_worker_with_resolved_futures(pool):
+    worker = pool._workers[0]
+    spawned = threading.Event()
+
+    def spawn(w):
+        w.process = _Process(alive=True)
+        spawned.set()
+
+    pool._spawn = spawn
+    lost = pool._dispatch("lung", "predict", None, None)
+    resolved = pool._dispatch("lung", "predict", None, None)
+    resolved.set_result("already done")
+    worker.process = _Process(alive=False)
+    supervisor = _start(pool, pool._supervise)
+
+    assert spawned.wait(timeout=5)
+    with pytest.raises(RuntimeError, match="crashed"):
+        lost.result(timeout=5)
+    assert resolved.result() == "already done"
+    assert worker.restarts == 1 and not worker.in_flight
+    time.sleep(1.2)
+    assert supervisor.is_alive()
+
+
+def test_acquire_pool_waits_for_a_starting_pool(monkeypatch):
+    starting = InferencePool(1, 1, ["lung"])
+    monkeypatch.setattr(workers, "_pool", None)
+
+    async def start_later():
+        await asyncio.sleep(0.2)
+        monkeypatch.setattr(workers, "_pool", starting)
+
+    async def main():
+        task = asyncio.create_task(start_later())
+        pool = await workers.acquire_pool()
+        await task
+        return pool
+
+    assert asyncio.run(main()) is starting
+
+
+def test_inference_before_pool_start_is_503(monkeypatch):
+    monkeypatch.setattr(workers, "_pool", None)
+    monkeypatch.setattr(workers, "POOL_START_WAIT_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", 1)
+    monkeypatch.setattr(settings, "INFERENCE_CACHE_ENABLED", False)
+    slide = io.BytesIO()
+    Image.new("RGB", (32, 32), "purple").save(slide, format="PNG")
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/pathology/analyze", files={"file": ("slide.png", slide.getvalue(), "image/png")}
+            )
+
+    response = asyncio.run(post())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
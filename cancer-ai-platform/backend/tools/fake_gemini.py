@@ -0,0 +1,134 @@
+"""
+Fake Gemini REST server for offline development and load tests.
+
+Serves `:generateContent` and `:streamGenerateContent` (`alt=sse`) with a valid 8-section
+report, after a configurable latency, and injects 429 / 503 errors at configurable rates.
+
+    python -m tools.fake_gemini --port 8090 --latency lognormal --latency-ms 1500 --error-rate 0.02
+
+Point the backend at it with:
+
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SECTIONS = [
+    "executive_summary", "indication", "technique", "findings",
+    "impression", "recommendation", "risk_assessment", "confidence_disclaimer",
+]
+
+config = argparse.Namespace(
+    latency="lognormal", latency_ms=1200.0, jitter=0.4,
+    error_rate=0.0, throttle_rate=0.0, chunk_chars=80, words=60,
+)
+stats = {"requests": 0, "streams": 0, "errors_503": 0, "errors_429": 0, "started": time.time()}
+
+app = FastAPI(title="Fake Gemini")
+
+
+def _latency() -> float:
+    """Seconds for one full generation under the configured distribution."""
+    mean = config.latency_ms / 1000
+    if config.latency == "fixed":
+        return mean
+    if config.latency == "uniform":
+        return random.uniform(mean * (1 - config.jitter), mean * (1 + config.jitter))
+    if config.latency == "normal":
+        return max(0.0, random.gauss(mean, mean * config.jitter))
+    # lognormal with the requested mean: long right tail, like real LLM latency
+    sigma = config.jitter
+    return random.lognormvariate(math.log(max(mean, 1e-6)) - sigma ** 2 / 2, sigma)
+
+
+def _injected_error() -> JSONResponse | None:
+    roll = random.random()
+    if roll < config.throttle_rate:
+        stats["errors_429"] += 1
+        return JSONResponse({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}, 429, headers={"Retry-After": "1"})
+    if roll < config.throttle_rate + config.error_rate:
+        stats["errors_503"] += 1
+        return JSONResponse({"error": {"code": 503, "status": "UNAVAILABLE"}}, 503)
+    return None
+
+
+def _report_text(prompt: str) -> str:
+    """A JSON report that echoes the prediction from the prompt."""
+    found = re.search(r"Predicted Class: (.*)", prompt)
+    predicted = found.group(1).strip() if found else "Unknown"
+    filler = " ".join(random.choice(["finding", "assessment", "lesion", "margin", "follow-up", "evidence"])
+                      for _ in range(config.words))
+    return json.dumps({key: f"[fake] {predicted}: {filler}" for key in SECTIONS}, indent=2)
+
+
+def _chunk(text: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+@app.post("/v1beta/models/{target}")
+async def generate(target: str, request: Request):
+    method = target.partition(":")[2]
+    payload = await request.json()
+    prompt = payload["contents"][0]["parts"][0]["text"]
+    stats["requests"] += 1
+
+    error = _injected_error()
+    if error is not None:
+        await asyncio.sleep(random.uniform(0.01, 0.05))
+        return error
+
+    text = _report_text(prompt)
+    latency = _latency()
+    if method != "streamGenerateContent":
+        await asyncio.sleep(latency)
+        return _chunk(text)
+
+    stats["streams"] += 1
+    pieces = [text[i:i + config.chunk_chars] for i in range(0, len(text), config.chunk_chars)]
+
+    async def events():
+        # A short time to first token, then the rest of the latency spread over the chunks
+        first = min(latency, 0.15 + latency * 0.05)
+        await asyncio.sleep(first)
+        for piece in pieces:
+            yield f"data: {json.dumps(_chunk(piece))}\r\n\r\n"
+            await asyncio.sleep((latency - first) / len(pieces))
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "uptime_seconds": round(time.time() - stats["started"], 1), "config": vars(config)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"], default=config.latency)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms, help="mean generation time")
+    parser.add_argument("--jitter", type=float, default=config.jitter,
+                        help="relative spread (uniform/normal) or sigma (lognormal)")
+    parser.add_argument("--error-rate", type=float, default=config.error_rate, help="fraction answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=config.throttle_rate, help="fraction answered with 429")
+    parser.add_argument("--chunk-chars", type=int, default=config.chunk_chars, help="characters per streamed chunk")
+    parser.add_argument("--words", type=int, default=config.words, help="filler words per section")
+    args = parser.parse_args()
+    for key, value in vars(args).items():
+        if hasattr(config, key):
+            setattr(config, key, value)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
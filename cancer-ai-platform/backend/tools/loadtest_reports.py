@@ -0,0 +1,234 @@
+"""
+Load-test runner for the report pipeline (DB fetch → RAG → LLM → persist).
+
+Drives POST /reports/generate/{id} (sync mode, stages read from the Server-Timing header)
+or POST /reports/generate/{id}/stream (stream mode, stages timed from the SSE `stage`
+events, plus time to first section) at a fixed concurrency, then prints p50/p95/p99
+latency, throughput, per-stage latency and an error breakdown.
+
+Run offline against tools.fake_gemini:
+
+    python -m tools.fake_gemini --port 8090 &
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta LLM_CACHE_ENABLED=false \\
+        uvicorn app.main:app --port 8000 &
+    python -m tools.loadtest_reports --seed 200 --requests 500 --concurrency 50
+
+`--seed N` inserts N synthetic predictions into the backend's DATABASE_URL (run it with
+the same environment as the server); otherwise pass `--prediction-ids`. With the LLM
+cache enabled, repeated predictions measure cache hits rather than LLM calls.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from collections import Counter
+
+import httpx
+
+STAGES = ["db", "rag", "llm", "save"]
+_TIMING_RE = re.compile(r'(\w+);(?:dur=([\d.]+)|desc="?(\w+)"?)')
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def parse_server_timing(header: str) -> tuple[dict[str, float], str | None]:
+    """({stage: ms}, failed stage) from a Server-Timing header."""
+    durations, failed = {}, None
+    for name, duration, desc in _TIMING_RE.findall(header or ""):
+        if name == "error":
+            failed = desc
+        elif duration:
+            durations[name] = float(duration)
+    return durations, failed
+
+
+async def run_sync(client: httpx.AsyncClient, prediction_id: int) -> dict:
+    started = time.perf_counter()
+    response = await client.post(f"/reports/generate/{prediction_id}")
+    record = {"latency_ms": (time.perf_counter() - started) * 1000, "status": response.status_code}
+    record["stages"], failed = parse_server_timing(response.headers.get("server-timing"))
+    if response.status_code == 200:
+        record["generated_by"] = response.json().get("generated_by")
+    else:
+        record["error"] = f"http_{response.status_code}" + (f"@{failed}" if failed else "")
+    return record
+
+
+async def run_stream(client: httpx.AsyncClient, prediction_id: int) -> dict:
+    started = time.perf_counter()
+    marks, record = [("db", started)], {"status": None, "stages": {}}
+    async with client.stream("POST", f"/reports/generate/{prediction_id}/stream") as response:
+        record["status"] = response.status_code
+        if response.status_code != 200:
+            await response.aread()
+            record["error"] = f"http_{response.status_code}"
+        else:
+            event = None
+            async for line in response.aiter_lines():
+                now = time.perf_counter()
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[5:])
+                if event == "stage":
+                    marks.append((data["stage"], now))
+                elif event == "section" and "ttfs_ms" not in record:
+                    record["ttfs_ms"] = (now - started) * 1000
+                elif event == "report":
+                    record["generated_by"] = data.get("generated_by")
+                elif event == "error":
+                    record["error"] = f"stream_error@{marks[-1][0]}"
+    ended = time.perf_counter()
+    marks.append((None, ended))
+    for (stage, t0), (_, t1) in zip(marks, marks[1:]):
+        record["stages"][stage] = record["stages"].get(stage, 0.0) + (t1 - t0) * 1000
+    record["latency_ms"] = (ended - started) * 1000
+    if "error" not in record and "generated_by" not in record:
+        record["error"] = "stream_incomplete"
+    return record
+
+
+async def run(args, prediction_ids: list[int]) -> tuple[list[dict], float]:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    runner = run_stream if args.mode == "stream" else run_sync
+    records: list[dict] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(prediction_ids[i % len(prediction_ids)])
+
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        async def worker():
+            while not queue.empty():
+                prediction_id = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    records.append(await runner(client, prediction_id))
+                except httpx.TimeoutException:
+                    records.append({"error": "timeout", "latency_ms": (time.perf_counter() - started) * 1000})
+                except httpx.TransportError as e:
+                    records.append({"error": type(e).__name__, "latency_ms": (time.perf_counter() - started) * 1000})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return records, elapsed
+
+
+async def seed_predictions(count: int) -> list[int]:
+    """Insert synthetic predictions with varied inputs (distinct LLM cache keys)."""
+    from app.database.session import async_session, init_db
+    from app.core.constants import risk_level_from_score
+    from app.models.prediction import Prediction
+
+    await init_db()
+    choices = [("lung", "ct", "malignant"), ("brain", "mri", "glioma"), ("blood", "pathology", "leukemia")]
+    async with async_session() as session:
+        rows = []
+        for i in range(count):
+            cancer_type, scan_type, predicted_class = random.choice(choices)
+            risk_score = round(random.uniform(5, 95), 1)
+            rows.append(Prediction(
+                patient_id=f"LOAD-{i:05d}",
+                patient_name="Load Test",
+                patient_age=random.randint(30, 85),
+                cancer_type=cancer_type,
+                scan_type=scan_type,
+                predicted_class=predicted_class,
+                confidence=round(random.uniform(50, 99.9), 2),
+                risk_score=risk_score,
+                risk_level=risk_level_from_score(risk_score).value,
+                probabilities={predicted_class: 0.9},
+            ))
+        session.add_all(rows)
+        await session.commit()
+        return [row.id for row in rows]
+
+
+def summarize(records: list[dict], elapsed: float, mode: str) -> dict:
+    ok = [r for r in records if "error" not in r]
+    latencies = [r["latency_ms"] for r in ok]
+    summary = {
+        "mode": mode,
+        "requests": len(records),
+        "succeeded": len(ok),
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": _distribution(latencies),
+        "stages_ms": {},
+        "errors": dict(Counter(r["error"] for r in records if "error" in r)),
+        "generated_by": dict(Counter(r.get("generated_by") for r in ok)),
+    }
+    for stage in STAGES:
+        values = [r["stages"][stage] for r in ok if stage in r.get("stages", {})]
+        if values:
+            summary["stages_ms"][stage] = _distribution(values)
+    ttfs = [r["ttfs_ms"] for r in ok if "ttfs_ms" in r]
+    if ttfs:
+        summary["time_to_first_section_ms"] = _distribution(ttfs)
+    return summary
+
+
+def _distribution(values: list[float]) -> dict:
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(max(values), 1) if values else 0.0,
+    }
+
+
+def print_summary(summary: dict):
+    print(f"\n{summary['mode']} mode: {summary['succeeded']}/{summary['requests']} succeeded "
+          f"in {summary['seconds']}s — {summary['throughput_rps']} req/s")
+    rows = [("total", summary["latency_ms"])]
+    if "time_to_first_section_ms" in summary:
+        rows.append(("first section", summary["time_to_first_section_ms"]))
+    rows += [(f"  {stage}", dist) for stage, dist in summary["stages_ms"].items()]
+    print(f"{'latency (ms)':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, dist in rows:
+        print(f"{name:<16}{dist['p50']:>10}{dist['p95']:>10}{dist['p99']:>10}{dist['max']:>10}")
+    print(f"generated_by: {summary['generated_by']}")
+    print(f"errors: {summary['errors'] or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--mode", choices=["sync", "stream"], default="sync")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--prediction-ids", default="", help="comma-separated prediction ids to cycle through")
+    parser.add_argument("--seed", type=int, default=0, help="insert N synthetic predictions first")
+    parser.add_argument("--token", default="", help="bearer token (reports are then saved for that user)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", dest="json_path", default="", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    prediction_ids = [int(i) for i in args.prediction_ids.split(",") if i.strip()]
+    if args.seed:
+        prediction_ids += asyncio.run(seed_predictions(args.seed))
+    if not prediction_ids:
+        parser.error("pass --prediction-ids or --seed")
+
+    records, elapsed = asyncio.run(run(args, prediction_ids))
+    summary = summarize(records, elapsed, args.mode)
+    print_summary(summary)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
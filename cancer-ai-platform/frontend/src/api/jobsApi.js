@@ -0,0 +1,46 @@
+import api from "./axios";
+
+/**
+ * Queue clinical report generation; returns the job immediately.
+ * @param {number} predictionId
+ */
+export const submitReportJob = (predictionId) => api.post(`/jobs/reports/${predictionId}`);
+
+/**
+ * Queue a radiology analysis; returns the job immediately.
+ * @param {File} file - Image, NIfTI or DICOM file
+ * @param {string} cancerType - lung, brain, bone, skin, breast
+ * @param {string} scanType - ct, mri, xray
+ * @param {Object} patientInfo - {patient_id, patient_name, patient_age}
+ */
+export const submitRadiologyJob = (file, cancerType, scanType, patientInfo = {}) => {
+    const formData = new FormData();
+    formData.append("file", file);
+    formData.append("cancer_type", cancerType);
+    formData.append("scan_type", scanType);
+    if (patientInfo.patient_id) formData.append("patient_id", patientInfo.patient_id);
+    if (patientInfo.patient_name) formData.append("patient_name", patientInfo.patient_name);
+    if (patientInfo.patient_age) formData.append("patient_age", patientInfo.patient_age);
+
+    return api.post("/jobs/radiology/analyze", formData, {
+        headers: { "Content-Type": "multipart/form-data" },
+    });
+};
+
+export const getJob = (jobId) => api.get(`/jobs/${jobId}`);
+
+/**
+ * Subscribe to a job's progress stream (Server-Sent Events).
+ * `onEvent` receives {status, stage, progress, result, error}; the stream closes when the job finishes.
+ * Returns the EventSource so callers can close it early.
+ */
+export const subscribeToJob = (jobId, onEvent) => {
+    const source = new EventSource(`${api.defaults.baseURL}/jobs/${jobId}/events`);
+    const handle = (e) => {
+        const event = JSON.parse(e.data);
+        onEvent(event);
+        if (event.status === "succeeded" || event.status === "failed") source.close();
+    };
+    ["queued", "running", "succeeded", "failed"].forEach((type) => source.addEventListener(type, handle));
+    return source;
+};
@@ -22,4 +22,30 @@ export const analyzePathology = (file, patientInfo = {}, biomarkers = {}) => {
     });
 };
 
-export const getPathologyHistory = () => api.get("/pathology/history");
+/**
+ * Upload all blood slides of a study (images and/or zip archives) and analyze them in batches.
+ * @param {File[]} files - Blood slide images or zip archives
+ * @param {Object} patientInfo - {patient_id, patient_name, patient_age}
+ * @param {Object} biomarkers - {wbc, blast, hgb, plt}
+ */
+export const analyzePathologyBatch = (files, patientInfo = {}, biomarkers = {}) => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append("files", file));
+    if (patientInfo.patient_id) formData.append("patient_id", patientInfo.patient_id);
+    if (patientInfo.patient_name) formData.append("patient_name", patientInfo.patient_name);
+    if (patientInfo.patient_age) formData.append("patient_age", patientInfo.patient_age);
+    if (biomarkers.wbc) formData.append("wbc", biomarkers.wbc);
+    if (biomarkers.blast) formData.append("blast", biomarkers.blast);
+    if (biomarkers.hgb) formData.append("hgb", biomarkers.hgb);
+    if (biomarkers.plt) formData.append("plt", biomarkers.plt);
+
+    return api.post("/pathology/analyze/batch", formData, {
+        headers: { "Content-Type": "multipart/form-data" },
+    });
+};
+
+/**
+ * Get a page of pathology history. The next page's cursor is in the X-Next-Cursor response header.
+ * @param {Object} params - {limit, cursor}
+ */
+export const getPathologyHistory = (params = {}) => api.get("/pathology/history", { params });
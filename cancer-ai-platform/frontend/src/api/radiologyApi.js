@@ -21,4 +21,35 @@ export const analyzeRadiology = (file, cancerType, scanType, patientInfo = {}) =
     });
 };
 
-export const getRadiologyHistory = () => api.get("/radiology/history");
+/**
+ * Upload a multi-image study (images and/or zip archives) and analyze it in batches.
+ * @param {File[]} files - Image files or zip archives
+ * @param {string} cancerType - lung, brain, bone, skin, breast
+ * @param {string} scanType - ct, mri, xray
+ * @param {Object} patientInfo - {patient_id, patient_name, patient_age}
+ */
+export const analyzeRadiologyBatch = (files, cancerType, scanType, patientInfo = {}) => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append("files", file));
+    formData.append("cancer_type", cancerType);
+    formData.append("scan_type", scanType);
+    if (patientInfo.patient_id) formData.append("patient_id", patientInfo.patient_id);
+    if (patientInfo.patient_name) formData.append("patient_name", patientInfo.patient_name);
+    if (patientInfo.patient_age) formData.append("patient_age", patientInfo.patient_age);
+
+    return api.post("/radiology/analyze/batch", formData, {
+        headers: { "Content-Type": "multipart/form-data" },
+    });
+};
+
+/**
+ * Get a page of radiology history. The next page's cursor is in the X-Next-Cursor response header.
+ * @param {Object} params - {limit, cursor}
+ */
+export const getRadiologyHistory = (params = {}) => api.get("/radiology/history", { params });
+
+/**
+ * Get the Grad-CAM overlay for a prediction (generated on first request).
+ * @param {number} predictionId
+ */
+export const getRadiologyHeatmap = (predictionId) => api.get(`/radiology/${predictionId}/heatmap`);
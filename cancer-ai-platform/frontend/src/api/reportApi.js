@@ -1,8 +1,45 @@
 import api from "./axios";
 
 export const generateReport = (predictionId) => api.post(`/reports/generate/${predictionId}`);
-export const getReports = () => api.get("/reports/");
+
+/**
+ * Generate a report as a stream. `onEvent(type, data)` receives "stage" ({stage}),
+ * "section" ({key, value}) as each section completes, then "report" (the saved report)
+ * or "error" ({detail}). Uses fetch rather than EventSource so the auth header is sent.
+ * Resolves when the stream ends; pass an AbortSignal to cancel.
+ */
+export const streamReport = async (predictionId, onEvent, signal = undefined) => {
+    const token = localStorage.getItem("chronoscan_token");
+    const response = await fetch(`${api.defaults.baseURL}/reports/generate/${predictionId}/stream`, {
+        method: "POST",
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        signal,
+    });
+    if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        throw new Error(body.detail || `Report stream failed (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let end;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            const type = frame.match(/^event: (.*)$/m)?.[1];
+            const data = frame.match(/^data: (.*)$/m)?.[1];
+            if (type && data) onEvent(type, JSON.parse(data));
+        }
+    }
+};
+
+export const getReports = (params = {}) => api.get("/reports/", { params });
 export const getReport = (id) => api.get(`/reports/${id}`);
 
 export const getDashboardStats = () => api.get("/dashboard/stats");
-export const getRecentPredictions = (limit = 10) => api.get(`/dashboard/recent?limit=${limit}`);
+export const getRecentPredictions = (limit = 10, cursor = undefined) => api.get("/dashboard/recent", { params: { limit, cursor } });
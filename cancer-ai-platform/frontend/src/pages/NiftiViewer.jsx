@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from "react";
 import { Badge } from "../components/Shared.jsx";
+import { getRadiologyHeatmap } from "../api/radiologyApi";
 
 export default function NiftiViewer({ onNavigate, analysisResult }) {
     const [slice, setSlice] = useState(42);
@@ -11,6 +12,7 @@ export default function NiftiViewer({ onNavigate, analysisResult }) {
         { id: "mediastinum", label: "Mediastinum", hu: "40/400" },
         { id: "bone", label: "Bone Window", hu: "400/1800" },
     ];
+    const [heatmapPath, setHeatmapPath] = useState(null);
     const r = analysisResult || {};
     const patientLabel = r.patient_name ? `${r.patient_id || "PT"} · ${r.patient_name}` : "PT-0041 · Ananya Sharma";
     const finding = r.predicted_class || "Suspicious Nodule";
@@ -32,6 +34,17 @@ export default function NiftiViewer({ onNavigate, analysisResult }) {
     };
     const fd = findingDetails[cancerType] || findingDetails.lung;
 
+    // Heatmaps are generated lazily on the server — fetch it when the overlay is shown
+    useEffect(() => {
+        setHeatmapPath(r.heatmap_path || null);
+        if (r.heatmap_path || !r.id || !overlay || r.scan_type === "pathology") return;
+        let cancelled = false;
+        getRadiologyHeatmap(r.id)
+            .then((res) => { if (!cancelled) setHeatmapPath(res.data.heatmap_path); })
+            .catch(() => {});
+        return () => { cancelled = true; };
+    }, [r.id, r.heatmap_path, r.scan_type, overlay]);
+
     useEffect(() => {
         const canvas = canvasRef.current;
         if (!canvas) return;
@@ -44,8 +57,8 @@ export default function NiftiViewer({ onNavigate, analysisResult }) {
 
         // Load the actual uploaded image or heatmap
         const img = new Image();
-        const imgUrl = r.heatmap_path && overlay
-            ? `http://localhost:8000/uploads/${r.heatmap_path}`
+        const imgUrl = heatmapPath && overlay
+            ? `http://localhost:8000/uploads/${heatmapPath}`
             : r.image_path
                 ? `http://localhost:8000/uploads/${r.image_path}`
                 : null;
@@ -111,7 +124,7 @@ export default function NiftiViewer({ onNavigate, analysisResult }) {
             ctx.fillText(`SLICE ${slice}/80`, 8, 16);
             ctx.fillText(window_ === "lung" ? "HU -600/1200" : window_ === "mediastinum" ? "HU 40/400" : "HU 400/1800", 8, 28);
         }
-    }, [slice, overlay, window_, r]);
+    }, [slice, overlay, window_, r, heatmapPath]);
 
     return (
         <div className="page-enter" style={{ minHeight: "100vh", padding: "40px 48px 180px", position: "relative", zIndex: 1 }}>